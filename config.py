@@ -21,6 +21,7 @@ TELEGRAM_GROUP_ID = os.getenv('TELEGRAM_GROUP_ID')
 INSTAGRAM_USERNAME = os.getenv('INSTAGRAM_USERNAME')
 INSTAGRAM_PASSWORD = os.getenv('INSTAGRAM_PASSWORD')
 INSTAGRAM_SESSIONID = os.getenv('INSTAGRAM_SESSIONID')  # Optional: session cookie fallback
+INSTAGRAM_MIN_WRITE_INTERVAL = float(os.getenv('INSTAGRAM_MIN_WRITE_INTERVAL', '6.5'))  # Seconds between uploads
 
 # VK Configuration
 VK_ACCESS_TOKEN = os.getenv('VK_ACCESS_TOKEN')
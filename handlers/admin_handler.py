@@ -4,10 +4,19 @@ Handles admin messages, photo processing, and post publishing.
 """
 
 import os
+from pathlib import Path
+import re
+import time
+import types
+import contextvars
 import logging
 import asyncio
+from functools import wraps
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from collections import defaultdict
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Awaitable, Dict, Final, List, Mapping, Optional, Tuple
 from telegram import Update, Message, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto
 from telegram.ext import ContextTypes
 from telegram.error import TelegramError
@@ -22,11 +31,324 @@ from services.scheduler_service import SchedulerService, QueuedPost
 
 logger = logging.getLogger("admin")
 
+# Schedule time input: "+N" minutes, "DD.MM HH:MM" or "HH:MM"
+_TIME_RE = re.compile(
+    r"^(?:\+\s*(?P<rel>\d+)"
+    r"|(?P<d>\d{1,2})\.(?P<m>\d{1,2})\s+(?P<h1>\d{1,2}):(?P<min1>\d{1,2})"
+    r"|(?P<h2>\d{1,2}):(?P<min2>\d{1,2}))$"
+)
+
+# Instagram post/reels link (scheme optional, as users often paste bare links)
+_INSTA_RE = re.compile(r"^(?:https?://)?(?:www\.|m\.)?(?:instagram\.com|instagr\.am)/", re.IGNORECASE)
+
+# Static help text, rendered once at import
+_HELP_HTML = """🤖 <b>Помощь - Автопостер с умным определением</b>
+
+<b>📋 Автоматическая публикация:</b>
+1. ➕ Нажмите "Добавить ссылку"
+2. 📎 Отправьте ссылку на пост/рилс из Instagram
+3. ✅ Пост добавится в очередь
+4. ⏰ Будет опубликован автоматически в расписанное время
+
+<b>🚀 Ручная публикация (УПРОЩЁННАЯ!):</b>
+1. 🚀 Нажмите "Начать публикацию"
+2. 📱 Выберите платформу (Instagram/Telegram/VK/Все)
+3. 🔍 Выберите поиск артикулов (Да/Нет)
+4. 📤 Отправьте ЛЮБОЙ контент:
+   • 📷 Фото (одно или несколько)
+   • 📹 Видео файл
+   • 🔗 Ссылку на Instagram рилс
+5. 📝 Отправьте подпись к посту
+6. 🤖 Используйте "Помощь ИИ" для улучшения
+7. ⏰ Выберите время (сейчас/запланировать)
+
+<b>✨ Автоопределение типа:</b>
+Бот сам определит что вы отправили:
+• Фото → пост с фотографиями
+• Видео → видео пост
+• Ссылка /reel/ → скачает рилс
+Больше не нужно выбирать тип!
+
+<b>⏰ Расписание публикаций:</b>
+Фиксированные часы: 8, 10, 12, 14, 16, 18, 20, 22
+Раз в 2 часа публикуется один пост из очереди
+
+<b>📋 Управление очередью:</b>
+/add_link — добавить ссылку
+/queue — посмотреть очередь
+📋 Очередь постов — просмотр
+🗑️ Очистить опубликованные
+❌ Очистить все
+
+<b>🛠️ Основные команды:</b>
+/start — запуск
+/help — помощь
+/status — статус бота
+/cancel — отмена
+/reset — сброс Instagram сессии
+
+<b>📝 Планирование разовых постов:</b>
+• <code>HH:MM</code> - сегодня в указанное время
+• <code>DD.MM HH:MM</code> - в указанную дату и время
+• <code>+N</code> - через N минут
+
+<b>🤖 ИИ помощь:</b>
+• Улучшает описания постов
+• Добавляет эмодзи и хештеги
+• Адаптирует стиль под платформу
+• Требует настройки GOOGLE_API_KEY
+
+<b>📌 Примечания:</b>
+• Автоопределение типа контента
+• Очередь сохраняется при перезапуске
+• Фото автоматически обрабатываются
+• Поддержка фото, видео и рилсов
+• Доступ только у администратора
+
+📖 Подробнее: см. SCHEDULER_GUIDE.md"""
+
+# Status skeleton: instagram, telegram, vk, ai, state info, scheduled info
+_STATUS_TMPL = """🤖 <b>Статус бота</b>
+
+📸 <b>Instagram:</b> %s
+💬 <b>Telegram:</b> %s
+🔵 <b>VK:</b> %s
+🤖 <b>ИИ сервис:</b> %s
+
+👤 <b>Ваше состояние:</b> %s%s
+
+<b>Команды:</b>
+/cancel - очистить состояние
+/reset - сбросить Instagram сессию"""
+
+# Reply keyboards are immutable, so one instance is shared by every user
+_KB_MAIN = ReplyKeyboardMarkup([
+    [KeyboardButton("🚀 Начать публикацию")],
+    [KeyboardButton("📋 Очередь постов"), KeyboardButton("➕ Добавить ссылку")],
+    [KeyboardButton("✅ Status"), KeyboardButton("❌ Cancel")],
+    [KeyboardButton("ℹ️ Help")],
+], resize_keyboard=True)
+
+_KB_TYPE_SELECTION = ReplyKeyboardMarkup([
+    [KeyboardButton("📷 Одиночный пост"), KeyboardButton("📸 Массовый пост")],
+    [KeyboardButton("📹 Публикация рилс")],
+    [KeyboardButton("❌ Отмена")],
+], resize_keyboard=True)
+
+_KB_CONTENT_INPUT = ReplyKeyboardMarkup([
+    [KeyboardButton("❌ Отмена")],
+], resize_keyboard=True)
+
+_KB_PLATFORM_SELECTION = ReplyKeyboardMarkup([
+    [KeyboardButton("📷 Instagram"), KeyboardButton("💬 Telegram")],
+    [KeyboardButton("🔵 VK"), KeyboardButton("🔀 Все платформы")],
+    [KeyboardButton("❌ Отмена")],
+], resize_keyboard=True)
+
+_KB_ARTICLE_CHECK = ReplyKeyboardMarkup([
+    [KeyboardButton("🔍 Да, искать артикулы"), KeyboardButton("⏭️ Нет, пропустить")],
+    [KeyboardButton("❌ Отмена")],
+], resize_keyboard=True)
+
+_KB_SCHEDULE = ReplyKeyboardMarkup([
+    [KeyboardButton("⚡ Опубликовать сейчас"), KeyboardButton("⏰ Запланировать")],
+    [KeyboardButton("🤖 Помощь ИИ"), KeyboardButton("❌ Отмена")],
+], resize_keyboard=True)
+
+_MSG_TYPE_PLATFORM_STEP = """
+
+<b>Шаг 2:</b> Выберите платформу для публикации:
+
+📷 <b>Instagram</b> - только Instagram
+💬 <b>Telegram</b> - только Telegram группа  
+🔀 <b>Обе платформы</b> - Instagram + Telegram"""
+
+_MSG_TYPE_SINGLE = "📷 <b>Одиночный пост выбран</b>" + _MSG_TYPE_PLATFORM_STEP
+_MSG_TYPE_MULTI = "📸 <b>Массовый пост выбран</b>" + _MSG_TYPE_PLATFORM_STEP
+
+_MSG_TYPE_REELS = """📹 <b>Публикация рилс выбрана</b>
+
+<b>Шаг 2:</b> Выберите платформу для публикации:
+
+📷 <b>Instagram</b> - публикация как обычный видео-пост
+💬 <b>Telegram</b> - только Telegram группа  
+🔵 <b>VK</b> - только VK группа
+🔀 <b>Все платформы</b> - Instagram + Telegram + VK
+
+<i>Примечание: В Instagram видео будет опубликовано как обычный пост, не как reels</i>"""
+
+_MSG_START_PUBLICATION = """🚀 <b>Начинаем процесс публикации</b>
+
+<b>Шаг 1:</b> Выберите платформу для публикации:
+
+📷 <b>Instagram</b> - только Instagram
+💬 <b>Telegram</b> - только Telegram группа
+🔵 <b>VK</b> - только VK группа
+🔀 <b>Все платформы</b> - Instagram + Telegram + VK
+
+<i>💡 После выбора платформы отправьте:</i>
+• Фото (одно или несколько)
+• Видео
+• Ссылку на Instagram пост/рилс
+
+<i>Бот автоматически определит тип контента!</i>"""
+
+_MSG_ARTICLE_CHECK_STEP = """
+
+<b>Шаг 2:</b> Нужно ли искать артикулы на фотографиях?
+
+🔍 <b>Да, искать артикулы</b> - бот автоматически найдет номера товаров и добавит их в пост
+⏭️ <b>Нет, пропустить</b> - загрузить без поиска артикулов
+
+<i>💡 На следующем шаге отправьте:</i>
+• Фото (одно или несколько до 10)
+• Видео файл
+• Ссылку на Instagram пост/рилс"""
+
+# Reply after a platform button, keyed by target_platform
+_MSG_PLATFORM_SELECTED = {
+    'instagram': "📷 <b>Instagram выбран</b>" + _MSG_ARTICLE_CHECK_STEP,
+    'telegram': "💬 <b>Telegram выбран</b>" + _MSG_ARTICLE_CHECK_STEP,
+    'vk': "🔵 <b>VK выбран</b>" + _MSG_ARTICLE_CHECK_STEP,
+    'all': "🔀 <b>Все платформы выбраны</b>" + _MSG_ARTICLE_CHECK_STEP,
+}
+
+# Inline "cancel download" button shown while a reels download runs
+_CANCEL_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton("⏹️ Отменить", callback_data="cancel_download")
+]])
+
+# Reels download progress texts (with and without a known total size)
+_PROG_TMPL_WITH_TOTAL = (
+    "⏳ <b>Скачиваю рилс из Instagram...</b>\n\n"
+    "📊 Прогресс: {percent:.1f}%\n"
+    "[{bar}]\n\n"
+    "💾 Скачано: {dmb:.2f} МБ / {tmb:.2f} МБ"
+)
+_PROG_TMPL_NO_TOTAL = (
+    "⏳ <b>Скачиваю рилс из Instagram...</b>\n\n"
+    "📊 Скачивание...\n"
+    "💾 Скачано: {dmb:.2f} МБ"
+)
+
+# Download progress bars for 0..100% in 5% steps
+_PROGRESS_BARS = tuple("█" * i + "░" * (20 - i) for i in range(21))
+
+# Human-readable target platform names (read-only, shared across handlers)
+_PLATFORM_LABELS: Final[Mapping[str, str]] = types.MappingProxyType({
+    'instagram': 'Instagram',
+    'telegram': 'Telegram',
+    'vk': 'VK',
+    'both': 'Instagram и Telegram',
+    'all': 'Instagram, Telegram и VK',
+})
+
+# %-template: header, platform label, article search state
+_MSG_CONTENT_INPUT_TMPL = """%s
+
+<b>Шаг 3:</b> Отправьте контент для публикации
+
+📱 <b>Платформа:</b> %s
+🔍 <b>Поиск артикулов:</b> %s
+
+📤 <b>Отправьте:</b>
+• 📷 Фото (одно или несколько до 10)
+• 📹 Видео файл
+• 🔗 Ссылку на Instagram пост/рилс
+
+<i>Бот автоматически определит тип контента!</i>"""
+
+_WRONG_STEP_MSG = "❌ Неверный шаг. Начните с /start"
+
+# Success message prefix keyed by (scheduled, reels)
+_SUCCESS_PREFIXES: Final[Mapping[tuple, str]] = types.MappingProxyType({
+    (False, False): "✅ Пост опубликован в",
+    (True, False): "✅ Запланированный пост опубликован в",
+    (False, True): "✅ Рилс опубликован в",
+    (True, True): "✅ Запланированный рилс опубликован в",
+})
+
+
+class Step(IntEnum):
+    """Conversation step of a user; members are singletons, so compare with `is`."""
+    START = 0
+    TYPE_SELECTION = 1
+    PLATFORM_SELECTION = 2
+    ARTICLE_CHECK_SELECTION = 3
+    CONTENT_INPUT = 4
+    PHOTOS_UPLOAD = 5
+    PHOTOS_UPLOADED = 6
+    CAPTION_ENTERED = 7
+    PREVIEW_SHOWN = 8
+    SCHEDULING = 9
+    SCHEDULED = 10
+    REELS_URL_INPUT = 11
+    REELS_DOWNLOAD = 12
+    REELS_WAITING_CAPTION = 13
+    WAITING_FOR_LINK = 14
+
+
+@dataclass(slots=True)
+class UserState:
+    """Conversation state of a single admin user."""
+    photos: List[str] = field(default_factory=list)
+    waiting_for_caption: bool = False
+    post_mode: str = 'auto'  # 'auto' | 'single' | 'multi' | 'reels'
+    target_platform: str = 'both'  # 'instagram' | 'telegram' | 'vk' | 'both' | 'all'
+    step: Step = Step.START
+    caption: str = ''
+    scheduled_time: Optional[datetime] = None
+    article_numbers: List[str] = field(default_factory=list)  # Found article numbers
+    cancel_event: asyncio.Event = field(default_factory=asyncio.Event)  # Set when the operation is cancelled
+    check_articles: bool = True  # Whether article search is needed
+    reels_url: Optional[str] = None  # Instagram reels URL
+    reels_video_path: Optional[str] = None  # Downloaded video path
+    cancel_download: bool = False  # Set by the reels download cancel button
+    last_active: float = 0.0  # time.monotonic() of the last get_user_state() call
+
+
+# State of the user whose update is being handled, bound by requires_admin_step
+CURRENT_STATE: contextvars.ContextVar[UserState] = contextvars.ContextVar('current_state')
+
+
+def requires_admin_step(expected_step: Optional[Step] = None, wrong_step_message: Optional[str] = _WRONG_STEP_MSG):
+    """
+    Decorate an AdminHandler handler with the admin and step checks.
+    
+    The wrapped handler receives the caller's user state as a fourth argument,
+    and the same state is bound to CURRENT_STATE while the handler runs.
+    
+    Args:
+        expected_step: Step the user must be at, or None to skip the step check
+        wrong_step_message: Reply sent when the user is at another step, or None to ignore silently
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+            user_id = update.effective_user.id
+            if user_id not in self._admin_ids:
+                await update.message.reply_text(MESSAGES['unauthorized'])
+                return
+            user_state = self.get_user_state(user_id)
+            if expected_step is not None and user_state.step is not expected_step:
+                if wrong_step_message is not None:
+                    await update.message.reply_text(wrong_step_message)
+                return
+            token = CURRENT_STATE.set(user_state)
+            try:
+                return await handler(self, update, context, user_state)
+            finally:
+                CURRENT_STATE.reset(token)
+        return wrapper
+    return decorator
+
 class AdminHandler:
     """Handles admin interactions and post processing."""
     
     def __init__(self):
         """Initialize the admin handler."""
+        # Authorized admin IDs, fixed for the lifetime of the handler
+        self._admin_ids = frozenset({ADMIN_USER_ID})
         self.image_processor = ImageProcessor()
         self.instagram_service = InstagramService()
         self.telegram_service = TelegramService()
@@ -34,66 +356,61 @@ class AdminHandler:
         self.ai_service = AIService()
         self.scheduler_service = SchedulerService()
         
-        # User state management: {user_id: {'photos': [], 'waiting_for_caption': bool, 'post_mode': 'auto'|'single'|'multi'|'reels', 'target_platform': 'both'|'instagram'|'telegram'|'vk'|'all', 'step': 'start'|'type_selected'|'platform_selected'|'article_check_selection'|'photos_uploaded'|'caption_entered'|'preview_shown'|'scheduled'|'reels_url_input'|'reels_download', 'cancelled': bool, 'check_articles': bool, 'reels_url': str, 'reels_video_path': str}}
-        self.user_states: Dict[int, Dict] = {}
+        # User state management: {user_id: UserState}
+        self.user_states: Dict[int, UserState] = {}
+        # Idle states are dropped (and their files removed) after this many seconds
+        self._state_idle_ttl = 3600
+        self._last_state_sweep = time.monotonic()
         # Pending posts waiting for approval: {user_id: {'photos': [], 'caption': str, 'message_id': int, 'target_platform': str, 'scheduled_time': datetime}}
         self.pending_posts: Dict[int, Dict] = {}
         # Scheduled posts: {user_id: {'task': asyncio.Task, 'post_data': dict}}
         self.scheduled_posts: Dict[int, Dict] = {}
+        # Last edit per progress message: {(chat_id, message_id): (monotonic ts, text)}
+        self._last_edit: Dict[tuple, Tuple[float, str]] = {}
+        # Telegram throttles message edits to roughly one per second
+        self._edit_min_interval = 0.8
+        # Limits how many posts are resized and uploaded at the same time
+        self._publish_sem = asyncio.Semaphore(min(os.cpu_count() or 1, 4))
+        # Caps in-flight uploads per platform so parallel publishing stays under
+        # their rate limits; one Instagram account tolerates the least
+        self._platform_sems: Dict[str, asyncio.Semaphore] = {
+            'Instagram': asyncio.Semaphore(1),
+            'Telegram': asyncio.Semaphore(4),
+            'VK': asyncio.Semaphore(2),
+        }
         
         # Set up scheduler publish callback
         self.scheduler_service.set_publish_callback(self._publish_from_queue)
 
     def get_main_keyboard(self) -> ReplyKeyboardMarkup:
         """Return the main reply keyboard for quick actions."""
-        keyboard = [
-            [KeyboardButton("🚀 Начать публикацию")],
-            [KeyboardButton("📋 Очередь постов"), KeyboardButton("➕ Добавить ссылку")],
-            [KeyboardButton("✅ Status"), KeyboardButton("❌ Cancel")],
-            [KeyboardButton("ℹ️ Help")],
-        ]
-        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        return _KB_MAIN
     
     def get_type_selection_keyboard(self) -> ReplyKeyboardMarkup:
         """Return keyboard for post type selection (deprecated - now auto-detect)."""
-        keyboard = [
-            [KeyboardButton("📷 Одиночный пост"), KeyboardButton("📸 Массовый пост")],
-            [KeyboardButton("📹 Публикация рилс")],
-            [KeyboardButton("❌ Отмена")],
-        ]
-        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        return _KB_TYPE_SELECTION
     
     def get_content_input_keyboard(self) -> ReplyKeyboardMarkup:
         """Return keyboard for content input step."""
-        keyboard = [
-            [KeyboardButton("❌ Отмена")],
-        ]
-        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        return _KB_CONTENT_INPUT
     
     def get_platform_selection_keyboard(self) -> ReplyKeyboardMarkup:
         """Return keyboard for platform selection."""
-        keyboard = [
-            [KeyboardButton("📷 Instagram"), KeyboardButton("💬 Telegram")],
-            [KeyboardButton("🔵 VK"), KeyboardButton("🔀 Все платформы")],
-            [KeyboardButton("❌ Отмена")],
-        ]
-        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        return _KB_PLATFORM_SELECTION
     
     def get_article_check_keyboard(self) -> ReplyKeyboardMarkup:
         """Return keyboard for article check selection."""
-        keyboard = [
-            [KeyboardButton("🔍 Да, искать артикулы"), KeyboardButton("⏭️ Нет, пропустить")],
-            [KeyboardButton("❌ Отмена")],
-        ]
-        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        return _KB_ARTICLE_CHECK
     
     def get_schedule_keyboard(self) -> ReplyKeyboardMarkup:
         """Return keyboard for scheduling options."""
-        keyboard = [
-            [KeyboardButton("⚡ Опубликовать сейчас"), KeyboardButton("⏰ Запланировать")],
-            [KeyboardButton("🤖 Помощь ИИ"), KeyboardButton("❌ Отмена")],
-        ]
-        return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        return _KB_SCHEDULE
+    
+    @staticmethod
+    def _read_file_bytes(file_path: str) -> bytes:
+        """Read a whole file; meant to be run off the event loop."""
+        with open(file_path, 'rb') as f:
+            return f.read()
     
     def is_admin(self, user_id: int) -> bool:
         """
@@ -105,9 +422,9 @@ class AdminHandler:
         Returns:
             bool: True if user is admin
         """
-        return user_id == ADMIN_USER_ID
+        return user_id in self._admin_ids
     
-    def get_user_state(self, user_id: int) -> Dict:
+    def get_user_state(self, user_id: int) -> UserState:
         """
         Get user state or create new one.
         
@@ -115,23 +432,38 @@ class AdminHandler:
             user_id: Telegram user ID
             
         Returns:
-            dict: User state dictionary
+            UserState: User state
         """
-        if user_id not in self.user_states:
-            self.user_states[user_id] = {
-                'photos': [],
-                'waiting_for_caption': False,
-                'post_mode': 'auto',  # 'single' or 'multi' or 'reels'
-                'target_platform': 'both',  # 'instagram' | 'telegram' | 'vk' | 'both' | 'all'
-                'step': 'start',  # 'start' | 'type_selected' | 'platform_selected' | 'article_check_selection' | 'photos_uploaded' | 'caption_entered' | 'preview_shown' | 'scheduled' | 'reels_url_input' | 'reels_download' | 'reels_waiting_caption'
-                'scheduled_time': None,
-                'article_numbers': [],  # List of found article numbers
-                'cancelled': False,  # Flag to indicate if operation was cancelled
-                'check_articles': True,  # Flag to indicate if article check is needed
-                'reels_url': None,  # Instagram reels URL
-                'reels_video_path': None,  # Downloaded video path
-            }
-        return self.user_states[user_id]
+        now = time.monotonic()
+        if now - self._last_state_sweep > 300:
+            self._sweep_idle_states(now)
+        
+        state = self.user_states.get(user_id)
+        if state is None:
+            state = UserState()
+            self.user_states[user_id] = state
+        state.last_active = now
+        return state
+    
+    def _sweep_idle_states(self, now: float) -> None:
+        """
+        Drop user states idle for longer than the TTL, removing their temp files.
+        
+        Args:
+            now: Current time.monotonic() value
+        """
+        self._last_state_sweep = now
+        idle_ids = [
+            uid for uid, state in self.user_states.items()
+            if now - state.last_active > self._state_idle_ttl and uid not in self.scheduled_posts
+        ]
+        for uid in idle_ids:
+            video_path = self.user_states[uid].reels_video_path
+            if video_path:
+                self.image_processor.cleanup_files([video_path])
+            self.clear_user_state(uid)
+        if idle_ids:
+            logger.info(f"Dropped {len(idle_ids)} idle user states")
     
     def clear_user_state(self, user_id: int):
         """
@@ -140,13 +472,12 @@ class AdminHandler:
         Args:
             user_id: Telegram user ID
         """
-        if user_id in self.user_states:
-            state = self.user_states[user_id]
-            # Cleanup photo files
-            if state.get('photos'):
-                self.image_processor.cleanup_files(state['photos'])
-            # Clear state
-            del self.user_states[user_id]
+        state = self.user_states.pop(user_id, None)
+        if state is None:
+            return
+        # Cleanup photo files
+        if state.photos:
+            self.image_processor.cleanup_files(state.photos)
     
     async def handle_photo(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -165,16 +496,16 @@ class AdminHandler:
             user_state = self.get_user_state(update.effective_user.id)
             
             # Check if we're in the right step, or allow direct photo upload
-            if user_state['step'] not in ['content_input', 'photos_upload', 'caption_entered']:
+            if user_state.step not in (Step.CONTENT_INPUT, Step.PHOTOS_UPLOAD, Step.CAPTION_ENTERED):
                 # Allow direct photo upload - set default values
-                user_state['post_mode'] = 'auto'  # Auto-detect mode
-                user_state['target_platform'] = 'both'  # Default to both platforms
-                user_state['check_articles'] = True  # Default to article check
-                user_state['step'] = 'content_input'
+                user_state.post_mode = 'auto'  # Auto-detect mode
+                user_state.target_platform = 'both'  # Default to both platforms
+                user_state.check_articles = True  # Default to article check
+                user_state.step = Step.CONTENT_INPUT
                 await update.message.reply_text("📸 Прямая загрузка фото! Режим: авто, платформы: Instagram + Telegram, поиск артикулов: включен")
             
             # Auto-detect: photos = photo post mode
-            user_state['post_mode'] = 'multi'  # Will handle single/multi automatically by count
+            user_state.post_mode = 'multi'  # Will handle single/multi automatically by count
             
             # Get the highest resolution photo
             photo = update.message.photo[-1]
@@ -191,49 +522,49 @@ class AdminHandler:
                 return
             
             # Add photo to state (auto mode allows multiple photos)
-            user_state['photos'].append(photo_path)
+            user_state.photos.append(photo_path)
             
             # Check photo count
-            if len(user_state['photos']) > 10:
+            if len(user_state.photos) > 10:
                 self.clear_user_state(update.effective_user.id)
                 await update.message.reply_text(MESSAGES['too_many_photos'])
                 return
             
             # Update step
-            user_state['step'] = 'photos_uploaded'
-            user_state['waiting_for_caption'] = True
+            user_state.step = Step.PHOTOS_UPLOADED
+            user_state.waiting_for_caption = True
             
             # Search for article numbers in uploaded photos (if enabled)
             article_numbers = []
-            if user_state.get('check_articles', True):
+            if user_state.check_articles:
                 processing_msg = await update.message.reply_text("🔍 Ищу артикулы на фотографиях...")
                 
                 # Update message to show progress
                 await processing_msg.edit_text("🔍 Ищу артикулы на фотографиях...\n\n📸 Анализирую изображения...")
                 
                 # Check if cancelled before processing
-                if user_state.get('cancelled', False):
+                if user_state.cancel_event.is_set():
                     await processing_msg.edit_text("❌ Операция отменена.")
                     return
                 
-                article_numbers = await self.image_processor.extract_article_numbers_async(user_state['photos'], self.ai_service)
+                article_numbers = await self.image_processor.extract_article_numbers_async(user_state.photos, self.ai_service)
                 
                 # Check if cancelled after processing
-                if user_state.get('cancelled', False):
+                if user_state.cancel_event.is_set():
                     await processing_msg.edit_text("❌ Операция отменена.")
                     return
                 
                 # Store article numbers in user state
-                user_state['article_numbers'] = article_numbers
+                user_state.article_numbers = article_numbers
             else:
                 # Skip article check
-                user_state['article_numbers'] = []
+                user_state.article_numbers = []
             
             # Reply based on photo count, mode, and found articles
-            mode = user_state.get('post_mode', 'multi')
+            mode = user_state.post_mode
             
             # Create detailed article info
-            if user_state.get('check_articles', True):
+            if user_state.check_articles:
                 if article_numbers:
                     articles_text = self.image_processor.format_articles_for_caption(article_numbers)
                     article_info = f"\n\n✅ <b>Найдены артикулы:</b>\n{articles_text}\n\n📝 Артикулы будут автоматически добавлены в описание поста"
@@ -246,12 +577,12 @@ class AdminHandler:
             if mode == 'single':
                 response_text = f"📷 <b>Фото загружено!</b>{article_info}\n\n📝 Теперь отправьте подпись к посту."
             else:
-                if len(user_state['photos']) == 1:
+                if len(user_state.photos) == 1:
                     response_text = f"📸 <b>Фото загружено!</b>{article_info}\n\n📸 Можете отправить ещё фото (до 10) или сразу подпись к посту."
                 else:
-                    response_text = f"📸 <b>Фото {len(user_state['photos'])} загружено.</b>{article_info}\n\n📸 Можете отправить ещё фото (до 10) или подпись к посту."
+                    response_text = f"📸 <b>Фото {len(user_state.photos)} загружено.</b>{article_info}\n\n📸 Можете отправить ещё фото (до 10) или подпись к посту."
             
-            if user_state.get('check_articles', True):
+            if user_state.check_articles:
                 await processing_msg.edit_text(response_text, parse_mode='HTML')
             else:
                 await update.message.reply_text(response_text, parse_mode='HTML')
@@ -277,16 +608,16 @@ class AdminHandler:
             user_state = self.get_user_state(update.effective_user.id)
             
             # Check if we're in the right step, or allow direct video upload
-            if user_state['step'] not in ['content_input', 'photos_upload']:
+            if user_state.step not in (Step.CONTENT_INPUT, Step.PHOTOS_UPLOAD):
                 # Allow direct video upload - set default values
-                user_state['post_mode'] = 'video'  # Video mode
-                user_state['target_platform'] = 'all'  # Telegram + VK (Instagram doesn't support video upload via API)
-                user_state['check_articles'] = False  # No article check for videos
-                user_state['step'] = 'content_input'
+                user_state.post_mode = 'video'  # Video mode
+                user_state.target_platform = 'all'  # Telegram + VK (Instagram doesn't support video upload via API)
+                user_state.check_articles = False  # No article check for videos
+                user_state.step = Step.CONTENT_INPUT
                 await update.message.reply_text("📹 Прямая загрузка видео! Режим: видео, платформы: Telegram + VK")
             
             # Auto-detect: video = video post mode
-            user_state['post_mode'] = 'video'
+            user_state.post_mode = 'video'
             
             # Get video
             video = update.message.video
@@ -297,9 +628,9 @@ class AdminHandler:
             await file.download_to_drive(video_path)
             
             # Save video path
-            user_state['reels_video_path'] = video_path
-            user_state['step'] = 'reels_waiting_caption'
-            user_state['waiting_for_caption'] = True
+            user_state.reels_video_path = video_path
+            user_state.step = Step.REELS_WAITING_CAPTION
+            user_state.waiting_for_caption = True
             
             # Send confirmation
             await update.message.reply_text(
@@ -312,6 +643,20 @@ class AdminHandler:
             logger.error(f"Error handling video: {e}")
             await update.message.reply_text(f"❌ Ошибка обработки видео: {str(e)}")
     
+    async def handle_text_or_time(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Route free text to the time parser while scheduling, otherwise to handle_text.
+        
+        Args:
+            update: Telegram update object
+            context: Bot context
+        """
+        if (self.is_admin(update.effective_user.id)
+                and self.get_user_state(update.effective_user.id).step is Step.SCHEDULING):
+            await self.handle_time_input(update, context)
+        else:
+            await self.handle_text(update, context)
+    
     async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
         Handle text messages from admin with auto-detection (captions, Instagram URLs, queue links).
@@ -328,19 +673,19 @@ class AdminHandler:
         text = update.message.text.strip()
         
         # Check if we're waiting for link for queue
-        if user_state.get('step') == 'waiting_for_link':
+        if user_state.step is Step.WAITING_FOR_LINK:
             await self.handle_link_input(update, context)
             return
         
         # AUTO-DETECT: Check if this is an Instagram URL when waiting for content
-        if user_state.get('step') == 'content_input':
+        if user_state.step is Step.CONTENT_INPUT:
             if 'instagram.com' in text or 'instagr.am' in text:
                 # Auto-detect Instagram URL
                 if '/reel/' in text:
                     # It's a reels URL
                     logger.info(f"Auto-detected Instagram reels URL: {text}")
-                    user_state['post_mode'] = 'reels'
-                    user_state['step'] = 'reels_url_input'
+                    user_state.post_mode = 'reels'
+                    user_state.step = Step.REELS_URL_INPUT
                     await self.handle_reels_url_input(update, context)
                     return
                 elif '/p/' in text:
@@ -363,20 +708,20 @@ class AdminHandler:
                     return
         
         # Check if we're waiting for reels URL (legacy path)
-        if user_state['step'] == 'reels_url_input':
+        if user_state.step is Step.REELS_URL_INPUT:
             await self.handle_reels_url_input(update, context)
             return
         
         # Check if we're waiting for caption for reels
-        if user_state['post_mode'] == 'reels' and user_state['step'] == 'reels_waiting_caption':
+        if user_state.post_mode == 'reels' and user_state.step is Step.REELS_WAITING_CAPTION:
             caption = update.message.text
             if not caption.strip():
                 await update.message.reply_text("Отправьте корректную подпись.")
                 return
             
             # Save caption to user state
-            user_state['caption'] = caption
-            user_state['step'] = 'caption_entered'
+            user_state.caption = caption
+            user_state.step = Step.CAPTION_ENTERED
             
             # Ask for scheduling
             platform_text = {
@@ -384,7 +729,7 @@ class AdminHandler:
                 'vk': 'VK',
                 'both': 'Telegram и VK',
                 'all': 'Telegram и VK'
-            }.get(user_state['target_platform'], 'неизвестно')
+            }.get(user_state.target_platform, 'неизвестно')
             
             message = f"""📋 <b>Готово к публикации!</b>
 
@@ -398,11 +743,11 @@ class AdminHandler:
             return
         
         # Check if we're waiting for caption
-        if not user_state['waiting_for_caption']:
+        if not user_state.waiting_for_caption:
             await update.message.reply_text("Сначала отправьте фото.")
             return
         
-        if not user_state['photos']:
+        if not user_state.photos:
             await update.message.reply_text(MESSAGES['no_photos'])
             return
         
@@ -412,13 +757,13 @@ class AdminHandler:
             return
         
         # Save caption to user state
-        user_state['caption'] = caption
+        user_state.caption = caption
         
         # Update step
-        user_state['step'] = 'caption_entered'
+        user_state.step = Step.CAPTION_ENTERED
         
         # Prepare caption with articles for preview
-        article_numbers = user_state.get('article_numbers', [])
+        article_numbers = user_state.article_numbers
         if article_numbers:
             articles_text = self.image_processor.format_articles_for_caption(article_numbers)
             preview_caption = f"{caption}\n\n{articles_text}"
@@ -427,8 +772,8 @@ class AdminHandler:
         
         # Show preview and ask for scheduling
         try:
-            if len(user_state['photos']) == 1:
-                with open(user_state['photos'][0], 'rb') as f:
+            if len(user_state.photos) == 1:
+                with open(user_state.photos[0], 'rb') as f:
                     preview_msg = await update.message.reply_photo(
                         photo=f,
                         caption=f"<b>Предпросмотр поста:</b>\n\n{preview_caption}",
@@ -436,20 +781,14 @@ class AdminHandler:
                     )
             else:
                 media = []
-                for i, p in enumerate(user_state['photos']):
+                for i, p in enumerate(user_state.photos):
                     with open(p, 'rb') as f:
                         media.append(InputMediaPhoto(media=f, caption=f"<b>Предпросмотр поста:</b>\n\n{preview_caption}" if i == 0 else None, parse_mode='HTML'))
                 preview_group = await update.message.reply_media_group(media=media)
                 preview_msg = preview_group[0] if preview_group else None
             
             # Ask for scheduling
-            platform_text = {
-                'instagram': 'Instagram',
-                'telegram': 'Telegram',
-                'vk': 'VK',
-                'both': 'Instagram и Telegram',
-                'all': 'Instagram, Telegram и VK'
-            }.get(user_state['target_platform'], 'неизвестно')
+            platform_text = _PLATFORM_LABELS.get(user_state.target_platform, 'неизвестно')
             
             # Add article information to preview message
             article_info = ""
@@ -461,8 +800,8 @@ class AdminHandler:
             message = f"""📋 <b>Предпросмотр готов!</b>
 
 <b>Платформа:</b> {platform_text}
-<b>Тип поста:</b> {'одиночный' if user_state['post_mode'] == 'single' else 'массовый'}
-<b>Количество фото:</b> {len(user_state['photos'])}{article_info}
+<b>Тип поста:</b> {'одиночный' if user_state.post_mode == 'single' else 'массовый'}
+<b>Количество фото:</b> {len(user_state.photos)}{article_info}
 
 <b>Шаг 4:</b> Выберите время публикации:"""
             
@@ -473,41 +812,25 @@ class AdminHandler:
             await update.message.reply_text(f"Ошибка предпросмотра: {e}")
             return
 
-    async def handle_publish_now(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.CAPTION_ENTERED)
+    async def handle_publish_now(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle immediate publishing."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'caption_entered':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
-        
         # Process and publish immediately
-        if user_state['post_mode'] == 'reels':
+        if user_state.post_mode == 'reels':
             await self._process_and_publish_reels(update, context, user_state, immediate=True)
         else:
             await self._process_and_publish(update, context, user_state, immediate=True)
 
-    async def handle_ai_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.CAPTION_ENTERED)
+    async def handle_ai_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle AI help for caption improvement."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'caption_entered':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
-        
         # Check if AI service is available
         if not self.ai_service.enabled:
             await update.message.reply_text("❌ ИИ сервис недоступен. Проверьте настройки GOOGLE_API_KEY.")
             return
         
         # Check if this is reels mode
-        is_reels = user_state.get('post_mode') == 'reels'
+        is_reels = user_state.post_mode == 'reels'
         
         # Show processing message
         if is_reels:
@@ -516,14 +839,14 @@ class AdminHandler:
             processing_msg = await update.message.reply_text("🤖 ИИ обрабатывает ваше описание...")
         
         # Check if cancelled before AI processing
-        if user_state.get('cancelled', False):
+        if user_state.cancel_event.is_set():
             await processing_msg.edit_text("❌ Операция отменена.")
             return
         
         try:
             if is_reels:
                 # For reels: get original caption from Instagram and adapt it
-                reels_url = user_state.get('reels_url')
+                reels_url = user_state.reels_url
                 if not reels_url:
                     await processing_msg.edit_text("❌ Ссылка на рилс не найдена!")
                     return
@@ -534,7 +857,7 @@ class AdminHandler:
                 
                 if not original_caption:
                     # If can't get original caption, use user's caption
-                    original_caption = user_state.get('caption', '')
+                    original_caption = user_state.caption
                     if not original_caption:
                         await processing_msg.edit_text("❌ Не удалось получить описание рилса. Попробуйте ввести описание вручную.")
                         return
@@ -545,12 +868,12 @@ class AdminHandler:
                 # Adapt caption with AI
                 adapted_caption = await self.ai_service.adapt_reels_caption(
                     original_caption,
-                    user_state['target_platform']
+                    user_state.target_platform
                 )
                 
                 if adapted_caption:
                     # Update caption in user state
-                    user_state['caption'] = adapted_caption
+                    user_state.caption = adapted_caption
                     
                     # Show adapted caption
                     await processing_msg.edit_text(
@@ -566,7 +889,7 @@ class AdminHandler:
                         'vk': 'VK',
                         'both': 'Telegram и VK',
                         'all': 'Telegram и VK'
-                    }.get(user_state['target_platform'], 'неизвестно')
+                    }.get(user_state.target_platform, 'неизвестно')
                     
                     message = f"""📋 <b>Готово к публикации!</b>
 
@@ -581,30 +904,30 @@ class AdminHandler:
                     await processing_msg.edit_text("❌ Не удалось адаптировать описание. Попробуйте еще раз.")
             else:
                 # For regular posts: improve user's caption
-                if not user_state.get('caption'):
+                if not user_state.caption:
                     await update.message.reply_text("❌ Подпись не найдена!")
                     return
                 
                 # Get article numbers from user state
-                article_numbers = user_state.get('article_numbers', [])
+                article_numbers = user_state.article_numbers
                 
                 # Prepare caption for AI improvement (only the description part, not articles)
-                caption_for_ai = user_state['caption']
+                caption_for_ai = user_state.caption
                 
                 # Get improved caption
                 improved_caption = await self.ai_service.improve_caption(
                     caption_for_ai, 
-                    user_state['target_platform']
+                    user_state.target_platform
                 )
                 
                 # Check if cancelled after AI processing
-                if user_state.get('cancelled', False):
+                if user_state.cancel_event.is_set():
                     await processing_msg.edit_text("❌ Операция отменена.")
                     return
                 
                 if improved_caption:
                     # Update caption in user state (only the description part)
-                    user_state['caption'] = improved_caption
+                    user_state.caption = improved_caption
                     
                     # Show improved caption
                     await processing_msg.edit_text(
@@ -621,19 +944,11 @@ class AdminHandler:
             logger.error(f"Error in AI help: {e}")
             await processing_msg.edit_text(f"❌ Ошибка ИИ: {e}")
 
-    async def handle_schedule_post(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.CAPTION_ENTERED)
+    async def handle_schedule_post(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle post scheduling."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'caption_entered':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
-        
         # Ask for time input
-        user_state['step'] = 'scheduling'
+        user_state.step = Step.SCHEDULING
         await update.message.reply_text(
             "⏰ <b>Планирование публикации</b>\n\n"
             "Отправьте время в формате:\n"
@@ -647,67 +962,36 @@ class AdminHandler:
             parse_mode='HTML'
         )
 
-    async def handle_time_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.SCHEDULING, "❌ Неверный шаг.")
+    async def handle_time_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle time input for scheduling."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'scheduling':
-            await update.message.reply_text("❌ Неверный шаг.")
-            return
-        
         time_input = update.message.text.strip()
-        scheduled_time = None
+        now = datetime.now()
         
         try:
-            now = datetime.now()
-            
-            if time_input.startswith('+'):
+            match = _TIME_RE.match(time_input)
+            if match is None:
+                raise ValueError(f"unrecognized time format: {time_input!r}")
+            if match['rel']:
                 # Relative time (e.g., +30)
-                minutes = int(time_input[1:])
-                scheduled_time = now + timedelta(minutes=minutes)
-            elif '.' in time_input:
+                scheduled_time = now + timedelta(minutes=int(match['rel']))
+            elif match['d']:
                 # Date and time (e.g., 25.12 10:00)
-                date_part, time_part = time_input.split()
-                day, month = map(int, date_part.split('.'))
-                hour, minute = map(int, time_part.split(':'))
-                scheduled_time = now.replace(month=month, day=day, hour=hour, minute=minute, second=0, microsecond=0)
+                scheduled_time = now.replace(
+                    month=int(match['m']), day=int(match['d']),
+                    hour=int(match['h1']), minute=int(match['min1']),
+                    second=0, microsecond=0
+                )
             else:
                 # Time only (e.g., 15:30)
-                hour, minute = map(int, time_input.split(':'))
-                scheduled_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                scheduled_time = now.replace(
+                    hour=int(match['h2']), minute=int(match['min2']),
+                    second=0, microsecond=0
+                )
                 # If time has passed today, schedule for tomorrow
                 if scheduled_time <= now:
                     scheduled_time += timedelta(days=1)
-            
-            if scheduled_time <= now:
-                await update.message.reply_text("❌ Время должно быть в будущем!")
-                return
-            
-            user_state['scheduled_time'] = scheduled_time
-            user_state['step'] = 'scheduled'
-            
-            # Show confirmation with cancel button
-            time_str = scheduled_time.strftime("%d.%m.%Y в %H:%M")
-            keyboard = [
-                [KeyboardButton("❌ Отмена")],
-            ]
-            cancel_keyboard = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-            
-            await update.message.reply_text(
-                f"⏰ <b>Публикация запланирована на {time_str}</b>\n\n"
-                f"Пост будет опубликован автоматически. "
-                f"Вы можете отменить планирование кнопкой ниже или командой /cancel",
-                parse_mode='HTML',
-                reply_markup=cancel_keyboard
-            )
-            
-            # Schedule the post
-            await self._schedule_post(update, context, user_state, scheduled_time)
-            
-        except Exception as e:
+        except (ValueError, OverflowError) as e:
             logger.error(f"Error parsing time: {e}")
             await update.message.reply_text(
                 "❌ Неверный формат времени!\n\n"
@@ -717,45 +1001,77 @@ class AdminHandler:
                 "• <code>+N</code> - через N минут",
                 parse_mode='HTML'
             )
+            return
+        
+        if scheduled_time <= now:
+            await update.message.reply_text("❌ Время должно быть в будущем!")
+            return
+        
+        user_state.scheduled_time = scheduled_time
+        user_state.step = Step.SCHEDULED
+        
+        # Show confirmation with cancel button
+        time_str = scheduled_time.strftime("%d.%m.%Y в %H:%M")
+        keyboard = [
+            [KeyboardButton("❌ Отмена")],
+        ]
+        cancel_keyboard = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        
+        await update.message.reply_text(
+            f"⏰ <b>Публикация запланирована на {time_str}</b>\n\n"
+            f"Пост будет опубликован автоматически. "
+            f"Вы можете отменить планирование кнопкой ниже или командой /cancel",
+            parse_mode='HTML',
+            reply_markup=cancel_keyboard
+        )
+        
+        # Schedule the post
+        await self._schedule_post(update, context, user_state, scheduled_time, now=now)
 
-    async def _schedule_post(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: Dict, scheduled_time: datetime) -> None:
+    async def _schedule_post(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState, scheduled_time: datetime, now: Optional[datetime] = None) -> None:
         """Schedule a post for later publishing."""
-        try:
-            # Calculate delay
-            delay = (scheduled_time - datetime.now()).total_seconds()
-            
-            if delay <= 0:
-                await update.message.reply_text("❌ Время должно быть в будущем!")
-                return
-            
-            # Create task
-            task = asyncio.create_task(self._delayed_publish(update, context, user_state, delay))
-            
-            # Store scheduled post
-            self.scheduled_posts[update.effective_user.id] = {
-                'task': task,
-                'post_data': {
-                    'photos': list(user_state['photos']),
-                    'caption': user_state.get('caption', ''),
-                    'target_platform': user_state['target_platform'],
-                    'scheduled_time': scheduled_time
-                }
+        # Calculate delay against the same 'now' the caller validated with
+        if now is None:
+            now = datetime.now()
+        delay = (scheduled_time - now).total_seconds()
+        
+        if delay <= 0:
+            await update.message.reply_text("❌ Время должно быть в будущем!")
+            return
+        
+        # Create task
+        user_id = update.effective_user.id
+        task = asyncio.create_task(self._delayed_publish(update, context, user_state, delay))
+        # Drop the entry however the task ends, so a failed publish can't leak it
+        task.add_done_callback(lambda t: self._forget_scheduled_post(user_id, t))
+        
+        # Store scheduled post
+        self.scheduled_posts[user_id] = {
+            'task': task,
+            'post_data': {
+                'photos': tuple(user_state.photos),
+                'caption': user_state.caption,
+                'target_platform': user_state.target_platform,
+                'scheduled_time': scheduled_time
             }
-            
-            logger.info(f"Post scheduled for {scheduled_time} (delay: {delay}s)")
-            
-        except Exception as e:
-            logger.error(f"Error scheduling post: {e}")
-            await update.message.reply_text(f"❌ Ошибка планирования: {e}")
+        }
+        
+        logger.info(f"Post scheduled for {scheduled_time} (delay: {delay}s)")
 
-    async def _delayed_publish(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: Dict, delay: float) -> None:
+    def _forget_scheduled_post(self, user_id: int, task: asyncio.Task) -> None:
+        """Remove the scheduled post entry if it still belongs to the given task."""
+        entry = self.scheduled_posts.get(user_id)
+        if entry is not None and entry['task'] is task:
+            self.scheduled_posts.pop(user_id, None)
+
+    async def _delayed_publish(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState, delay: float) -> None:
         """Delayed publishing function."""
         try:
             # Wait for the scheduled time
             await asyncio.sleep(delay)
             
             # Check if cancelled before publishing
-            if user_state.get('cancelled', False):
+            if user_state.cancel_event.is_set():
                 logger.info("Scheduled post was cancelled before publishing")
                 return
             
@@ -764,7 +1080,8 @@ class AdminHandler:
             
         except asyncio.CancelledError:
             logger.info("Scheduled post was cancelled")
-        except Exception as e:
+            raise
+        except (TelegramError, OSError, ValueError) as e:
             logger.error(f"Error in delayed publish: {e}")
             # Try to notify user about the error
             try:
@@ -775,163 +1092,216 @@ class AdminHandler:
             except Exception:
                 pass
 
-    async def _process_and_publish(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: Dict, immediate: bool = True) -> None:
-        """Process photos and publish to selected platforms."""
-        try:
-            # Get caption from user state or pending posts
-            caption = user_state.get('caption', '')
-            if not caption and update.effective_user.id in self.pending_posts:
-                caption = self.pending_posts[update.effective_user.id]['caption']
-            
-            if not caption:
-                await update.message.reply_text("❌ Подпись не найдена!")
-                return
-            
+    async def _throttled_edit(self, msg: Message, text: str) -> None:
+        """
+        Edit a progress message, spacing edits to stay under Telegram's edit rate limit.
+        
+        Edits that would not change the text are skipped.
+        
+        Args:
+            msg: Message to edit
+            text: New message text
+        """
+        key = (msg.chat_id, msg.message_id)
+        last = self._last_edit.get(key)
+        if last is not None:
+            last_ts, last_text = last
+            if text == last_text:
+                return
+            wait = self._edit_min_interval - (time.monotonic() - last_ts)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        await msg.edit_text(text)
+        
+        now = time.monotonic()
+        self._last_edit[key] = (now, text)
+        if len(self._last_edit) > 256:
+            # Entries older than the interval no longer delay anything
+            self._last_edit = {
+                k: v for k, v in self._last_edit.items()
+                if now - v[0] < self._edit_min_interval
+            }
+
+    def _cleanup_prepared(self, final_photos: List[str], photos: List[str]) -> None:
+        """
+        Delete the resized copies made by prepare_for_publish().
+        
+        Photos that were already publish-ready come back unchanged, so paths that
+        are also in the input list are left alone.
+        
+        Args:
+            final_photos: Paths returned by prepare_for_publish()
+            photos: Paths that were passed to it
+        """
+        self.image_processor.cleanup_files([p for p in final_photos if p not in photos])
+
+    async def _process_and_publish(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState, immediate: bool = True) -> None:
+        """Process photos and publish to selected platforms."""
+        try:
+            # Get caption from user state or pending posts
+            caption = user_state.caption
+            if not caption and update.effective_user.id in self.pending_posts:
+                caption = self.pending_posts[update.effective_user.id]['caption']
+            
+            if not caption:
+                await update.message.reply_text("❌ Подпись не найдена!")
+                return
+            
             # Show processing message
             processing_msg = await update.message.reply_text("⏳ Обрабатываю и публикую пост...")
             
             # Check if cancelled before processing
-            if user_state.get('cancelled', False):
-                await processing_msg.edit_text("❌ Операция отменена.")
+            if user_state.cancel_event.is_set():
+                await self._throttled_edit(processing_msg, "❌ Операция отменена.")
                 return
             
             # Get article numbers from user state (already found during photo upload)
-            article_numbers = user_state.get('article_numbers', [])
-            
-            # Process photos
-            processing_msg = await processing_msg.edit_text("📸 Обрабатываю фотографии...")
+            article_numbers = user_state.article_numbers
+            photos = user_state.photos
+            target_platform = user_state.target_platform
+            cancel_event = user_state.cancel_event
             
             # Check if cancelled before photo processing
-            if user_state.get('cancelled', False):
-                await processing_msg.edit_text("❌ Операция отменена.")
+            if cancel_event.is_set():
+                await self._throttled_edit(processing_msg, "❌ Операция отменена.")
                 return
             
-            processed_photos = self.image_processor.process_photos(user_state['photos'])
-            target_size = self.image_processor.determine_image_format(processed_photos)
-            final_photos = [self.image_processor.resize_image(p, target_size) for p in processed_photos]
-            
-            # Check if cancelled after photo processing
-            if user_state.get('cancelled', False):
-                await processing_msg.edit_text("❌ Операция отменена.")
-                # Cleanup processed photos
-                self.image_processor.cleanup_files(final_photos)
-                return
+            # Bound concurrent heavy publishes (e.g. several scheduled posts firing at once)
+            async with self._publish_sem:
+                # Validate and resize in one pass, off the event loop
+                loop = asyncio.get_running_loop()
+                prepare = loop.run_in_executor(
+                    None,
+                    self.image_processor.prepare_for_publish,
+                    photos
+                )
+                try:
+                    final_photos = await asyncio.wait_for(asyncio.shield(prepare), timeout=1.0)
+                except asyncio.TimeoutError:
+                    # Only show the intermediate step when this preparation is actually slow
+                    await self._throttled_edit(processing_msg, "📸 Обрабатываю фотографии...")
+                    final_photos = await prepare
+            
+                # Check if cancelled after photo processing
+                if cancel_event.is_set():
+                    await self._throttled_edit(processing_msg, "❌ Операция отменена.")
+                    # Cleanup processed photos
+                    self._cleanup_prepared(final_photos, photos)
+                    return
             
-            # Add article numbers to caption
-            if article_numbers:
-                articles_text = self.image_processor.format_articles_for_caption(article_numbers)
-                enhanced_caption = f"{caption}\n\n{articles_text}"
-                logger.info(f"Enhanced caption with articles: {enhanced_caption}")
-            else:
-                enhanced_caption = caption
-                # Only warn if user expected articles (check_articles=True) but none were found
-                if user_state.get('check_articles', False):
-                    logger.warning("No article numbers found despite check_articles=True, using original caption")
+                # Add article numbers to caption
+                if article_numbers:
+                    articles_text = self.image_processor.format_articles_for_caption(article_numbers)
+                    enhanced_caption = f"{caption}\n\n{articles_text}"
+                    logger.info(f"Enhanced caption with articles: {enhanced_caption}")
                 else:
-                    logger.info("Using original caption without article numbers (check_articles=False)")
-            
-            # Check if cancelled before publishing
-            if user_state.get('cancelled', False):
-                await processing_msg.edit_text("❌ Операция отменена.")
-                # Cleanup processed photos
-                self.image_processor.cleanup_files(final_photos)
-                return
-            
-            # Publish to selected platforms
-            instagram_success = False
-            telegram_success = False
-            vk_success = False
-            
-            if user_state['target_platform'] in ['instagram', 'both', 'all']:
-                # Check if cancelled before Instagram publishing
-                if user_state.get('cancelled', False):
-                    await processing_msg.edit_text("❌ Операция отменена.")
-                    self.image_processor.cleanup_files(final_photos)
-                    return
-                instagram_success = self.instagram_service.create_draft_with_music_instructions(final_photos, enhanced_caption)
+                    enhanced_caption = caption
+                    # Only warn if user expected articles (check_articles=True) but none were found
+                    if user_state.check_articles:
+                        logger.warning("No article numbers found despite check_articles=True, using original caption")
+                    else:
+                        logger.info("Using original caption without article numbers (check_articles=False)")
             
-            if user_state['target_platform'] in ['telegram', 'both', 'all']:
-                # Check if cancelled before Telegram publishing
-                if user_state.get('cancelled', False):
-                    await processing_msg.edit_text("❌ Операция отменена.")
-                    self.image_processor.cleanup_files(final_photos)
+                # Check if cancelled before publishing
+                if cancel_event.is_set():
+                    await self._throttled_edit(processing_msg, "❌ Операция отменена.")
+                    # Cleanup processed photos
+                    self._cleanup_prepared(final_photos, photos)
                     return
-                telegram_success = await self.telegram_service.post_to_telegram(final_photos, enhanced_caption)
             
-            if user_state['target_platform'] in ['vk', 'all']:
-                # Check if cancelled before VK publishing
-                if user_state.get('cancelled', False):
-                    await processing_msg.edit_text("❌ Операция отменена.")
-                    self.image_processor.cleanup_files(final_photos)
-                    return
-                vk_success = await self.vk_service.post_to_vk(final_photos, enhanced_caption)
+                # Publish to selected platforms. Cancellation is checked between
+                # platforms only: an upload that has started (the Instagram one runs
+                # in a thread) can't be interrupted, so it is always awaited.
+                publish_steps = []
+                if target_platform in ['instagram', 'both', 'all']:
+                    publish_steps.append(('Instagram', lambda: asyncio.to_thread(
+                        self.instagram_service.create_draft_with_music_instructions, final_photos, enhanced_caption
+                    )))
+                if target_platform in ['telegram', 'both', 'all']:
+                    publish_steps.append(('Telegram', lambda: self.telegram_service.post_to_telegram(final_photos, enhanced_caption)))
+                if target_platform in ['vk', 'all']:
+                    publish_steps.append(('VK', lambda: self.vk_service.post_to_vk(final_photos, enhanced_caption)))
+            
+                published = {}
+                for name, make_publish in publish_steps:
+                    if cancel_event.is_set():
+                        if published:
+                            await self._throttled_edit(
+                                processing_msg,
+                                f"❌ Операция отменена. Уже опубликовано: {', '.join(n for n, ok in published.items() if ok) or 'нигде'}."
+                            )
+                        else:
+                            await self._throttled_edit(processing_msg, "❌ Операция отменена.")
+                        self._cleanup_prepared(final_photos, photos)
+                        return
+                    published[name] = await self._rate_limited(name, make_publish())
+                instagram_success = published.get('Instagram', False)
+                telegram_success = published.get('Telegram', False)
+                vk_success = published.get('VK', False)
             
             # Send results
+            success_platforms = [
+                name for name, ok in (('Instagram', instagram_success), ('Telegram', telegram_success), ('VK', vk_success))
+                if ok
+            ]
             if immediate:
                 article_info = f"\n\n📋 Найдено артикулов: {len(article_numbers)}" if article_numbers else "\n\n📋 Артикулы не найдены"
-                
-                # Build success message based on which platforms succeeded
-                success_platforms = []
-                if instagram_success:
-                    success_platforms.append('Instagram')
-                if telegram_success:
-                    success_platforms.append('Telegram')
-                if vk_success:
-                    success_platforms.append('VK')
-                
                 if success_platforms:
-                    platforms_text = ', '.join(success_platforms)
-                    message = f"✅ Пост опубликован в {platforms_text}!{article_info}"
-                    if instagram_success:
-                        message += "\n\n🎵 ВАЖНО: Зайдите в Instagram и добавьте новогоднюю музыку к посту!"
-                    await processing_msg.edit_text(message)
+                    await self._throttled_edit(processing_msg, self._build_success_message(success_platforms, article_info))
                 else:
-                    await processing_msg.edit_text(f"❌ Не удалось опубликовать пост ни на одной платформе.{article_info}")
+                    await self._throttled_edit(processing_msg, f"❌ Не удалось опубликовать пост ни на одной платформе.{article_info}")
             else:
-                # Scheduled post results
-                success_platforms = []
-                if instagram_success:
-                    success_platforms.append('Instagram')
-                if telegram_success:
-                    success_platforms.append('Telegram')
-                if vk_success:
-                    success_platforms.append('VK')
-                
                 if success_platforms:
-                    platforms_text = ', '.join(success_platforms)
-                    message = f"✅ Запланированный пост опубликован в {platforms_text}!"
-                    if instagram_success:
-                        message += "\n\n🎵 ВАЖНО: Зайдите в Instagram и добавьте новогоднюю музыку к посту!"
-                    await self.telegram_service.send_notification(update.effective_user.id, message)
+                    await self.telegram_service.send_notification(
+                        update.effective_user.id,
+                        self._build_success_message(success_platforms, scheduled=True)
+                    )
                 else:
                     await self.telegram_service.send_error_notification(update.effective_user.id, "Не удалось опубликовать запланированный пост")
             
-            # Cleanup
-            self.image_processor.cleanup_files(final_photos)
+            # Cleanup (the original photos go with the user state)
+            self._cleanup_prepared(final_photos, photos)
             self.clear_user_state(update.effective_user.id)
             
-            # Remove from scheduled posts
-            if update.effective_user.id in self.scheduled_posts:
-                del self.scheduled_posts[update.effective_user.id]
-            
         except Exception as e:
             logger.error(f"Error processing and publishing: {e}")
             await update.message.reply_text(f"❌ Ошибка публикации: {e}")
             self.clear_user_state(update.effective_user.id)
 
-    async def _show_preview_with_caption(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: Dict, caption: str) -> None:
+    @staticmethod
+    def _build_success_message(platforms: List[str], article_info: str = "", scheduled: bool = False,
+                               reels: bool = False) -> str:
+        """
+        Build the user-facing message for a successful publish.
+        
+        Args:
+            platforms: Names of the platforms the post was published to
+            article_info: Optional article summary appended to the message
+            scheduled: Whether this was a scheduled post
+            reels: Whether a reel was published rather than a photo post
+            
+        Returns:
+            str: Formatted success message
+        """
+        prefix = _SUCCESS_PREFIXES[scheduled, reels]
+        message = f"{prefix} {', '.join(platforms)}!{article_info}"
+        if 'Instagram' in platforms and not reels:
+            message += "\n\n🎵 ВАЖНО: Зайдите в Instagram и добавьте новогоднюю музыку к посту!"
+        return message
+
+    async def _show_preview_with_caption(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState, caption: str) -> None:
         """Show preview with given caption and ask for scheduling."""
         try:
             # Prepare full caption with articles for preview
-            article_numbers = user_state.get('article_numbers', [])
+            article_numbers = user_state.article_numbers
             if article_numbers:
                 articles_text = self.image_processor.format_articles_for_caption(article_numbers)
                 full_caption = f"{caption}\n\n{articles_text}"
             else:
                 full_caption = caption
             
-            if len(user_state['photos']) == 1:
-                with open(user_state['photos'][0], 'rb') as f:
+            if len(user_state.photos) == 1:
+                with open(user_state.photos[0], 'rb') as f:
                     preview_msg = await update.message.reply_photo(
                         photo=f,
                         caption=f"<b>Предпросмотр поста:</b>\n\n{full_caption}",
@@ -939,23 +1309,17 @@ class AdminHandler:
                     )
             else:
                 media = []
-                for i, p in enumerate(user_state['photos']):
+                for i, p in enumerate(user_state.photos):
                     with open(p, 'rb') as f:
                         media.append(InputMediaPhoto(media=f, caption=f"<b>Предпросмотр поста:</b>\n\n{full_caption}" if i == 0 else None, parse_mode='HTML'))
                 preview_group = await update.message.reply_media_group(media=media)
                 preview_msg = preview_group[0] if preview_group else None
             
             # Ask for scheduling
-            platform_text = {
-                'instagram': 'Instagram',
-                'telegram': 'Telegram',
-                'vk': 'VK',
-                'both': 'Instagram и Telegram',
-                'all': 'Instagram, Telegram и VK'
-            }.get(user_state['target_platform'], 'неизвестно')
+            platform_text = _PLATFORM_LABELS.get(user_state.target_platform, 'неизвестно')
             
             # Add article information to preview message
-            article_numbers = user_state.get('article_numbers', [])
+            article_numbers = user_state.article_numbers
             article_info = ""
             if article_numbers:
                 article_info = f"\n<b>Найдено артикулов:</b> {len(article_numbers)} ({', '.join(article_numbers)})"
@@ -965,8 +1329,8 @@ class AdminHandler:
             message = f"""📋 <b>Предпросмотр готов!</b>
 
 <b>Платформа:</b> {platform_text}
-<b>Тип поста:</b> {'одиночный' if user_state['post_mode'] == 'single' else 'массовый'}
-<b>Количество фото:</b> {len(user_state['photos'])}{article_info}
+<b>Тип поста:</b> {'одиночный' if user_state.post_mode == 'single' else 'массовый'}
+<b>Количество фото:</b> {len(user_state.photos)}{article_info}
 
 <b>Шаг 4:</b> Выберите время публикации:"""
             
@@ -1009,27 +1373,25 @@ class AdminHandler:
             caption = pending['caption']
             target_platform = pending.get('target_platform', 'both')
             try:
-                processed_photos = self.image_processor.process_photos(photos)
-                target_size = self.image_processor.determine_image_format(processed_photos)
-                final_photos = [self.image_processor.resize_image(p, target_size) for p in processed_photos]
+                loop = asyncio.get_running_loop()
+                final_photos = await loop.run_in_executor(None, self.image_processor.prepare_for_publish, photos)
                 ig_ok = False
                 tg_ok = False
                 vk_ok = False
                 if target_platform in ('instagram', 'both', 'all'):
-                    ig_ok = self.instagram_service.post_to_instagram(final_photos, caption)
+                    ig_ok = await self._rate_limited('Instagram', asyncio.to_thread(
+                        self.instagram_service.post_to_instagram, final_photos, caption
+                    ))
                 if target_platform in ('telegram', 'both', 'all'):
-                    tg_ok = await self.telegram_service.post_to_telegram(final_photos, caption)
+                    tg_ok = await self._rate_limited('Telegram', self.telegram_service.post_to_telegram(final_photos, caption))
                 if target_platform in ('vk', 'all'):
-                    vk_ok = await self.vk_service.post_to_vk(final_photos, caption)
+                    vk_ok = await self._rate_limited('VK', self.vk_service.post_to_vk(final_photos, caption))
                 
                 # Build success message
-                success_platforms = []
-                if ig_ok:
-                    success_platforms.append('Instagram')
-                if tg_ok:
-                    success_platforms.append('Telegram')
-                if vk_ok:
-                    success_platforms.append('VK')
+                success_platforms = [
+                    name for name, ok in (('Instagram', ig_ok), ('Telegram', tg_ok), ('VK', vk_ok))
+                    if ok
+                ]
                 
                 if success_platforms:
                     platforms_text = ', '.join(success_platforms)
@@ -1041,7 +1403,9 @@ class AdminHandler:
                 await cq.edit_message_text(f"Ошибка публикации: {e}")
             finally:
                 try:
-                    self.image_processor.cleanup_files(final_photos if 'final_photos' in locals() else photos)
+                    self.image_processor.cleanup_files(photos)
+                    if 'final_photos' in locals():
+                        self._cleanup_prepared(final_photos, photos)
                 except Exception:
                     pass
                 self.pending_posts.pop(user_id, None)
@@ -1062,15 +1426,18 @@ class AdminHandler:
         user_id = update.effective_user.id
         
         # Cancel scheduled posts if any
-        if user_id in self.scheduled_posts:
+        scheduled = self.scheduled_posts.pop(user_id, None)
+        if scheduled is not None:
             try:
-                self.scheduled_posts[user_id]['task'].cancel()
-                del self.scheduled_posts[user_id]
+                scheduled['task'].cancel()
                 await update.message.reply_text(MESSAGES['cancelled_scheduled'])
             except Exception as e:
                 logger.error(f"Error cancelling scheduled post: {e}")
         
-        # Clear user state
+        # Signal cancellation to any in-flight operation, then clear user state
+        state = self.user_states.get(user_id)
+        if state is not None:
+            state.cancel_event.set()
         self.clear_user_state(user_id)
         await update.message.reply_text(MESSAGES['cancelled'], reply_markup=self.get_main_keyboard())
     
@@ -1090,41 +1457,41 @@ class AdminHandler:
         user_state = self.get_user_state(user_id)
         
         # Get current step for logging
-        current_step = user_state.get('step', 'start')
-        logger.info(f"User {user_id} cancelled operation at step: {current_step}")
+        current_step = user_state.step
+        logger.info(f"User {user_id} cancelled operation at step: {current_step.name}")
         
         # Cancel scheduled posts if any
-        if user_id in self.scheduled_posts:
+        scheduled = self.scheduled_posts.pop(user_id, None)
+        if scheduled is not None:
             try:
-                self.scheduled_posts[user_id]['task'].cancel()
-                del self.scheduled_posts[user_id]
+                scheduled['task'].cancel()
                 await update.message.reply_text(MESSAGES['cancelled_scheduled'])
             except Exception as e:
                 logger.error(f"Error cancelling scheduled post: {e}")
         
-        # Set cancelled flag before clearing state
-        user_state['cancelled'] = True
+        # Signal cancellation (wakes any in-flight publish) before clearing state
+        user_state.cancel_event.set()
         
         # Clear user state and cleanup files
         self.clear_user_state(user_id)
         
         # Send cancellation message based on current step
         step_messages = {
-            'start': "❌ Операция отменена.",
-            'type_selection': "❌ Выбор типа поста отменен.",
-            'platform_selection': "❌ Выбор платформы отменен.",
-            'article_check_selection': "❌ Выбор проверки артикулов отменен.",
-            'photos_upload': "❌ Загрузка фото отменена.",
-            'photos_uploaded': "❌ Обработка фото отменена.",
-            'caption_entered': "❌ Публикация отменена.",
-            'preview_shown': "❌ Превью отменено.",
-            'scheduling': "❌ Планирование отменено.",
-            'scheduled': "❌ Запланированная публикация отменена.",
+            Step.START: "❌ Операция отменена.",
+            Step.TYPE_SELECTION: "❌ Выбор типа поста отменен.",
+            Step.PLATFORM_SELECTION: "❌ Выбор платформы отменен.",
+            Step.ARTICLE_CHECK_SELECTION: "❌ Выбор проверки артикулов отменен.",
+            Step.PHOTOS_UPLOAD: "❌ Загрузка фото отменена.",
+            Step.PHOTOS_UPLOADED: "❌ Обработка фото отменена.",
+            Step.CAPTION_ENTERED: "❌ Публикация отменена.",
+            Step.PREVIEW_SHOWN: "❌ Превью отменено.",
+            Step.SCHEDULING: "❌ Планирование отменено.",
+            Step.SCHEDULED: "❌ Запланированная публикация отменена.",
         }
         
         # Get additional info for scheduled posts
         additional_info = ""
-        if current_step == 'scheduled' and user_id in self.scheduled_posts:
+        if current_step is Step.SCHEDULED and user_id in self.scheduled_posts:
             scheduled_time = self.scheduled_posts[user_id]['post_data']['scheduled_time']
             additional_info = f"\n\n⏰ Запланированное время: {scheduled_time.strftime('%d.%m.%Y в %H:%M')}"
         
@@ -1147,39 +1514,35 @@ class AdminHandler:
             return
         
         try:
-            # Check Instagram status
-            instagram_status = "✅ Подключено" if self.instagram_service.is_logged_in() else "❌ Нет подключения"
-            
-            # Check Telegram status
-            telegram_status = "✅ Подключено" if await self.telegram_service.test_connection() else "❌ Нет подключения"
-            
-            # Check VK status
-            vk_status = "✅ Подключено" if self.vk_service.test_connection() else "❌ Нет подключения"
-            
-            # Check AI service status
-            ai_status = "✅ Подключено" if self.ai_service.enabled and await self.ai_service.test_connection() else "❌ Нет подключения"
+            # Probe all services concurrently (sync probes run in threads)
+            ig_task = asyncio.to_thread(self.instagram_service.is_logged_in)
+            tg_task = self.telegram_service.test_connection()
+            vk_task = asyncio.to_thread(self.vk_service.test_connection)
+            ai_task = self.ai_service.test_connection() if self.ai_service.enabled else asyncio.sleep(0, result=False)
+            results = await asyncio.gather(ig_task, tg_task, vk_task, ai_task, return_exceptions=True)
+            instagram_status, telegram_status, vk_status, ai_status = map(self._connection_status, results)
             
             # Get user state
             user_state = self.get_user_state(update.effective_user.id)
             step_names = {
-                'start': 'Начало',
-                'type_selection': 'Выбор типа',
-                'platform_selection': 'Выбор платформы',
-                'article_check_selection': 'Выбор проверки артикулов',
-                'photos_upload': 'Загрузка фото',
-                'photos_uploaded': 'Фото загружены',
-                'caption_entered': 'Подпись введена',
-                'preview_shown': 'Превью показано',
-                'scheduling': 'Планирование',
-                'scheduled': 'Запланировано'
+                Step.START: 'Начало',
+                Step.TYPE_SELECTION: 'Выбор типа',
+                Step.PLATFORM_SELECTION: 'Выбор платформы',
+                Step.ARTICLE_CHECK_SELECTION: 'Выбор проверки артикулов',
+                Step.PHOTOS_UPLOAD: 'Загрузка фото',
+                Step.PHOTOS_UPLOADED: 'Фото загружены',
+                Step.CAPTION_ENTERED: 'Подпись введена',
+                Step.PREVIEW_SHOWN: 'Превью показано',
+                Step.SCHEDULING: 'Планирование',
+                Step.SCHEDULED: 'Запланировано'
             }
             
             state_info = (
-                f"Шаг: {step_names.get(user_state.get('step', 'start'), 'Неизвестно')}, "
-                f"Фото: {len(user_state['photos'])}, "
-                f"Режим: {user_state.get('post_mode','auto')}, "
-                f"Цель: {user_state.get('target_platform','both')}, "
-                f"Артикулы: {'включен' if user_state.get('check_articles', True) else 'отключен'}"
+                f"Шаг: {step_names.get(user_state.step, 'Неизвестно')}, "
+                f"Фото: {len(user_state.photos)}, "
+                f"Режим: {user_state.post_mode}, "
+                f"Цель: {user_state.target_platform}, "
+                f"Артикулы: {'включен' if user_state.check_articles else 'отключен'}"
             )
             
             # Check for scheduled posts
@@ -1188,18 +1551,7 @@ class AdminHandler:
                 scheduled_time = self.scheduled_posts[update.effective_user.id]['post_data']['scheduled_time']
                 scheduled_info = f"\n⏰ <b>Запланированная публикация:</b> {scheduled_time.strftime('%d.%m.%Y в %H:%M')}"
             
-            status_message = f"""🤖 <b>Статус бота</b>
-
-📸 <b>Instagram:</b> {instagram_status}
-💬 <b>Telegram:</b> {telegram_status}
-🔵 <b>VK:</b> {vk_status}
-🤖 <b>ИИ сервис:</b> {ai_status}
-
-👤 <b>Ваше состояние:</b> {state_info}{scheduled_info}
-
-<b>Команды:</b>
-/cancel - очистить состояние
-/reset - сбросить Instagram сессию"""
+            status_message = _STATUS_TMPL % (instagram_status, telegram_status, vk_status, ai_status, state_info, scheduled_info)
             
             # Create keyboard with reset button
             keyboard = [
@@ -1215,6 +1567,11 @@ class AdminHandler:
             logger.error(f"Error getting status: {e}")
             await update.message.reply_text(f"Ошибка получения статуса: {str(e)}")
     
+    @staticmethod
+    def _connection_status(result) -> str:
+        """Render a connection probe result (bool or exception) as a status string."""
+        return "✅ Подключено" if result is True else "❌ Нет подключения"
+    
     async def handle_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
         Handle help command from admin.
@@ -1227,141 +1584,42 @@ class AdminHandler:
             await update.message.reply_text(MESSAGES['unauthorized'])
             return
         
-        help_message = """🤖 <b>Помощь - Автопостер с умным определением</b>
-
-<b>📋 Автоматическая публикация:</b>
-1. ➕ Нажмите "Добавить ссылку"
-2. 📎 Отправьте ссылку на пост/рилс из Instagram
-3. ✅ Пост добавится в очередь
-4. ⏰ Будет опубликован автоматически в расписанное время
-
-<b>🚀 Ручная публикация (УПРОЩЁННАЯ!):</b>
-1. 🚀 Нажмите "Начать публикацию"
-2. 📱 Выберите платформу (Instagram/Telegram/VK/Все)
-3. 🔍 Выберите поиск артикулов (Да/Нет)
-4. 📤 Отправьте ЛЮБОЙ контент:
-   • 📷 Фото (одно или несколько)
-   • 📹 Видео файл
-   • 🔗 Ссылку на Instagram рилс
-5. 📝 Отправьте подпись к посту
-6. 🤖 Используйте "Помощь ИИ" для улучшения
-7. ⏰ Выберите время (сейчас/запланировать)
-
-<b>✨ Автоопределение типа:</b>
-Бот сам определит что вы отправили:
-• Фото → пост с фотографиями
-• Видео → видео пост
-• Ссылка /reel/ → скачает рилс
-Больше не нужно выбирать тип!
-
-<b>⏰ Расписание публикаций:</b>
-Фиксированные часы: 8, 10, 12, 14, 16, 18, 20, 22
-Раз в 2 часа публикуется один пост из очереди
+        await update.message.reply_text(_HELP_HTML, parse_mode='HTML', reply_markup=self.get_main_keyboard())
 
-<b>📋 Управление очередью:</b>
-/add_link — добавить ссылку
-/queue — посмотреть очередь
-📋 Очередь постов — просмотр
-🗑️ Очистить опубликованные
-❌ Очистить все
-
-<b>🛠️ Основные команды:</b>
-/start — запуск
-/help — помощь
-/status — статус бота
-/cancel — отмена
-/reset — сброс Instagram сессии
-
-<b>📝 Планирование разовых постов:</b>
-• <code>HH:MM</code> - сегодня в указанное время
-• <code>DD.MM HH:MM</code> - в указанную дату и время
-• <code>+N</code> - через N минут
-
-<b>🤖 ИИ помощь:</b>
-• Улучшает описания постов
-• Добавляет эмодзи и хештеги
-• Адаптирует стиль под платформу
-• Требует настройки GOOGLE_API_KEY
-
-<b>📌 Примечания:</b>
-• Автоопределение типа контента
-• Очередь сохраняется при перезапуске
-• Фото автоматически обрабатываются
-• Поддержка фото, видео и рилсов
-• Доступ только у администратора
-
-📖 Подробнее: см. SCHEDULER_GUIDE.md"""
-        
-        await update.message.reply_text(help_message, parse_mode='HTML', reply_markup=self.get_main_keyboard())
-
-    async def handle_type_single(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.TYPE_SELECTION)
+    async def handle_type_single(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle single post type selection."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'type_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
+        user_state.post_mode = 'single'
+        user_state.step = Step.PLATFORM_SELECTION
         
-        user_state['post_mode'] = 'single'
-        user_state['step'] = 'platform_selection'
-        
-        message = """📷 <b>Одиночный пост выбран</b>
-
-<b>Шаг 2:</b> Выберите платформу для публикации:
-
-📷 <b>Instagram</b> - только Instagram
-💬 <b>Telegram</b> - только Telegram группа  
-🔀 <b>Обе платформы</b> - Instagram + Telegram"""
+        message = _MSG_TYPE_SINGLE
         
         await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_platform_selection_keyboard())
 
-    async def handle_type_multi(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.TYPE_SELECTION)
+    async def handle_type_multi(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle multi post type selection."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'type_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
+        user_state.post_mode = 'multi'
+        user_state.step = Step.PLATFORM_SELECTION
         
-        user_state['post_mode'] = 'multi'
-        user_state['step'] = 'platform_selection'
-        
-        message = """📸 <b>Массовый пост выбран</b>
-
-<b>Шаг 2:</b> Выберите платформу для публикации:
-
-📷 <b>Instagram</b> - только Instagram
-💬 <b>Telegram</b> - только Telegram группа  
-🔀 <b>Обе платформы</b> - Instagram + Telegram"""
+        message = _MSG_TYPE_MULTI
         
         await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_platform_selection_keyboard())
 
-    async def handle_mode_single(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step()
+    async def handle_mode_single(self, update: Update, context: ContextTypes.DEFAULT_TYPE, state: UserState) -> None:
         """Switch to single-post mode (only one photo)."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        state = self.get_user_state(update.effective_user.id)
-        state['post_mode'] = 'single'
+        state.post_mode = 'single'
         # If there are more than one photo collected, keep only the last one
-        if len(state['photos']) > 1:
-            self.image_processor.cleanup_files(state['photos'][:-1])
-            state['photos'] = state['photos'][-1:]
+        if len(state.photos) > 1:
+            self.image_processor.cleanup_files(state.photos[:-1])
+            state.photos = state.photos[-1:]
         await update.message.reply_text("Режим: одиночный пост. Будет использовано только одно фото.")
 
-    async def handle_mode_multi(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step()
+    async def handle_mode_multi(self, update: Update, context: ContextTypes.DEFAULT_TYPE, state: UserState) -> None:
         """Switch to multi-post mode (allow multiple photos)."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        state = self.get_user_state(update.effective_user.id)
-        state['post_mode'] = 'multi'
+        state.post_mode = 'multi'
         await update.message.reply_text("Режим: массовый пост. Можно отправить 2–10 фото перед подписью.")
     
     async def handle_start_publication(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1381,24 +1639,10 @@ class AdminHandler:
         
         # Start the business process - go straight to platform selection
         user_state = self.get_user_state(update.effective_user.id)
-        user_state['step'] = 'platform_selection'
-        user_state['post_mode'] = 'auto'  # Auto-detect mode
+        user_state.step = Step.PLATFORM_SELECTION
+        user_state.post_mode = 'auto'  # Auto-detect mode
         
-        message = """🚀 <b>Начинаем процесс публикации</b>
-
-<b>Шаг 1:</b> Выберите платформу для публикации:
-
-📷 <b>Instagram</b> - только Instagram
-💬 <b>Telegram</b> - только Telegram группа
-🔵 <b>VK</b> - только VK группа
-🔀 <b>Все платформы</b> - Instagram + Telegram + VK
-
-<i>💡 После выбора платформы отправьте:</i>
-• Фото (одно или несколько)
-• Видео
-• Ссылку на Instagram пост/рилс
-
-<i>Бот автоматически определит тип контента!</i>"""
+        message = _MSG_START_PUBLICATION
         
         await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_platform_selection_keyboard())
 
@@ -1416,21 +1660,12 @@ class AdminHandler:
         
         await update.message.reply_text(MESSAGES['welcome'], reply_markup=self.get_main_keyboard())
 
-    # Button handlers (map buttons to existing commands)
-    async def handle_btn_single(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        await self.handle_mode_single(update, context)
-
-    async def handle_btn_multi(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        await self.handle_mode_multi(update, context)
-
-    async def handle_btn_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        await self.handle_status(update, context)
-
-    async def handle_btn_cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        await self.handle_cancel(update, context)
-
-    async def handle_btn_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        await self.handle_help(update, context)
+    # Button handlers (aliases of the existing commands, no extra await frame)
+    handle_btn_single = handle_mode_single
+    handle_btn_multi = handle_mode_multi
+    handle_btn_status = handle_status
+    handle_btn_cancel = handle_cancel
+    handle_btn_help = handle_help
     
     async def handle_reset_instagram(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -1448,39 +1683,18 @@ class AdminHandler:
         try:
             processing_msg = await update.message.reply_text(
                 "🔄 <b>Сбрасываю Instagram сессию...</b>\n\n"
-                "Шаг 1/3: Удаление старой сессии...",
-                parse_mode='HTML'
-            )
-            
-            # Use the new reset_session method from InstagramService
-            import asyncio
-            
-            # Update message
-            await processing_msg.edit_text(
-                "🔄 <b>Сбрасываю Instagram сессию...</b>\n\n"
-                "✅ Шаг 1/3: Старая сессия удалена\n"
-                "⏳ Шаг 2/3: Пересоздание клиента...",
+                "Удаление старой сессии и новая авторизация...",
                 parse_mode='HTML'
             )
             
-            # Small delay to show progress
-            await asyncio.sleep(0.5)
-            
-            # Update message
-            await processing_msg.edit_text(
-                "🔄 <b>Сбрасываю Instagram сессию...</b>\n\n"
-                "✅ Шаг 1/3: Старая сессия удалена\n"
-                "✅ Шаг 2/3: Клиент пересоздан\n"
-                "⏳ Шаг 3/3: Новая авторизация...",
-                parse_mode='HTML'
-            )
-            
-            # Reset session using the service method
-            reset_success = self.instagram_service.reset_session()
+            # Reset session using the service method (blocking login, run off the event loop)
+            loop = asyncio.get_running_loop()
+            reset_success = await loop.run_in_executor(None, self.instagram_service.reset_session)
             
             if reset_success:
                 # Verify login
-                if self.instagram_service.is_logged_in():
+                logged_in = await loop.run_in_executor(None, self.instagram_service.is_logged_in)
+                if logged_in:
                     await processing_msg.edit_text(
                         "✅ <b>Instagram сессия успешно обновлена!</b>\n\n"
                         "✅ Шаг 1/3: Старая сессия удалена\n"
@@ -1536,218 +1750,71 @@ class AdminHandler:
                 parse_mode='HTML'
             )
 
-    async def handle_platform_instagram(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        """Handle Instagram platform selection."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'platform_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
+    async def _select_platform(self, update: Update, user_state: UserState, platform: str) -> None:
+        """
+        Store the chosen target platform and ask about article search.
         
-        user_state['target_platform'] = 'instagram'
-        user_state['step'] = 'article_check_selection'
+        Args:
+            update: Telegram update object
+            user_state: Caller's user state
+            platform: Target platform key ('instagram', 'telegram', 'vk', 'all')
+        """
+        user_state.target_platform = platform
+        user_state.step = Step.ARTICLE_CHECK_SELECTION
         
-        message = """📷 <b>Instagram выбран</b>
-
-<b>Шаг 2:</b> Нужно ли искать артикулы на фотографиях?
+        await update.message.reply_text(_MSG_PLATFORM_SELECTED[platform], parse_mode='HTML', reply_markup=_KB_ARTICLE_CHECK)
 
-🔍 <b>Да, искать артикулы</b> - бот автоматически найдет номера товаров и добавит их в пост
-⏭️ <b>Нет, пропустить</b> - загрузить без поиска артикулов
-
-<i>💡 На следующем шаге отправьте:</i>
-• Фото (одно или несколько до 10)
-• Видео файл
-• Ссылку на Instagram пост/рилс"""
-        
-        await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_article_check_keyboard())
+    @requires_admin_step(Step.PLATFORM_SELECTION)
+    async def handle_platform_instagram(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
+        """Handle Instagram platform selection."""
+        await self._select_platform(update, user_state, 'instagram')
 
-    async def handle_platform_telegram(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.PLATFORM_SELECTION)
+    async def handle_platform_telegram(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle Telegram platform selection."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'platform_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
-        
-        user_state['target_platform'] = 'telegram'
-        user_state['step'] = 'article_check_selection'
-        
-        message = """💬 <b>Telegram выбран</b>
-
-<b>Шаг 2:</b> Нужно ли искать артикулы на фотографиях?
+        await self._select_platform(update, user_state, 'telegram')
 
-🔍 <b>Да, искать артикулы</b> - бот автоматически найдет номера товаров и добавит их в пост
-⏭️ <b>Нет, пропустить</b> - загрузить без поиска артикулов
-
-<i>💡 На следующем шаге отправьте:</i>
-• Фото (одно или несколько до 10)
-• Видео файл
-• Ссылку на Instagram пост/рилс"""
-        
-        await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_article_check_keyboard())
-
-    async def handle_platform_vk(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.PLATFORM_SELECTION)
+    async def handle_platform_vk(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle VK platform selection."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'platform_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
-        
-        user_state['target_platform'] = 'vk'
-        user_state['step'] = 'article_check_selection'
-        
-        message = """🔵 <b>VK выбран</b>
-
-<b>Шаг 2:</b> Нужно ли искать артикулы на фотографиях?
+        await self._select_platform(update, user_state, 'vk')
 
-🔍 <b>Да, искать артикулы</b> - бот автоматически найдет номера товаров и добавит их в пост
-⏭️ <b>Нет, пропустить</b> - загрузить без поиска артикулов
-
-<i>💡 На следующем шаге отправьте:</i>
-• Фото (одно или несколько до 10)
-• Видео файл
-• Ссылку на Instagram пост/рилс"""
-        
-        await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_article_check_keyboard())
-
-    async def handle_platform_both(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.PLATFORM_SELECTION)
+    async def handle_platform_both(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle all platforms selection."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'platform_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
-        
-        user_state['target_platform'] = 'all'
-        user_state['step'] = 'article_check_selection'
-        
-        message = """🔀 <b>Все платформы выбраны</b>
-
-<b>Шаг 2:</b> Нужно ли искать артикулы на фотографиях?
-
-🔍 <b>Да, искать артикулы</b> - бот автоматически найдет номера товаров и добавит их в пост
-⏭️ <b>Нет, пропустить</b> - загрузить без поиска артикулов
-
-<i>💡 На следующем шаге отправьте:</i>
-• Фото (одно или несколько до 10)
-• Видео файл
-• Ссылку на Instagram пост/рилс"""
-        
-        await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_article_check_keyboard())
+        await self._select_platform(update, user_state, 'all')
 
-    async def handle_article_check_yes(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.ARTICLE_CHECK_SELECTION)
+    async def handle_article_check_yes(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle article check selection - yes."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
+        user_state.check_articles = True
+        user_state.step = Step.CONTENT_INPUT
         
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'article_check_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
+        platform_text = _PLATFORM_LABELS.get(user_state.target_platform, 'неизвестно')
         
-        user_state['check_articles'] = True
-        user_state['step'] = 'content_input'
-        
-        platform_text = {
-            'instagram': 'Instagram',
-            'telegram': 'Telegram',
-            'vk': 'VK',
-            'both': 'Instagram и Telegram',
-            'all': 'Instagram, Telegram и VK'
-        }.get(user_state['target_platform'], 'неизвестно')
-        
-        message = f"""🔍 <b>Поиск артикулов включен</b>
-
-<b>Шаг 3:</b> Отправьте контент для публикации
-
-📱 <b>Платформа:</b> {platform_text}
-🔍 <b>Поиск артикулов:</b> включен
-
-📤 <b>Отправьте:</b>
-• 📷 Фото (одно или несколько до 10)
-• 📹 Видео файл
-• 🔗 Ссылку на Instagram пост/рилс
-
-<i>Бот автоматически определит тип контента!</i>"""
+        message = _MSG_CONTENT_INPUT_TMPL % ("🔍 <b>Поиск артикулов включен</b>", platform_text, "включен")
         
         await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_content_input_keyboard())
 
-    async def handle_article_check_no(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.ARTICLE_CHECK_SELECTION)
+    async def handle_article_check_no(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle article check selection - no."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'article_check_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
+        user_state.check_articles = False
+        user_state.step = Step.CONTENT_INPUT
         
-        user_state['check_articles'] = False
-        user_state['step'] = 'content_input'
+        platform_text = _PLATFORM_LABELS.get(user_state.target_platform, 'неизвестно')
         
-        platform_text = {
-            'instagram': 'Instagram',
-            'telegram': 'Telegram',
-            'vk': 'VK',
-            'both': 'Instagram и Telegram',
-            'all': 'Instagram, Telegram и VK'
-        }.get(user_state['target_platform'], 'неизвестно')
-        
-        message = f"""⏭️ <b>Поиск артикулов пропущен</b>
-
-<b>Шаг 3:</b> Отправьте контент для публикации
-
-📱 <b>Платформа:</b> {platform_text}
-🔍 <b>Поиск артикулов:</b> отключен
-
-📤 <b>Отправьте:</b>
-• 📷 Фото (одно или несколько до 10)
-• 📹 Видео файл
-• 🔗 Ссылку на Instagram пост/рилс
-
-<i>Бот автоматически определит тип контента!</i>"""
+        message = _MSG_CONTENT_INPUT_TMPL % ("⏭️ <b>Поиск артикулов пропущен</b>", platform_text, "отключен")
         
         await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_content_input_keyboard())
     
-    async def handle_type_reels(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.TYPE_SELECTION)
+    async def handle_type_reels(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle reels type selection."""
-        if not self.is_admin(update.effective_user.id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(update.effective_user.id)
-        if user_state['step'] != 'type_selection':
-            await update.message.reply_text("❌ Неверный шаг. Начните с /start")
-            return
+        user_state.post_mode = 'reels'
+        user_state.step = Step.PLATFORM_SELECTION
         
-        user_state['post_mode'] = 'reels'
-        user_state['step'] = 'platform_selection'
-        
-        message = """📹 <b>Публикация рилс выбрана</b>
-
-<b>Шаг 2:</b> Выберите платформу для публикации:
-
-📷 <b>Instagram</b> - публикация как обычный видео-пост
-💬 <b>Telegram</b> - только Telegram группа  
-🔵 <b>VK</b> - только VK группа
-🔀 <b>Все платформы</b> - Instagram + Telegram + VK
-
-<i>Примечание: В Instagram видео будет опубликовано как обычный пост, не как reels</i>"""
+        message = _MSG_TYPE_REELS
         
         # Use standard platform keyboard with Instagram option
         await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_platform_selection_keyboard())
@@ -1761,7 +1828,7 @@ class AdminHandler:
         user_state = self.get_user_state(user_id)
         
         # Set cancellation flag
-        user_state['cancel_download'] = True
+        user_state.cancel_download = True
         
         await query.edit_message_text(
             "⏹️ <b>Отмена скачивания...</b>\n\n"
@@ -1769,83 +1836,78 @@ class AdminHandler:
             parse_mode='HTML'
         )
     
-    async def handle_reels_url_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    @requires_admin_step(Step.REELS_URL_INPUT, None)  # Not waiting for URL: ignore
+    async def handle_reels_url_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState) -> None:
         """Handle reels URL input with progress tracking and cancellation."""
         user_id = update.effective_user.id
         
-        if not self.is_admin(user_id):
-            await update.message.reply_text(MESSAGES['unauthorized'])
-            return
-        
-        user_state = self.get_user_state(user_id)
-        
-        # Check if we're waiting for URL
-        if user_state['step'] != 'reels_url_input':
-            return  # Not waiting for URL, ignore
-        
         # Get URL from message
         reels_url = update.message.text.strip()
         
         # Validate URL
-        if not ('instagram.com' in reels_url or 'instagr.am' in reels_url):
+        if not _INSTA_RE.match(reels_url):
             await update.message.reply_text("❌ Неверная ссылка! Отправьте корректную ссылку на рилс из Instagram.")
             return
         
-        user_state['reels_url'] = reels_url
-        user_state['step'] = 'reels_download'
-        user_state['cancel_download'] = False  # Reset cancel flag
+        user_state.reels_url = reels_url
+        user_state.step = Step.REELS_DOWNLOAD
+        user_state.cancel_download = False  # Reset cancel flag
         
         # Show processing message with cancel button
-        cancel_keyboard = InlineKeyboardMarkup([[
-            InlineKeyboardButton("⏹️ Отменить", callback_data="cancel_download")
-        ]])
-        
         processing_msg = await update.message.reply_text(
             "⏳ <b>Скачиваю рилс из Instagram...</b>\n\n"
             "📊 Подготовка к скачиванию...",
             parse_mode='HTML',
-            reply_markup=cancel_keyboard
+            reply_markup=_CANCEL_KB
         )
         
-        last_update_time = [asyncio.get_event_loop().time()]  # Use list to allow modification in nested function
+        loop = asyncio.get_running_loop()
+        # Last shown progress: time, percent in tenths, bytes (mutated by the nested callback)
+        progress_state = {'t': loop.time(), 'tenth': -1, 'bytes': 0}
         
         # Progress callback
         async def progress_callback(downloaded: int, total: int):
             """Update progress message."""
             try:
-                current_time = asyncio.get_event_loop().time()
+                current_time = loop.time()
                 # Update only every 2 seconds to avoid rate limiting
-                if current_time - last_update_time[0] >= 2:
-                    downloaded_mb = downloaded / (1024 * 1024)
+                if current_time - progress_state['t'] < 2:
+                    return
+                # ...and only when the shown numbers would actually change
+                tenth = int(downloaded * 1000 / total) if total > 0 else -1
+                if tenth == progress_state['tenth'] and downloaded - progress_state['bytes'] < 512 * 1024:
+                    return
+                
+                downloaded_mb = downloaded / (1024 * 1024)
+                
+                if total > 0:
+                    percent = tenth / 10
+                    total_mb = total / (1024 * 1024)
+                    progress_bar = _PROGRESS_BARS[min(int(percent / 5), 20)]
                     
-                    if total > 0:
-                        percent = (downloaded / total) * 100
-                        total_mb = total / (1024 * 1024)
-                        progress_bar = "█" * int(percent / 5) + "░" * (20 - int(percent / 5))
-                        
-                        logger.info(f"Progress update: {percent:.1f}% ({downloaded_mb:.2f}/{total_mb:.2f} MB)")
-                        
-                        await processing_msg.edit_text(
-                            f"⏳ <b>Скачиваю рилс из Instagram...</b>\n\n"
-                            f"📊 Прогресс: {percent:.1f}%\n"
-                            f"[{progress_bar}]\n\n"
-                            f"💾 Скачано: {downloaded_mb:.2f} МБ / {total_mb:.2f} МБ",
-                            parse_mode='HTML',
-                            reply_markup=cancel_keyboard
-                        )
-                    else:
-                        # Total size unknown - show only downloaded
-                        logger.info(f"Progress update: {downloaded_mb:.2f} MB downloaded (total size unknown)")
-                        
-                        await processing_msg.edit_text(
-                            f"⏳ <b>Скачиваю рилс из Instagram...</b>\n\n"
-                            f"📊 Скачивание...\n"
-                            f"💾 Скачано: {downloaded_mb:.2f} МБ",
-                            parse_mode='HTML',
-                            reply_markup=cancel_keyboard
-                        )
+                    logger.info(f"Progress update: {percent:.1f}% ({downloaded_mb:.2f}/{total_mb:.2f} MB)")
+                    
+                    await processing_msg.edit_text(
+                        _PROG_TMPL_WITH_TOTAL.format_map({
+                            'percent': percent, 'bar': progress_bar,
+                            'dmb': downloaded_mb, 'tmb': total_mb,
+                        }),
+                        parse_mode='HTML',
+                        reply_markup=_CANCEL_KB
+                    )
+                else:
+                    # Total size unknown - show only downloaded
+                    logger.info(f"Progress update: {downloaded_mb:.2f} MB downloaded (total size unknown)")
                     
-                    last_update_time[0] = current_time
+                    await processing_msg.edit_text(
+                        _PROG_TMPL_NO_TOTAL.format_map({'dmb': downloaded_mb}),
+                        parse_mode='HTML',
+                        reply_markup=_CANCEL_KB
+                    )
+                
+                progress_state['t'] = current_time
+                progress_state['tenth'] = tenth
+                progress_state['bytes'] = downloaded
             except Exception as e:
                 logger.error(f"Error updating progress UI: {e}")
                 import traceback
@@ -1853,40 +1915,43 @@ class AdminHandler:
         
         # Cancel check callback
         def cancel_check():
-            """Check if download should be cancelled."""
-            return user_state.get('cancel_download', False)
+            """Check if download should be cancelled (runs in the download thread's copied context)."""
+            return CURRENT_STATE.get().cancel_download
         
         # Download video
         video_path = None
+        # Latest (downloaded, total) reported by the download thread; a single
+        # slot replaced atomically, rendered by one drain task on the loop
+        latest_progress = [None]
         try:
-            # Get event loop reference before entering executor
-            main_loop = asyncio.get_event_loop()
-            
-            # Sync wrapper for progress callback (non-blocking)
             def sync_progress_callback(downloaded: int, total: int):
-                """Non-blocking wrapper for async progress callback."""
-                try:
-                    # Use main loop reference (not get_event_loop() which won't work in thread)
-                    asyncio.run_coroutine_threadsafe(
-                        progress_callback(downloaded, total),
-                        main_loop
-                    )
-                except Exception as e:
-                    logger.error(f"Error in sync progress callback wrapper: {e}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
+                """Record download progress from the worker thread (no loop round-trip)."""
+                latest_progress[0] = (downloaded, total)
+            
+            async def drain_progress():
+                """Render the most recent progress every couple of seconds."""
+                while True:
+                    await asyncio.sleep(2)
+                    if latest_progress[0] is not None:
+                        await progress_callback(*latest_progress[0])
             
             logger.info(f"Starting reels download from: {reels_url}")
             
-            # Download reels with progress and cancel callbacks
-            video_path = await main_loop.run_in_executor(
-                None,
-                lambda: self.instagram_service.download_reels(
-                    reels_url,
-                    progress_callback=sync_progress_callback,
-                    cancel_check=cancel_check
+            drain_task = asyncio.create_task(drain_progress())
+            try:
+                # Download reels with progress and cancel callbacks
+                # Run in a copy of the current context so cancel_check sees CURRENT_STATE
+                video_path = await loop.run_in_executor(
+                    None,
+                    contextvars.copy_context().run,
+                    lambda: self.instagram_service.download_reels(
+                        reels_url,
+                        progress_callback=sync_progress_callback,
+                        cancel_check=cancel_check
+                    )
                 )
-            )
+            finally:
+                drain_task.cancel()
             
             logger.info(f"Download completed, video_path: {video_path}")
             
@@ -1897,18 +1962,18 @@ class AdminHandler:
                 f"<code>{str(e)}</code>",
                 parse_mode='HTML'
             )
-            user_state['step'] = 'reels_url_input'
+            user_state.step = Step.REELS_URL_INPUT
             return
         
         # Check if cancelled
-        if user_state.get('cancel_download', False):
+        if user_state.cancel_download:
             await processing_msg.edit_text(
                 "❌ <b>Скачивание отменено</b>\n\n"
                 "Вы можете начать новую публикацию.",
                 parse_mode='HTML'
             )
-            user_state['step'] = 'start'
-            user_state['cancel_download'] = False
+            user_state.step = Step.START
+            user_state.cancel_download = False
             return
         
         if not video_path:
@@ -1917,12 +1982,12 @@ class AdminHandler:
                 "Проверьте ссылку и попробуйте снова.",
                 parse_mode='HTML'
             )
-            user_state['step'] = 'reels_url_input'
+            user_state.step = Step.REELS_URL_INPUT
             return
         
         # Video downloaded successfully - update state FIRST
-        user_state['reels_video_path'] = video_path
-        user_state['step'] = 'reels_waiting_caption'
+        user_state.reels_video_path = video_path
+        user_state.step = Step.REELS_WAITING_CAPTION
         
         # Show success message
         await processing_msg.edit_text(
@@ -1933,8 +1998,13 @@ class AdminHandler:
         
         # Send video preview (in separate try-catch to preserve state if this fails)
         try:
-            # Check file size (Telegram has 50MB limit for videos)
-            file_size = os.path.getsize(video_path)
+            # Check file size (Telegram has 50MB limit for videos); the final progress
+            # report already has it, otherwise stat the file off the event loop
+            last_progress = latest_progress[0]
+            if last_progress is not None and last_progress[1] > 0 and last_progress[0] == last_progress[1]:
+                file_size = last_progress[0]
+            else:
+                file_size = await loop.run_in_executor(None, os.path.getsize, video_path)
             file_size_mb = file_size / (1024 * 1024)
             logger.info(f"Video file size: {file_size_mb:.2f} MB")
             
@@ -1949,15 +2019,17 @@ class AdminHandler:
                 logger.info(f"Sending video preview to user {user_id}")
                 # Use asyncio.wait_for to add overall timeout
                 async def send_video():
-                    with open(video_path, 'rb') as video:
-                        await update.message.reply_video(
-                            video=video,
-                            caption="<b>✅ Предпросмотр рилса</b>\n\n📝 Теперь отправьте подпись к посту:",
-                            parse_mode='HTML',
-                            read_timeout=180,
-                            write_timeout=180,
-                            connect_timeout=60
-                        )
+                    # Read the file in a worker thread; PTB would otherwise read it on the event loop
+                    video_bytes = await asyncio.to_thread(self._read_file_bytes, video_path)
+                    await update.message.reply_video(
+                        video=video_bytes,
+                        filename=os.path.basename(video_path),
+                        caption="<b>✅ Предпросмотр рилса</b>\n\n📝 Теперь отправьте подпись к посту:",
+                        parse_mode='HTML',
+                        read_timeout=180,
+                        write_timeout=180,
+                        connect_timeout=60
+                    )
                 
                 # Set overall timeout to 5 minutes
                 await asyncio.wait_for(send_video(), timeout=300)
@@ -1978,16 +2050,53 @@ class AdminHandler:
                 parse_mode='HTML'
             )
     
-    async def _process_and_publish_reels(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: Dict, immediate: bool = True) -> None:
+    async def _rate_limited(self, platform: str, publish: Awaitable):
+        """
+        Await a publish call while holding the platform's concurrency slot.
+        
+        Args:
+            platform: Platform name ('Instagram', 'Telegram' or 'VK')
+            publish: Awaitable performing the upload; must not start before it is awaited
+            
+        Returns:
+            The result of the publish call
+        """
+        async with self._platform_sems[platform]:
+            return await publish
+    
+    async def _publish_concurrently(self, publishers: Dict[str, Awaitable]) -> Dict[str, bool]:
+        """
+        Await platform publish calls concurrently; one failing doesn't stop the others.
+        
+        Args:
+            publishers: Platform name -> awaitable returning the publish result
+            
+        Returns:
+            Dict[str, bool]: Platform name -> whether publishing succeeded
+        """
+        results = await asyncio.gather(
+            *(self._rate_limited(name, publish) for name, publish in publishers.items()),
+            return_exceptions=True
+        )
+        published = {}
+        for name, result in zip(publishers, results):
+            if isinstance(result, Exception):
+                logger.error(f"{name} publishing failed: {result}")
+                result = False
+            logger.info(f"{name} publishing result: {result}")
+            published[name] = bool(result)
+        return published
+
+    async def _process_and_publish_reels(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_state: UserState, immediate: bool = True) -> None:
         """Process and publish reels to selected platforms."""
         try:
             # Get caption from user state
-            caption = user_state.get('caption', '')
+            caption = user_state.caption
             if not caption:
                 await update.message.reply_text("❌ Подпись не найдена!")
                 return
             
-            video_path = user_state.get('reels_video_path')
+            video_path = user_state.reels_video_path
             if not video_path:
                 await update.message.reply_text("❌ Видео не найдено!")
                 return
@@ -1996,93 +2105,50 @@ class AdminHandler:
             processing_msg = await update.message.reply_text("⏳ Публикую рилс...")
             
             # Check if cancelled before publishing
-            if user_state.get('cancelled', False):
-                await processing_msg.edit_text("❌ Операция отменена.")
+            if user_state.cancel_event.is_set():
+                await self._throttled_edit(processing_msg, "❌ Операция отменена.")
                 return
             
-            # Publish to selected platforms
-            instagram_success = False
-            telegram_success = False
-            vk_success = False
-            
-            if user_state['target_platform'] in ['instagram', 'both', 'all']:
-                # Check if cancelled before Instagram publishing
-                if user_state.get('cancelled', False):
-                    await processing_msg.edit_text("❌ Операция отменена.")
-                    return
-                logger.info("Publishing to Instagram...")
-                # Instagram post_video is synchronous, run in executor
-                import asyncio
-                loop = asyncio.get_event_loop()
-                instagram_success = await loop.run_in_executor(
-                    None,
-                    self.instagram_service.post_video,
-                    video_path,
-                    caption
-                )
-                logger.info(f"Instagram publishing result: {instagram_success}")
-            
-            if user_state['target_platform'] in ['telegram', 'both', 'all']:
-                # Check if cancelled before Telegram publishing
-                if user_state.get('cancelled', False):
-                    await processing_msg.edit_text("❌ Операция отменена.")
-                    return
-                logger.info("Publishing to Telegram...")
-                telegram_success = await self.telegram_service.post_video(video_path, caption)
-                logger.info(f"Telegram publishing result: {telegram_success}")
-            
-            if user_state['target_platform'] in ['vk', 'all']:
-                # Check if cancelled before VK publishing
-                if user_state.get('cancelled', False):
-                    await processing_msg.edit_text("❌ Операция отменена.")
-                    return
-                logger.info("Publishing to VK...")
-                vk_success = await self.vk_service.post_video(video_path, caption)
-                logger.info(f"VK publishing result: {vk_success}")
-            
-            # Send results
+            # Publish to the selected platforms in parallel; one platform failing
+            # doesn't stop the others
+            target_platform = user_state.target_platform
+            publishers = {}
+            if target_platform in ['instagram', 'both', 'all']:
+                # Instagram post_video is synchronous, run it in a thread once its slot is free
+                publishers['Instagram'] = asyncio.to_thread(self.instagram_service.post_video, video_path, caption)
+            if target_platform in ['telegram', 'both', 'all']:
+                publishers['Telegram'] = self.telegram_service.post_video(video_path, caption)
+            if target_platform in ['vk', 'all']:
+                publishers['VK'] = self.vk_service.post_video(video_path, caption)
+            
+            logger.info(f"Publishing reels to {', '.join(publishers)}...")
+            # Uploads that have started can't be interrupted (Instagram runs in a
+            # thread), so a cancel arriving now is too late and results are reported as is
+            published = await self._publish_concurrently(publishers)
+            if user_state.cancel_event.is_set():
+                logger.info("Reels publish was cancelled after uploads had started")
+            
+            # Send results; publishers were added in Instagram, Telegram, VK order
+            success_platforms = [name for name, ok in published.items() if ok]
             if immediate:
-                # Build success message based on which platforms succeeded
-                success_platforms = []
-                if instagram_success:
-                    success_platforms.append('Instagram')
-                if telegram_success:
-                    success_platforms.append('Telegram')
-                if vk_success:
-                    success_platforms.append('VK')
-                
                 if success_platforms:
-                    platforms_text = ', '.join(success_platforms)
-                    message = f"✅ Рилс опубликован в {platforms_text}!"
-                    await processing_msg.edit_text(message)
+                    await self._throttled_edit(processing_msg, self._build_success_message(success_platforms, reels=True))
                 else:
-                    await processing_msg.edit_text("❌ Не удалось опубликовать рилс ни на одной платформе.")
+                    await self._throttled_edit(processing_msg, "❌ Не удалось опубликовать рилс ни на одной платформе.")
             else:
-                # Scheduled post results
-                success_platforms = []
-                if instagram_success:
-                    success_platforms.append('Instagram')
-                if telegram_success:
-                    success_platforms.append('Telegram')
-                if vk_success:
-                    success_platforms.append('VK')
-                
                 if success_platforms:
-                    platforms_text = ', '.join(success_platforms)
-                    message = f"✅ Запланированный рилс опубликован в {platforms_text}!"
-                    await self.telegram_service.send_notification(update.effective_user.id, message)
+                    await self.telegram_service.send_notification(
+                        update.effective_user.id,
+                        self._build_success_message(success_platforms, scheduled=True, reels=True)
+                    )
                 else:
                     await self.telegram_service.send_error_notification(update.effective_user.id, "Не удалось опубликовать запланированный рилс")
             
             # Cleanup
-            if video_path and os.path.exists(video_path):
-                os.remove(video_path)
+            if video_path:
+                Path(video_path).unlink(missing_ok=True)
             self.clear_user_state(update.effective_user.id)
             
-            # Remove from scheduled posts
-            if update.effective_user.id in self.scheduled_posts:
-                del self.scheduled_posts[update.effective_user.id]
-            
         except Exception as e:
             logger.error(f"Error processing and publishing reels: {e}")
             await update.message.reply_text(f"❌ Ошибка публикации рилса: {e}")
@@ -2103,7 +2169,7 @@ class AdminHandler:
         user_state = self.get_user_state(update.effective_user.id)
         
         # Set state to waiting for link
-        user_state['step'] = 'waiting_for_link'
+        user_state.step = Step.WAITING_FOR_LINK
         
         message = """➕ <b>Добавление ссылки в очередь</b>
 
@@ -2132,39 +2198,34 @@ class AdminHandler:
         user_state = self.get_user_state(update.effective_user.id)
         
         # Check if we're waiting for link
-        if user_state.get('step') != 'waiting_for_link':
+        if user_state.step is not Step.WAITING_FOR_LINK:
             return
         
         url = update.message.text.strip()
         
         # Validate URL
-        if not ('instagram.com' in url or 'instagr.am' in url):
+        if not _INSTA_RE.match(url):
             await update.message.reply_text("❌ Неверная ссылка! Отправьте корректную ссылку на пост/рилс из Instagram.")
             return
         
         # Add to queue
-        try:
-            post = self.scheduler_service.add_to_queue(url, platform='all')
-            
-            # Get schedule info
-            schedule_info = self.scheduler_service.get_schedule_info()
-            
-            message = f"""✅ <b>Ссылка добавлена в очередь!</b>
+        post = self.scheduler_service.add_to_queue(url, platform='all')
+        
+        # Get schedule info
+        schedule_info = self.scheduler_service.get_schedule_info()
+        
+        message = f"""✅ <b>Ссылка добавлена в очередь!</b>
 
 📎 <b>URL:</b> {url[:50]}...
 🆔 <b>ID:</b> {post.id}
 📅 <b>Добавлено:</b> {datetime.fromisoformat(post.added_at).strftime('%d.%m.%Y %H:%M')}
 
 {schedule_info}"""
-            
-            await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_main_keyboard())
-            
-            # Clear state
-            user_state['step'] = 'start'
-            
-        except Exception as e:
-            logger.error(f"Error adding link to queue: {e}")
-            await update.message.reply_text(f"❌ Ошибка добавления ссылки: {e}")
+        
+        await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_main_keyboard())
+        
+        # Clear state
+        user_state.step = Step.START
     
     async def handle_view_queue(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -2178,23 +2239,21 @@ class AdminHandler:
             await update.message.reply_text(MESSAGES['unauthorized'])
             return
         
-        try:
-            # Get all posts from queue
-            all_posts = self.scheduler_service.get_queue()
-            pending_posts = self.scheduler_service.get_pending_posts()
-            
-            if not all_posts:
-                message = """📋 <b>Очередь постов пуста</b>
+        # Get all posts from queue
+        all_posts = self.scheduler_service.get_queue()
+        
+        if not all_posts:
+            message = """📋 <b>Очередь постов пуста</b>
 
 Используйте кнопку "➕ Добавить ссылку" для добавления постов в очередь."""
-                await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_main_keyboard())
-                return
-            
-            # Get schedule info
-            schedule_info = self.scheduler_service.get_schedule_info()
-            
-            # Build message with queue details
-            message = f"""📋 <b>Очередь постов</b>
+            await update.message.reply_text(message, parse_mode='HTML', reply_markup=self.get_main_keyboard())
+            return
+        
+        # Get schedule info
+        schedule_info = self.scheduler_service.get_schedule_info()
+        
+        # Build message with queue details
+        parts = [f"""📋 <b>Очередь постов</b>
 
 {schedule_info}
 
@@ -2202,41 +2261,43 @@ class AdminHandler:
 
 <b>Посты в очереди:</b>
 
-"""
-            
-            # Group posts by status
-            statuses = {
-                'pending': '⏳ В ожидании',
-                'processing': '🔄 Обрабатывается',
-                'published': '✅ Опубликован',
-                'failed': '❌ Ошибка'
-            }
-            
-            for status, status_text in statuses.items():
-                posts_with_status = [p for p in all_posts if p.status == status]
-                if posts_with_status:
-                    message += f"\n<b>{status_text}:</b> {len(posts_with_status)}\n"
-                    for post in posts_with_status[:5]:  # Show max 5 per status
-                        url_short = post.url[:40] + '...' if len(post.url) > 40 else post.url
-                        added = datetime.fromisoformat(post.added_at).strftime('%d.%m %H:%M')
-                        message += f"  • {url_short}\n    ID: {post.id} | {added}\n"
-                    
-                    if len(posts_with_status) > 5:
-                        message += f"  ... и ещё {len(posts_with_status) - 5}\n"
-            
-            # Add management buttons
-            keyboard = [
-                [KeyboardButton("🗑️ Очистить опубликованные"), KeyboardButton("❌ Очистить все")],
-                [KeyboardButton("🚀 Начать публикацию"), KeyboardButton("➕ Добавить ссылку")],
-                [KeyboardButton("✅ Status"), KeyboardButton("ℹ️ Help")],
-            ]
-            queue_keyboard = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-            
-            await update.message.reply_text(message, parse_mode='HTML', reply_markup=queue_keyboard)
-            
-        except Exception as e:
-            logger.error(f"Error viewing queue: {e}")
-            await update.message.reply_text(f"❌ Ошибка просмотра очереди: {e}")
+"""]
+        
+        # Group posts by status
+        statuses = {
+            'pending': '⏳ В ожидании',
+            'processing': '🔄 Обрабатывается',
+            'published': '✅ Опубликован',
+            'failed': '❌ Ошибка'
+        }
+        
+        buckets = defaultdict(list)
+        for p in all_posts:
+            buckets[p.status].append(p)
+        
+        for status, status_text in statuses.items():
+            posts_with_status = buckets.get(status, ())
+            if posts_with_status:
+                parts.append(f"\n<b>{status_text}:</b> {len(posts_with_status)}\n")
+                for post in posts_with_status[:5]:  # Show max 5 per status
+                    url_short = post.url[:40] + '...' if len(post.url) > 40 else post.url
+                    added = datetime.fromisoformat(post.added_at).strftime('%d.%m %H:%M')
+                    parts.append(f"  • {url_short}\n    ID: {post.id} | {added}\n")
+                
+                if len(posts_with_status) > 5:
+                    parts.append(f"  ... и ещё {len(posts_with_status) - 5}\n")
+        
+        message = "".join(parts)
+        
+        # Add management buttons
+        keyboard = [
+            [KeyboardButton("🗑️ Очистить опубликованные"), KeyboardButton("❌ Очистить все")],
+            [KeyboardButton("🚀 Начать публикацию"), KeyboardButton("➕ Добавить ссылку")],
+            [KeyboardButton("✅ Status"), KeyboardButton("ℹ️ Help")],
+        ]
+        queue_keyboard = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+        
+        await update.message.reply_text(message, parse_mode='HTML', reply_markup=queue_keyboard)
     
     async def handle_clear_published(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Clear published posts from queue."""
@@ -2244,16 +2305,11 @@ class AdminHandler:
             await update.message.reply_text(MESSAGES['unauthorized'])
             return
         
-        try:
-            published_count = len(self.scheduler_service.get_queue(status='published'))
-            self.scheduler_service.clear_queue(status='published')
-            
-            message = f"✅ Очищено опубликованных постов: {published_count}"
-            await update.message.reply_text(message, reply_markup=self.get_main_keyboard())
-            
-        except Exception as e:
-            logger.error(f"Error clearing published posts: {e}")
-            await update.message.reply_text(f"❌ Ошибка: {e}")
+        published_count = len(self.scheduler_service.get_queue(status='published'))
+        self.scheduler_service.clear_queue(status='published')
+        
+        message = f"✅ Очищено опубликованных постов: {published_count}"
+        await update.message.reply_text(message, reply_markup=self.get_main_keyboard())
     
     async def handle_clear_all_queue(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Clear entire queue."""
@@ -2261,17 +2317,88 @@ class AdminHandler:
             await update.message.reply_text(MESSAGES['unauthorized'])
             return
         
-        try:
-            total_count = len(self.scheduler_service.get_queue())
-            self.scheduler_service.clear_queue()
-            
-            message = f"✅ Очередь полностью очищена. Удалено постов: {total_count}"
-            await update.message.reply_text(message, reply_markup=self.get_main_keyboard())
+        total_count = len(self.scheduler_service.get_queue())
+        self.scheduler_service.clear_queue()
+        
+        message = f"✅ Очередь полностью очищена. Удалено постов: {total_count}"
+        await update.message.reply_text(message, reply_markup=self.get_main_keyboard())
+    
+    async def _download_post_photos(self, url: str) -> Optional[Tuple[List[str], str]]:
+        """
+        Download the photos of an Instagram post for the queue.
+        
+        Args:
+            url: Instagram post URL
             
-        except Exception as e:
-            logger.error(f"Error clearing queue: {e}")
-            await update.message.reply_text(f"❌ Ошибка: {e}")
+        Returns:
+            (photo paths, caption), or None if nothing could be downloaded
+        """
+        logger.info("Detected regular post URL, downloading photos...")
+        
+        # instagrapi blocks, so run it in threads
+        if not await asyncio.to_thread(self.instagram_service.is_logged_in):
+            if not await asyncio.to_thread(self.instagram_service.login):
+                logger.error("Failed to login to Instagram")
+                return None
+        
+        media_pk = self.instagram_service.client.media_pk_from_url(url)
+        media_info = await asyncio.to_thread(self.instagram_service.client.media_info, media_pk)
+        
+        # Download photos
+        from config import UPLOADS_DIR
+        photo_paths = []
+        
+        if media_info.media_type == 1:  # Single photo
+            photo_path = await asyncio.to_thread(
+                self.instagram_service.client.photo_download, media_pk, folder=UPLOADS_DIR
+            )
+            photo_paths = [str(photo_path)]
+        elif media_info.media_type == 8:  # Album
+            photo_resources = [r for r in media_info.resources if r.media_type == 1 and r.thumbnail_url]
+            if photo_resources:
+                photo_paths = await self._download_album_photos(media_pk, photo_resources, UPLOADS_DIR)
+            else:
+                album_path = await asyncio.to_thread(
+                    self.instagram_service.client.album_download, media_pk, folder=UPLOADS_DIR
+                )
+                # album_download returns a list of paths
+                photo_paths = [str(p) for p in album_path] if isinstance(album_path, list) else [str(album_path)]
+        
+        if not photo_paths:
+            logger.error("No photos downloaded")
+            return None
+        
+        # Get caption
+        caption = media_info.caption_text if media_info.caption_text else "📸 Новый пост"
+        return photo_paths, caption
     
+    async def _download_album_photos(self, media_pk, resources: List, folder: str) -> List[str]:
+        """
+        Download album photos concurrently (at most 8 requests in flight).
+        
+        Args:
+            media_pk: Album media PK, used to name the files
+            resources: instagrapi album resources with a thumbnail_url
+            folder: Directory for the downloaded photos
+            
+        Returns:
+            List[str]: Paths to the downloaded photos, in album order
+        """
+        sem = asyncio.Semaphore(8)
+        client = self.instagram_service.client
+        
+        async def download(index: int, resource) -> str:
+            async with sem:
+                path = await asyncio.to_thread(
+                    client.photo_download_by_url,
+                    str(resource.thumbnail_url),
+                    f"{media_pk}_{index}",
+                    folder
+                )
+                return str(path)
+        
+        return list(await asyncio.gather(*(download(i, r) for i, r in enumerate(resources))))
+
     async def _publish_from_queue(self, post: QueuedPost) -> bool:
         """
         Publish a post from the queue.
@@ -2291,85 +2418,55 @@ class AdminHandler:
             if is_reels:
                 # Download and publish reels
                 logger.info("Detected reels URL, downloading...")
-                video_path = self.instagram_service.download_reels(post.url)
+                video_path = await asyncio.to_thread(self.instagram_service.download_reels, post.url)
                 
                 if not video_path:
                     logger.error("Failed to download reels")
                     return False
                 
-                # Get caption from reels
-                caption = self.instagram_service.get_reels_caption(post.url)
-                if not caption:
-                    caption = "📹 Новый рилс"
-                
-                # Publish to platforms
-                success = False
-                if post.platform in ['instagram', 'all']:
-                    success = self.instagram_service.post_video(video_path, caption) or success
-                
-                if post.platform in ['telegram', 'all']:
-                    success = await self.telegram_service.post_video(video_path, caption) or success
-                
-                if post.platform in ['vk', 'all']:
-                    success = await self.vk_service.post_video(video_path, caption) or success
-                
-                # Cleanup
-                if os.path.exists(video_path):
-                    os.remove(video_path)
-                
-                return success
+                try:
+                    # Get caption from reels
+                    caption = await asyncio.to_thread(self.instagram_service.get_reels_caption, post.url)
+                    if not caption:
+                        caption = "📹 Новый рилс"
+                    
+                    # Publish to platforms concurrently
+                    publishers = {}
+                    if post.platform in ['instagram', 'all']:
+                        publishers['Instagram'] = asyncio.to_thread(self.instagram_service.post_video, video_path, caption)
+                    if post.platform in ['telegram', 'all']:
+                        publishers['Telegram'] = self.telegram_service.post_video(video_path, caption)
+                    if post.platform in ['vk', 'all']:
+                        publishers['VK'] = self.vk_service.post_video(video_path, caption)
+                    return any((await self._publish_concurrently(publishers)).values())
+                finally:
+                    # Cleanup
+                    Path(video_path).unlink(missing_ok=True)
             else:
                 # Regular post - download photos and publish
-                logger.info("Detected regular post URL, downloading photos...")
-                
-                # Try to download post media
                 try:
-                    if not self.instagram_service.is_logged_in():
-                        if not self.instagram_service.login():
-                            logger.error("Failed to login to Instagram")
-                            return False
-                    
-                    media_pk = self.instagram_service.client.media_pk_from_url(post.url)
-                    media_info = self.instagram_service.client.media_info(media_pk)
-                    
-                    # Download photos
-                    from config import UPLOADS_DIR
-                    photo_paths = []
-                    
-                    if media_info.media_type == 1:  # Single photo
-                        photo_path = self.instagram_service.client.photo_download(media_pk, folder=UPLOADS_DIR)
-                        photo_paths = [str(photo_path)]
-                    elif media_info.media_type == 8:  # Album
-                        album_path = self.instagram_service.client.album_download(media_pk, folder=UPLOADS_DIR)
-                        # album_download returns a list of paths
-                        photo_paths = [str(p) for p in album_path] if isinstance(album_path, list) else [str(album_path)]
-                    
-                    if not photo_paths:
-                        logger.error("No photos downloaded")
+                    downloaded = await self._download_post_photos(post.url)
+                    if not downloaded:
                         return False
-                    
-                    # Get caption
-                    caption = media_info.caption_text if media_info.caption_text else "📸 Новый пост"
+                    photo_paths, caption = downloaded
                     
                     # Process photos
-                    processed_photos = self.image_processor.process_photos(photo_paths)
-                    target_size = self.image_processor.determine_image_format(processed_photos)
-                    final_photos = [self.image_processor.resize_image(p, target_size) for p in processed_photos]
+                    loop = asyncio.get_running_loop()
+                    final_photos = await loop.run_in_executor(None, self.image_processor.prepare_for_publish, photo_paths)
                     
-                    # Publish to platforms
-                    success = False
+                    # Publish to platforms concurrently
+                    publishers = {}
                     if post.platform in ['instagram', 'all']:
-                        success = self.instagram_service.post_to_instagram(final_photos, caption) or success
-                    
+                        publishers['Instagram'] = asyncio.to_thread(self.instagram_service.post_to_instagram, final_photos, caption)
                     if post.platform in ['telegram', 'all']:
-                        success = await self.telegram_service.post_to_telegram(final_photos, caption) or success
-                    
+                        publishers['Telegram'] = self.telegram_service.post_to_telegram(final_photos, caption)
                     if post.platform in ['vk', 'all']:
-                        success = await self.vk_service.post_to_vk(final_photos, caption) or success
+                        publishers['VK'] = self.vk_service.post_to_vk(final_photos, caption)
+                    success = any((await self._publish_concurrently(publishers)).values())
                     
                     # Cleanup
                     self.image_processor.cleanup_files(photo_paths)
-                    self.image_processor.cleanup_files(final_photos)
+                    self._cleanup_prepared(final_photos, photo_paths)
                     
                     return success
                     
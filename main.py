@@ -19,6 +19,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# uvloop is a faster drop-in event loop; optional and unavailable on Windows
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 class AutoPosterBot:
     """Main bot class."""
     
@@ -26,6 +33,7 @@ class AutoPosterBot:
         """Initialize the bot."""
         self.admin_handler = AdminHandler()
         self.application = None
+        self._button_routes = {}
     
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -35,18 +43,28 @@ class AutoPosterBot:
             update: Telegram update object
             context: Bot context
         """
-        logger.error(f"Update {update} caused error {context.error}")
+        logger.error(f"Update {update} caused error {context.error}", exc_info=context.error)
         
-        # Try to send error message to admin if possible
-        if update and update.effective_user:
+        # Handlers let unexpected errors propagate here; report them in the chat
+        if isinstance(update, Update) and update.effective_chat:
             try:
                 await context.bot.send_message(
-                    chat_id=update.effective_user.id,
-                    text=f"❌ An error occurred: {str(context.error)}"
+                    chat_id=update.effective_chat.id,
+                    text=f"❌ Ошибка: {context.error}"
                 )
             except Exception:
                 pass  # Ignore if we can't send error message
     
+    async def dispatch_button(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Route a reply keyboard button press to its handler.
+        
+        Args:
+            update: Telegram update object
+            context: Bot context
+        """
+        await self._button_routes[update.message.text](update, context)
+    
     def setup_handlers(self):
         """Set up all bot handlers."""
         # Command handlers
@@ -66,43 +84,44 @@ class AutoPosterBot:
         self.application.add_handler(MessageHandler(filters.PHOTO, self.admin_handler.handle_photo))
         self.application.add_handler(MessageHandler(filters.VIDEO, self.admin_handler.handle_video))
         
-        # Queue management button handlers
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^➕ Добавить ссылку$"), self.admin_handler.handle_add_link))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^📋 Очередь постов$"), self.admin_handler.handle_view_queue))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🗑️ Очистить опубликованные$"), self.admin_handler.handle_clear_published))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^❌ Очистить все$"), self.admin_handler.handle_clear_all_queue))
-        
-        # New business process handlers
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🚀 Начать публикацию$"), self.admin_handler.handle_start_publication))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^📷 Одиночный пост$"), self.admin_handler.handle_type_single))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^📸 Массовый пост$"), self.admin_handler.handle_type_multi))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^📹 Публикация рилс$"), self.admin_handler.handle_type_reels))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^📷 Instagram$"), self.admin_handler.handle_platform_instagram))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^💬 Telegram$"), self.admin_handler.handle_platform_telegram))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🔵 VK$"), self.admin_handler.handle_platform_vk))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🔀 Все платформы$"), self.admin_handler.handle_platform_both))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^⚡ Опубликовать сейчас$"), self.admin_handler.handle_publish_now))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^⏰ Запланировать$"), self.admin_handler.handle_schedule_post))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🤖 Помощь ИИ$"), self.admin_handler.handle_ai_help))
-        
-        # Cancel button handlers
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^❌ Отмена$"), self.admin_handler.handle_cancel_button))
-        
-        # Article check handlers
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🔍 Да, искать артикулы$"), self.admin_handler.handle_article_check_yes))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^⏭️ Нет, пропустить$"), self.admin_handler.handle_article_check_no))
-        
-        # Legacy button handlers
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🖼️ Single$"), self.admin_handler.handle_btn_single))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🖼️ Multi$"), self.admin_handler.handle_btn_multi))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^✅ Status$"), self.admin_handler.handle_btn_status))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^❌ Cancel$"), self.admin_handler.handle_btn_cancel))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^ℹ️ Help$"), self.admin_handler.handle_btn_help))
-        self.application.add_handler(MessageHandler(filters.TEXT & filters.Regex(r"^🔄 Reset Instagram$"), self.admin_handler.handle_reset_instagram))
-        
-        # Time input handler (for scheduling)
-        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.admin_handler.handle_text))
-        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.admin_handler.handle_time_input))
+        # Reply keyboard buttons: one exact-text filter and a dict lookup
+        # instead of a regex handler per button
+        ah = self.admin_handler
+        self._button_routes = {
+            # Queue management
+            "➕ Добавить ссылку": ah.handle_add_link,
+            "📋 Очередь постов": ah.handle_view_queue,
+            "🗑️ Очистить опубликованные": ah.handle_clear_published,
+            "❌ Очистить все": ah.handle_clear_all_queue,
+            # New business process
+            "🚀 Начать публикацию": ah.handle_start_publication,
+            "📷 Одиночный пост": ah.handle_type_single,
+            "📸 Массовый пост": ah.handle_type_multi,
+            "📹 Публикация рилс": ah.handle_type_reels,
+            "📷 Instagram": ah.handle_platform_instagram,
+            "💬 Telegram": ah.handle_platform_telegram,
+            "🔵 VK": ah.handle_platform_vk,
+            "🔀 Все платформы": ah.handle_platform_both,
+            "⚡ Опубликовать сейчас": ah.handle_publish_now,
+            "⏰ Запланировать": ah.handle_schedule_post,
+            "🤖 Помощь ИИ": ah.handle_ai_help,
+            # Cancel
+            "❌ Отмена": ah.handle_cancel_button,
+            # Article check
+            "🔍 Да, искать артикулы": ah.handle_article_check_yes,
+            "⏭️ Нет, пропустить": ah.handle_article_check_no,
+            # Legacy buttons
+            "🖼️ Single": ah.handle_btn_single,
+            "🖼️ Multi": ah.handle_btn_multi,
+            "✅ Status": ah.handle_btn_status,
+            "❌ Cancel": ah.handle_btn_cancel,
+            "ℹ️ Help": ah.handle_btn_help,
+            "🔄 Reset Instagram": ah.handle_reset_instagram,
+        }
+        self.application.add_handler(MessageHandler(filters.Text(self._button_routes.keys()), self.dispatch_button))
+        
+        # Free text: captions, links and time input (for scheduling)
+        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.admin_handler.handle_text_or_time))
         # Callbacks
         self.application.add_handler(CallbackQueryHandler(self.admin_handler.on_callback))
         
@@ -128,43 +147,52 @@ class AutoPosterBot:
         except Exception as e:
             logger.error(f"Failed to start scheduler: {e}")
         
-        # Test Instagram connection
-        try:
-            if self.admin_handler.instagram_service.login():
-                logger.info("Instagram service initialized successfully")
-            else:
-                logger.warning("Instagram login failed - bot will continue but Instagram posting may not work")
-        except Exception as e:
-            logger.warning(f"Instagram initialization failed: {e}")
+        # Check all services concurrently so startup takes as long as the slowest
+        # check; a slow Instagram login is capped instead of stalling startup
+        ah = self.admin_handler
+        ig_ok, tg_ok, vk_ok, ai_ok = await asyncio.gather(
+            asyncio.wait_for(asyncio.to_thread(ah.instagram_service.login), timeout=15),
+            ah.telegram_service.test_connection(),
+            asyncio.to_thread(ah.vk_service.test_connection),
+            ah.ai_service.test_connection(),
+            return_exceptions=True
+        )
         
-        # Test Telegram connection
-        try:
-            if await self.admin_handler.telegram_service.test_connection():
-                logger.info("Telegram service initialized successfully")
-            else:
-                logger.error("Telegram connection failed")
-                raise Exception("Telegram connection failed")
-        except Exception as e:
-            logger.error(f"Telegram initialization failed: {e}")
-            raise
+        # Instagram
+        if isinstance(ig_ok, asyncio.TimeoutError):
+            logger.warning("Instagram login timed out - bot will continue but Instagram posting may not work")
+        elif isinstance(ig_ok, Exception):
+            logger.warning(f"Instagram initialization failed: {ig_ok}")
+        elif ig_ok:
+            logger.info("Instagram service initialized successfully")
+        else:
+            logger.warning("Instagram login failed - bot will continue but Instagram posting may not work")
         
-        # Test VK connection
-        try:
-            if self.admin_handler.vk_service.test_connection():
-                logger.info("VK service initialized successfully")
-            else:
-                logger.warning("VK connection failed - bot will continue but VK posting may not work")
-        except Exception as e:
-            logger.warning(f"VK initialization failed: {e}")
+        # Telegram
+        if isinstance(tg_ok, Exception):
+            logger.error(f"Telegram initialization failed: {tg_ok}")
+            raise tg_ok
+        if tg_ok:
+            logger.info("Telegram service initialized successfully")
+        else:
+            logger.error("Telegram connection failed")
+            raise Exception("Telegram connection failed")
         
-        # Test AI service connection
-        try:
-            if await self.admin_handler.ai_service.test_connection():
-                logger.info("AI service initialized successfully")
-            else:
-                logger.warning("AI service connection failed - AI assistance will be disabled")
-        except Exception as e:
-            logger.warning(f"AI service initialization failed: {e}")
+        # VK
+        if isinstance(vk_ok, Exception):
+            logger.warning(f"VK initialization failed: {vk_ok}")
+        elif vk_ok:
+            logger.info("VK service initialized successfully")
+        else:
+            logger.warning("VK connection failed - bot will continue but VK posting may not work")
+        
+        # AI
+        if isinstance(ai_ok, Exception):
+            logger.warning(f"AI service initialization failed: {ai_ok}")
+        elif ai_ok:
+            logger.info("AI service initialized successfully")
+        else:
+            logger.warning("AI service connection failed - AI assistance will be disabled")
         
         logger.info("Auto-Poster Bot started successfully!")
     
@@ -185,12 +213,30 @@ class AutoPosterBot:
         except Exception as e:
             logger.error(f"Error during Instagram logout: {e}")
         
+        # Close the VK upload session
+        try:
+            await self.admin_handler.vk_service.close()
+        except Exception as e:
+            logger.error(f"Error closing VK upload session: {e}")
+        
+        # Close the AI service HTTP session
+        try:
+            await self.admin_handler.ai_service.close()
+        except Exception as e:
+            logger.error(f"Error closing AI service session: {e}")
+        
         # Cleanup uploads directory
         try:
             self.admin_handler.image_processor.cleanup_uploads_dir()
         except Exception as e:
             logger.error(f"Error cleaning up uploads: {e}")
         
+        # Stop image resize workers
+        try:
+            self.admin_handler.image_processor.shutdown()
+        except Exception as e:
+            logger.error(f"Error stopping image workers: {e}")
+        
         logger.info("Auto-Poster Bot shutdown complete")
     
     def run(self):
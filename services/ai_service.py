@@ -3,31 +3,345 @@ AI service for the Auto-Poster Bot.
 Handles text improvement using Google AI Studio.
 """
 
+import asyncio
+import base64
+import hashlib
 import logging
+import mmap
+import os
+import random
+import re
+import tempfile
+import time
+import types
+from collections import OrderedDict
+from pathlib import Path
+from string import Template
+from typing import Final, List, Mapping, Optional, Tuple
+
 import aiohttp
-import json
-from typing import Optional, List
+import orjson
 
 from config import GOOGLE_API_KEY
 
 logger = logging.getLogger("ai")
 
+# Request constants are built once at import; the dicts are never mutated
+_JSON_HEADERS: Final[Mapping[str, str]] = types.MappingProxyType({"Content-Type": "application/json"})
+
+_IMPROVE_INSTRUCTIONS: Final[Mapping[str, str]] = types.MappingProxyType({
+    "instagram": "для Instagram (используй хештеги, эмодзи, привлекательный стиль)",
+    "telegram": "для Telegram (более деловой стиль, без избытка эмодзи)",
+    "both": "для Instagram и Telegram (универсальный стиль с умеренным использованием эмодзи и хештегов)",
+})
+
+_IMPROVE_TEMPLATE: Final = Template("""Улучши это описание поста $platform_instruction:
+
+Требования:
+- Должно быть мемно, популярно,  С КЛИКБЕЙТОМ, не много текста, но и не мало
+- Сделай текст более привлекательным и интересным
+- Добавь подходящие эмодзи (но не слишком много)
+- Если это Instagram, добавь 3-5 релевантных хештегов
+- Сохрани основную суть сообщения
+- Сделай текст читаемым и структурированным
+- Максимум 250 символов
+-В Итоге должно получиться уже готовое описание поста, которое можно сразу публиковать
+
+Исходный текст: "$original_caption"
+
+Улучшенный текст:""")
+
+# The prompt caps the answer at 250 characters; leave headroom for emoji and hashtags
+_IMPROVE_GENERATION_CONFIG: Final = {
+    "temperature": 0.7,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 256,
+}
+
+_ADAPT_INSTRUCTIONS: Final[Mapping[str, str]] = types.MappingProxyType({
+    "telegram": "Адаптируй для Telegram канала. Используй эмодзи умеренно.",
+    "vk": "Адаптируй для группы ВКонтакте. Используй популярные хештеги ВК.",
+    "both": "Адаптируй для Telegram и ВКонтакте одновременно.",
+    "all": "Адаптируй для Telegram и ВКонтакте одновременно.",
+})
+
+_ADAPT_TEMPLATE: Final = Template("""Ты - эксперт по SMM и контент-маркетингу.
+
+Задача: Адаптировать описание рилса из Instagram для публикации в русскоязычных соцсетях.
+
+Оригинальное описание из Instagram:
+"$original_caption"
+
+Требования:
+1. $platform_instruction
+2. Сохрани основной смысл и суть контента
+3. Сделай текст более привлекательным и вовлекающим для русскоязычной аудитории
+4. Добавь подходящие эмодзи (но не переборщи)
+5. Если в оригинале есть хештеги на английском - замени их на русские аналоги
+6. Длина: 100-300 символов
+7. Убери упоминания Instagram, если они есть
+8. Адаптируй стиль под русскоязычную аудиторию
+9. Сделай призыв к действию в конце (если уместно)
+10. Текст должен быть готов к публикации сразу
+
+Важно: НЕ добавляй лишнюю информацию, которой нет в оригинале. Только адаптируй то, что есть.
+
+Напиши только адаптированный текст, без объяснений:""")
+
+# The prompt caps the answer at 300 characters
+_ADAPT_GENERATION_CONFIG: Final = {
+    "temperature": 0.8,
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 384,
+}
+
+_ARTICLES_PROMPT: Final = """Найди все артикулы (номера товаров) на этом изображении. 
+            Артикулы обычно состоят из 7-9 цифр и могут быть написаны крупным шрифтом.
+            Верни только номера артикулов, разделенные запятыми, без дополнительного текста.
+            Если артикулов нет, верни пустую строку.
+            
+            Пример ответа: 342278914, 498034552, 286452047"""
+
+_ARTICLES_GENERATION_CONFIG: Final = {
+    "temperature": 0.1,
+    "topK": 1,
+    "topP": 0.8,
+    "maxOutputTokens": 100,
+}
+
+_WS_RE = re.compile(r"\s+")
+
+# Transient API responses worth retrying, and how many tries a request gets
+_RETRY_STATUSES: Final = frozenset({429, 500, 502, 503, 504})
+_MAX_ATTEMPTS: Final = 4
+# Longest single wait between tries, including a server-requested Retry-After
+_MAX_RETRY_DELAY: Final = 8
+# Article numbers are standalone runs of 7-9 digits
+_ARTICLE_RE = re.compile(r"\b\d{7,9}\b")
+
+
+def _normalize_caption(text: str) -> str:
+    """Collapse whitespace so captions differing only in spacing share a cache entry."""
+    # Case is kept: the model's rewrite of "SALE" and "sale" can legitimately differ
+    return _WS_RE.sub(" ", text).strip()
+
+
 class AIService:
     """Handles AI operations using Google AI Studio."""
     
-    def __init__(self):
-        """Initialize the AI service."""
+    def __init__(self, enable_cache: bool = True, article_cache_file: str = 'sessions/article_cache.json'):
+        """
+        Initialize the AI service.
+        
+        Args:
+            enable_cache: Allow result caching (article extraction by default, captions when requested)
+            article_cache_file: Path to the persistent image -> article numbers cache
+        """
         self.api_key = GOOGLE_API_KEY
         self.base_url = "https://generativelanguage.googleapis.com/v1/models/gemini-2.0-flash:generateContent"
         self.enabled = bool(self.api_key)
+        self._url = f"{self.base_url}?key={self.api_key}"
+        # Model metadata endpoint; a GET here checks the key without generating anything
+        self._model_url = f"{self.base_url.rsplit(':', 1)[0]}?key={self.api_key}"
+        self._last_ok_check = 0.0
+        # Server-sent events variant for text generation; the answer arrives in pieces
+        self._stream_url = f"{self.base_url.replace(':generateContent', ':streamGenerateContent')}?alt=sse&key={self.api_key}"
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Caption results: {(kind, platform, normalized caption): (monotonic ts, text)}
+        self.enable_cache = enable_cache
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[float, str]]" = OrderedDict()
+        self._cache_max_size = 1000
+        self._cache_ttl = 6 * 3600
+        # Article numbers by image content hash, kept on disk across restarts:
+        # {blake2b hex: [wall-clock ts, [article numbers]]}
+        self.article_cache_file = article_cache_file
+        self._article_cache: "OrderedDict[str, list]" = OrderedDict()
+        self._article_cache_max_size = 1000
+        self._article_cache_ttl = 7 * 86400
+        self._load_article_cache()
+    
+    def _load_article_cache(self):
+        """Load the article cache from file, skipping expired entries."""
+        try:
+            if os.path.exists(self.article_cache_file):
+                with open(self.article_cache_file, 'rb') as f:
+                    data = orjson.loads(f.read())
+                now = time.time()
+                self._article_cache = OrderedDict(
+                    (key, entry) for key, entry in data.items()
+                    if now - entry[0] < self._article_cache_ttl
+                )
+                logger.info(f"Loaded {len(self._article_cache)} cached article results")
+        except Exception as e:
+            logger.error(f"Error loading article cache: {e}")
+            self._article_cache = OrderedDict()
+    
+    def _save_article_cache(self, data: bytes):
+        """
+        Write the serialized article cache to file atomically.
+        
+        Args:
+            data: orjson-encoded cache contents
+        """
+        try:
+            # Ensure directory exists
+            os.makedirs(os.path.dirname(self.article_cache_file), exist_ok=True)
+            
+            # Unique temp file so overlapping saves never write into each other
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.article_cache_file), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.article_cache_file)
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+        except Exception as e:
+            logger.error(f"Error saving article cache: {e}")
+    
+    def _cache_get(self, key: Tuple[str, str, str]) -> Optional[str]:
+        """
+        Look up a cached caption result, dropping it if expired.
+        
+        Args:
+            key: (kind, platform, normalized caption)
+            
+        Returns:
+            str: Cached result or None on a miss
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        ts, text = entry
+        if time.monotonic() - ts > self._cache_ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return text
+    
+    def _cache_put(self, key: Tuple[str, str, str], text: str):
+        """
+        Store a caption result, evicting the least recently used entry when full.
+        
+        Args:
+            key: (kind, platform, normalized caption)
+            text: Result to cache
+        """
+        self._cache[key] = (time.monotonic(), text)
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_max_size:
+            self._cache.popitem(last=False)
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the HTTP session for API requests, creating it on first use.
+        
+        One session is kept for the lifetime of the service so requests reuse
+        pooled keep-alive connections instead of a new TLS handshake each.
+        
+        Returns:
+            aiohttp.ClientSession: Shared session
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=75),
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the HTTP session if it was opened."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def _post_with_retry(self, url: str, body: bytes) -> aiohttp.ClientResponse:
+        """
+        POST a JSON body, retrying rate limits, server errors and dropped connections.
+        
+        Waits honor Retry-After when the server sends one, otherwise back off
+        exponentially with jitter; either way a single wait is capped at 8 s. Retries go through the shared
+        session, so they reuse its warm connections.
+        
+        Args:
+            url: Request URL
+            body: Encoded JSON request body
+            
+        Returns:
+            aiohttp.ClientResponse: Final response; use it as an async context manager
+        """
+        session = self._get_session()
+        for attempt in range(_MAX_ATTEMPTS):
+            last_attempt = attempt == _MAX_ATTEMPTS - 1
+            try:
+                response = await session.post(url, headers=_JSON_HEADERS, data=body)
+            except aiohttp.ClientConnectionError as e:
+                if last_attempt:
+                    raise
+                logger.warning(f"AI API connection error, retrying: {e}")
+                delay = min(2 ** attempt, _MAX_RETRY_DELAY) + random.random()
+            else:
+                if response.status not in _RETRY_STATUSES or last_attempt:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = min(float(retry_after), _MAX_RETRY_DELAY)
+                else:
+                    delay = min(2 ** attempt, _MAX_RETRY_DELAY) + random.random()
+                response.release()
+                logger.warning(f"AI API returned {response.status}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    
+    async def _stream_generate(self, payload: dict) -> Optional[str]:
+        """
+        Run a text generation request over the streaming endpoint.
+        
+        The text fragments of each server-sent event are collected as they
+        arrive, and an error status is reported without waiting for a body
+        of generated text.
+        
+        Args:
+            payload: generateContent request body
+            
+        Returns:
+            str: Generated text, or None if the request failed or produced no candidates
+        """
+        async with await self._post_with_retry(self._stream_url, orjson.dumps(payload)) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"AI API error {response.status}: {error_text}")
+                return None
+            
+            fragments = []
+            got_candidates = False
+            async for line in response.content:
+                if not line.startswith(b"data:"):
+                    continue
+                event = orjson.loads(line[5:])
+                candidates = event.get("candidates")
+                if not candidates:
+                    continue
+                got_candidates = True
+                for part in candidates[0].get("content", {}).get("parts", ()):
+                    fragments.append(part.get("text", ""))
+        
+        if not got_candidates:
+            logger.error("No candidates in AI response")
+            return None
+        return "".join(fragments)
     
-    async def improve_caption(self, original_caption: str, platform: str = "both") -> Optional[str]:
+    async def improve_caption(self, original_caption: str, platform: str = "both", use_cache: bool = False) -> Optional[str]:
         """
         Improve a social media caption using Google AI.
         
         Args:
             original_caption: Original caption text
             platform: Target platform ("instagram", "telegram", or "both")
+            use_cache: Return a recent result for the same caption if there is one. Off by
+                default: generation runs at temperature > 0 and a repeat request should
+                yield a new variant
             
         Returns:
             str: Improved caption or None if error
@@ -36,88 +350,73 @@ class AIService:
             logger.warning("AI service is disabled - no API key provided")
             return None
         
+        use_cache = use_cache and self.enable_cache
+        cache_key = ("improve", platform, _normalize_caption(original_caption))
+        if use_cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logger.info("AI improved caption served from cache")
+                return cached
+        
         try:
-            # Create platform-specific prompt
-            platform_instructions = {
-                "instagram": "для Instagram (используй хештеги, эмодзи, привлекательный стиль)",
-                "telegram": "для Telegram (более деловой стиль, без избытка эмодзи)",
-                "both": "для Instagram и Telegram (универсальный стиль с умеренным использованием эмодзи и хештегов)"
-            }
+            platform_instruction = _IMPROVE_INSTRUCTIONS.get(platform) or _IMPROVE_INSTRUCTIONS["both"]
+            prompt = _IMPROVE_TEMPLATE.substitute(platform_instruction=platform_instruction, original_caption=original_caption)
             
-            platform_instruction = platform_instructions.get(platform, platform_instructions["both"])
-            
-            prompt = f"""Улучши это описание поста {platform_instruction}:
-
-Требования:
-- Должно быть мемно, популярно,  С КЛИКБЕЙТОМ, не много текста, но и не мало
-- Сделай текст более привлекательным и интересным
-- Добавь подходящие эмодзи (но не слишком много)
-- Если это Instagram, добавь 3-5 релевантных хештегов
-- Сохрани основную суть сообщения
-- Сделай текст читаемым и структурированным
-- Максимум 250 символов
--В Итоге должно получиться уже готовое описание поста, которое можно сразу публиковать
-
-Исходный текст: "{original_caption}"
-
-Улучшенный текст:"""
-
             payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": prompt
-                    }]
-                }],
-                "generationConfig": {
-                    "temperature": 0.7,
-                    "topK": 40,
-                    "topP": 0.95,
-                    "maxOutputTokens": 1024,
-                }
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": _IMPROVE_GENERATION_CONFIG,
             }
             
-            headers = {
-                "Content-Type": "application/json"
-            }
+            improved_text = await self._stream_generate(payload)
+            if improved_text is None:
+                return None
             
-            url = f"{self.base_url}?key={self.api_key}"
+            # Clean up the response
+            improved_text = improved_text.strip()
+            
+            # Remove any prefix that might be added by the AI
+            if improved_text.startswith("Улучшенный текст:"):
+                improved_text = improved_text.replace("Улучшенный текст:", "").strip()
+            
+            logger.info(f"AI improved caption: {len(original_caption)} -> {len(improved_text)} chars")
+            if use_cache:
+                self._cache_put(cache_key, improved_text)
+            return improved_text
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        if "candidates" in data and len(data["candidates"]) > 0:
-                            improved_text = data["candidates"][0]["content"]["parts"][0]["text"]
-                            
-                            # Clean up the response
-                            improved_text = improved_text.strip()
-                            
-                            # Remove any prefix that might be added by the AI
-                            if improved_text.startswith("Улучшенный текст:"):
-                                improved_text = improved_text.replace("Улучшенный текст:", "").strip()
-                            
-                            logger.info(f"AI improved caption: {len(original_caption)} -> {len(improved_text)} chars")
-                            return improved_text
-                        else:
-                            logger.error("No candidates in AI response")
-                            return None
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"AI API error {response.status}: {error_text}")
-                        return None
-                        
         except Exception as e:
             logger.error(f"Error improving caption with AI: {e}")
             return None
     
-    async def adapt_reels_caption(self, original_caption: str, platform: str = "both") -> Optional[str]:
+    async def improve_captions(self, captions: List[str], platform: str = "both", concurrency: int = 8) -> List[Optional[str]]:
+        """
+        Improve several captions concurrently.
+        
+        Args:
+            captions: Original caption texts
+            platform: Target platform ("instagram", "telegram", or "both")
+            concurrency: Maximum number of API requests in flight
+            
+        Returns:
+            List[Optional[str]]: Improved captions in input order, None where a request failed
+        """
+        sem = asyncio.Semaphore(concurrency)
+        
+        async def improve_one(caption: str) -> Optional[str]:
+            async with sem:
+                return await self.improve_caption(caption, platform)
+        
+        return list(await asyncio.gather(*(improve_one(c) for c in captions)))
+    
+    async def adapt_reels_caption(self, original_caption: str, platform: str = "both", use_cache: bool = False) -> Optional[str]:
         """
         Adapt Instagram reels caption for posting on other platforms.
         
         Args:
             original_caption: Original caption from Instagram reels
             platform: Target platform ('telegram', 'vk', 'both', 'all')
+            use_cache: Return a recent result for the same caption if there is one. Off by
+                default: generation runs at temperature > 0 and a repeat request should
+                yield a new variant
             
         Returns:
             str: Adapted caption or None if failed
@@ -126,90 +425,67 @@ class AIService:
             logger.warning("AI service is disabled - no API key provided")
             return None
         
+        use_cache = use_cache and self.enable_cache
+        cache_key = ("adapt", platform, _normalize_caption(original_caption))
+        if use_cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                logger.info("AI adapted reels caption served from cache")
+                return cached
+        
         try:
-            # Platform-specific instructions
-            platform_instructions = {
-                'telegram': 'Адаптируй для Telegram канала. Используй эмодзи умеренно.',
-                'vk': 'Адаптируй для группы ВКонтакте. Используй популярные хештеги ВК.',
-                'both': 'Адаптируй для Telegram и ВКонтакте одновременно.',
-                'all': 'Адаптируй для Telegram и ВКонтакте одновременно.'
-            }
-            
-            platform_instruction = platform_instructions.get(platform, platform_instructions['both'])
-            
-            prompt = f"""Ты - эксперт по SMM и контент-маркетингу.
-
-Задача: Адаптировать описание рилса из Instagram для публикации в русскоязычных соцсетях.
-
-Оригинальное описание из Instagram:
-"{original_caption}"
-
-Требования:
-1. {platform_instruction}
-2. Сохрани основной смысл и суть контента
-3. Сделай текст более привлекательным и вовлекающим для русскоязычной аудитории
-4. Добавь подходящие эмодзи (но не переборщи)
-5. Если в оригинале есть хештеги на английском - замени их на русские аналоги
-6. Длина: 100-300 символов
-7. Убери упоминания Instagram, если они есть
-8. Адаптируй стиль под русскоязычную аудиторию
-9. Сделай призыв к действию в конце (если уместно)
-10. Текст должен быть готов к публикации сразу
-
-Важно: НЕ добавляй лишнюю информацию, которой нет в оригинале. Только адаптируй то, что есть.
-
-Напиши только адаптированный текст, без объяснений:"""
+            platform_instruction = _ADAPT_INSTRUCTIONS.get(platform) or _ADAPT_INSTRUCTIONS["both"]
+            prompt = _ADAPT_TEMPLATE.substitute(platform_instruction=platform_instruction, original_caption=original_caption)
             
             payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": prompt
-                    }]
-                }],
-                "generationConfig": {
-                    "temperature": 0.8,
-                    "topK": 40,
-                    "topP": 0.95,
-                    "maxOutputTokens": 512,
-                }
-            }
-            
-            headers = {
-                "Content-Type": "application/json"
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": _ADAPT_GENERATION_CONFIG,
             }
             
             logger.info("Requesting AI to adapt reels caption...")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}?key={self.api_key}",
-                    json=payload,
-                    headers=headers
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if 'candidates' in data and len(data['candidates']) > 0:
-                            adapted_text = data['candidates'][0]['content']['parts'][0]['text'].strip()
-                            logger.info(f"AI adapted reels caption: {adapted_text[:100]}...")
-                            return adapted_text
-                        else:
-                            logger.error("No candidates in AI response")
-                            return None
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"AI API error {response.status}: {error_text}")
-                        return None
-                        
+            adapted_text = await self._stream_generate(payload)
+            if adapted_text is None:
+                return None
+            
+            adapted_text = adapted_text.strip()
+            logger.info(f"AI adapted reels caption: {adapted_text[:100]}...")
+            if use_cache:
+                self._cache_put(cache_key, adapted_text)
+            return adapted_text
+            
         except Exception as e:
             logger.error(f"Error adapting reels caption with AI: {e}")
             return None
     
-    async def extract_article_numbers_from_image(self, image_path: str) -> List[str]:
+    @staticmethod
+    def _encode_image(image_path: str) -> Tuple[str, str]:
+        """
+        Read an image and encode it for the API request.
+        
+        The file is memory-mapped, so hashing and base64 encoding read it
+        through the page cache without a separate in-memory copy of the bytes.
+        
+        Args:
+            image_path: Path to the image file
+            
+        Returns:
+            (blake2b hex digest of the image, base64-encoded image)
+        """
+        with open(image_path, 'rb') as image_file:
+            if os.fstat(image_file.fileno()).st_size == 0:
+                # mmap cannot map an empty file
+                return hashlib.blake2b(b"", digest_size=16).hexdigest(), ""
+            with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.blake2b(mm, digest_size=16).hexdigest(), base64.b64encode(mm).decode('ascii')
+    
+    async def extract_article_numbers_from_image(self, image_path: str, use_cache: bool = True) -> List[str]:
         """
         Extract article numbers from image using Google AI Vision.
         
         Args:
             image_path: Path to the image file
+            use_cache: Return the earlier result for byte-identical images
             
         Returns:
             List[str]: List of found article numbers
@@ -219,23 +495,21 @@ class AIService:
             return []
         
         try:
-            import base64
+            # Read, hash and encode the image off the event loop
+            image_hash, image_data = await asyncio.to_thread(self._encode_image, image_path)
             
-            # Read and encode image
-            with open(image_path, 'rb') as image_file:
-                image_data = base64.b64encode(image_file.read()).decode('utf-8')
-            
-            prompt = """Найди все артикулы (номера товаров) на этом изображении. 
-            Артикулы обычно состоят из 7-9 цифр и могут быть написаны крупным шрифтом.
-            Верни только номера артикулов, разделенные запятыми, без дополнительного текста.
-            Если артикулов нет, верни пустую строку.
-            
-            Пример ответа: 342278914, 498034552, 286452047"""
+            use_cache = use_cache and self.enable_cache
+            if use_cache:
+                entry = self._article_cache.get(image_hash)
+                if entry is not None and time.time() - entry[0] < self._article_cache_ttl:
+                    self._article_cache.move_to_end(image_hash)
+                    logger.info("AI article numbers served from cache")
+                    return list(entry[1])
             
             payload = {
                 "contents": [{
                     "parts": [
-                        {"text": prompt},
+                        {"text": _ARTICLES_PROMPT},
                         {
                             "inline_data": {
                                 "mime_type": "image/jpeg",
@@ -244,48 +518,36 @@ class AIService:
                         }
                     ]
                 }],
-                "generationConfig": {
-                    "temperature": 0.1,
-                    "topK": 1,
-                    "topP": 0.8,
-                    "maxOutputTokens": 100,
-                }
+                "generationConfig": _ARTICLES_GENERATION_CONFIG,
             }
             
-            headers = {
-                "Content-Type": "application/json"
-            }
-            
-            url = f"{self.base_url}?key={self.api_key}"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
+            async with await self._post_with_retry(self._url, orjson.dumps(payload)) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    
+                    if "candidates" in data and len(data["candidates"]) > 0:
+                        result_text = data["candidates"][0]["content"]["parts"][0]["text"]
+                        
+                        # Parse the result
+                        article_numbers = _ARTICLE_RE.findall(result_text)
                         
-                        if "candidates" in data and len(data["candidates"]) > 0:
-                            result_text = data["candidates"][0]["content"]["parts"][0]["text"]
-                            
-                            # Parse the result
-                            article_numbers = []
-                            if result_text.strip():
-                                # Split by comma and clean up
-                                numbers = [num.strip() for num in result_text.split(',')]
-                                # Filter valid article numbers (7-9 digits)
-                                for num in numbers:
-                                    if num.isdigit() and 7 <= len(num) <= 9:
-                                        article_numbers.append(num)
-                            
-                            logger.info(f"AI found article numbers: {article_numbers}")
-                            return article_numbers
-                        else:
-                            logger.error("No candidates in AI response for article extraction")
-                            return []
+                        logger.info(f"AI found article numbers: {article_numbers}")
+                        if use_cache:
+                            self._article_cache[image_hash] = [time.time(), list(article_numbers)]
+                            self._article_cache.move_to_end(image_hash)
+                            if len(self._article_cache) > self._article_cache_max_size:
+                                self._article_cache.popitem(last=False)
+                            # Serialize on the loop (consistent snapshot), write in a thread
+                            await asyncio.to_thread(self._save_article_cache, orjson.dumps(self._article_cache))
+                        return article_numbers
                     else:
-                        error_text = await response.text()
-                        logger.error(f"AI API error for article extraction {response.status}: {error_text}")
+                        logger.error("No candidates in AI response for article extraction")
                         return []
-                        
+                else:
+                    error_text = await response.text()
+                    logger.error(f"AI API error for article extraction {response.status}: {error_text}")
+                    return []
+                    
         except Exception as e:
             logger.error(f"Error extracting article numbers with AI: {e}")
             return []
@@ -300,10 +562,19 @@ class AIService:
         if not self.enabled:
             return False
         
+        # A check that passed within the last minute is still good
+        if time.monotonic() - self._last_ok_check < 60:
+            return True
+        
         try:
-            test_caption = "Тест"
-            result = await self.improve_caption(test_caption)
-            return result is not None
+            session = self._get_session()
+            async with session.get(self._model_url) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"AI connection test failed {response.status}: {error_text}")
+                    return False
+            self._last_ok_check = time.monotonic()
+            return True
         except Exception as e:
             logger.error(f"AI connection test failed: {e}")
             return False
@@ -3,37 +3,246 @@ Instagram service for the Auto-Poster Bot.
 Handles Instagram login, session management, and photo posting.
 """
 
+import functools
+import hashlib
 import os
+from pathlib import Path
+import re
+import shutil
+import tempfile
+import threading
 import time
+import types
 import logging
-from typing import List, Optional
-from instagrapi import Client
-from instagrapi.exceptions import LoginRequired, ChallengeRequired, TwoFactorRequired
+from collections import OrderedDict
+from typing import Any, Callable, Final, List, Mapping, Optional, Tuple
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
 
-from config import INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD, INSTAGRAM_SESSIONID, SESSIONS_DIR
+from config import (
+    INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD, INSTAGRAM_SESSIONID, INSTAGRAM_MIN_WRITE_INTERVAL,
+    SESSIONS_DIR, UPLOADS_DIR,
+)
 
 logger = logging.getLogger("ig")
 
+# Patterns for parsing reels URLs and public embed pages
+_SHORTCODE_RE = re.compile(r'/reel/([A-Za-z0-9_-]+)')
+_CAPTION_JSON_RE = re.compile(r'"caption":"([^"]*)"')
+_OG_DESC_RE = re.compile(r'<meta property="og:description" content="([^"]*)"')
+# Video URL candidates in order of preference: JSON field, <video src>, og:video, any .mp4 link
+_VIDEO_URL_ANY_RE = re.compile(
+    r'"video_url":"(?P<p1>[^"]+)"'
+    r'|<video[^>]*src="(?P<p2>[^"]+)"'
+    r'|<meta property="og:video" content="(?P<p3>[^"]+)"'
+    r'|(?P<p4>https://[^"\s]+\.mp4[^"\s]*)'
+)
+
+# Upload errors after which a session reload and one retry are worth trying
+_AUTH_ERR_RE = re.compile(r'login_required|LoginRequired|user_has_logged_out')
+
+# Browser-like headers for the public embed page
+_EMBED_HEADERS: Final[Mapping[str, str]] = types.MappingProxyType({
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0',
+})
+
+# Video bytes are already compressed; ask the CDN not to wrap them in gzip
+_VIDEO_HEADERS: Final[Mapping[str, str]] = types.MappingProxyType({
+    **_EMBED_HEADERS,
+    'Accept-Encoding': 'identity',
+})
+
+
+class _TokenBucket:
+    """Minimum-interval limiter shared by one family of Instagram private API calls."""
+
+    def __init__(self, min_interval: float, name: str, max_backoff: float = 300.0):
+        self.min_interval = min_interval
+        self.name = name
+        self.max_backoff = max_backoff
+        self._next_at = 0.0
+        self._strikes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next call is allowed; returns at once after an idle period."""
+        with self._lock:
+            sleep = max(0.0, self._next_at - time.monotonic())
+            if sleep:
+                logger.info(f"Waiting {sleep:.1f}s before next Instagram {self.name}")
+                time.sleep(sleep)
+            self._next_at = time.monotonic() + self.min_interval
+
+    def backoff(self):
+        """Push the next call further out, doubling the delay on each consecutive rate-limit hit."""
+        with self._lock:
+            self._strikes += 1
+            delay = min(2 ** self._strikes, self.max_backoff)
+            self._next_at = max(self._next_at, time.monotonic()) + delay
+            logger.warning(f"Instagram rate limit hit, delaying next {self.name} by {delay}s")
+
+    def reset(self):
+        """Forget previous rate-limit hits after a successful call."""
+        with self._lock:
+            self._strikes = 0
+
+
+_ig_write_limiter = _TokenBucket(min_interval=INSTAGRAM_MIN_WRITE_INTERVAL, name="upload")
+# Reads (login probe, media info) are limited separately and far more loosely
+_ig_read_limiter = _TokenBucket(min_interval=0.25, name="request")
+
+
+def _is_rate_limited(message: str) -> bool:
+    """Check whether an Instagram error message signals rate limiting."""
+    lowered = message.lower()
+    return "429" in lowered or "rate limit" in lowered or "please wait a few minutes" in lowered
+
+
+def _with_auth_retry(kind: str):
+    """
+    Decorate an upload method to log in first and retry once on auth-related errors.
+
+    Args:
+        kind: What is being uploaded, for log messages
+
+    Returns:
+        Decorator for InstagramService upload methods returning bool
+    """
+    def decorator(upload: Callable[..., bool]) -> Callable[..., bool]:
+        @functools.wraps(upload)
+        def wrapper(self: "InstagramService", *args, **kwargs) -> bool:
+            # Ensure logged in before attempting upload
+            if not self.is_logged_in():
+                logger.warning("Not logged in to Instagram, attempting login...")
+                if not self.login():
+                    return False
+
+            try:
+                return upload(self, *args, **kwargs)
+            except Exception as e:
+                message = str(e)
+                logger.error(f"Error posting {kind} to Instagram: {message}")
+                if _is_rate_limited(message):
+                    _ig_write_limiter.backoff()
+                # A failed upload may mean the session went stale; force a real probe next time
+                self._logged_in_until = 0.0
+                # Retry once on auth-related errors
+                if not _AUTH_ERR_RE.search(message):
+                    return False
+                logger.warning(f"login_required during {kind} upload, attempting session reload and retry once...")
+                # Reload session if exists
+                if os.path.exists(self.session_file):
+                    try:
+                        self._load_settings()
+                    except Exception as load_err:
+                        logger.warning(f"Failed to reload session: {load_err}")
+                # Re-login if still not valid
+                if not self.is_logged_in():
+                    if not self.login():
+                        return False
+                # Retry upload
+                try:
+                    return upload(self, *args, **kwargs)
+                except Exception as e2:
+                    logger.error(f"Retry failed: {e2}")
+                    return False
+        return wrapper
+    return decorator
+
 
 class InstagramService:
     """Handles Instagram operations."""
 
     def __init__(self):
         """Initialize the Instagram service."""
-        self.client = Client()
-        # Set longer timeouts for better stability (especially for video downloads)
-        self.client.request_timeout = 30  # 30 seconds for general requests
-        self.client.private.request_timeout = 30  # 30 seconds for private API
+        # instagrapi client, created (and imported) on first use
+        self._client = None
         self.username = INSTAGRAM_USERNAME
         self.password = INSTAGRAM_PASSWORD
         # Use a stable session file to preserve exact session across restarts
         self.session_file = os.path.join(SESSIONS_DIR, "session.json")
         self._ensure_sessions_dir()
+        # Resolved media per URL, least recently used first:
+        # {url: (ts, media_pk, media_info or None, error message or None)}
+        self._media_cache: "OrderedDict[str, Tuple[float, Optional[int], Any, Optional[str]]]" = OrderedDict()
+        self._media_cache_max_size = 128
+        self._media_cache_ttl = 300
+        self._media_error_ttl = 30
+        # Digest of the last session settings written, to skip identical rewrites
+        self._last_settings_hash: Optional[bytes] = None
+        # Monotonic deadline until which the last successful login probe is trusted
+        self._logged_in_until = 0.0
+        self._login_ttl = 60
+        # Shared HTTP session for embed pages and video downloads so the
+        # TLS connection to instagram.com is reused between calls
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        self._http.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+            'Accept-Language': 'en-US,en;q=0.5',
+        })
+
+    @property
+    def client(self):
+        """instagrapi client, created on first access."""
+        if self._client is None:
+            self._client = self._new_client()
+        return self._client
+
+    @staticmethod
+    def _new_client():
+        """
+        Create an instagrapi client with longer timeouts.
+
+        Returns:
+            instagrapi.Client: Fresh, not logged-in client
+        """
+        from instagrapi import Client
+
+        client = Client()
+        # Set longer timeouts for better stability (especially for video downloads)
+        client.request_timeout = 30  # 30 seconds for general requests
+        client.private.request_timeout = 30  # 30 seconds for private API
+        return client
 
     def _ensure_sessions_dir(self):
         """Ensure the sessions directory exists."""
-        if not os.path.exists(SESSIONS_DIR):
-            os.makedirs(SESSIONS_DIR)
+        os.makedirs(SESSIONS_DIR, exist_ok=True)
+    
+    def _load_settings(self):
+        """Load the saved session into the client, parsing it with orjson."""
+        data = Path(self.session_file).read_bytes()
+        self.client.set_settings(orjson.loads(data))
+
+    def _safe_dump_settings(self):
+        """Save the client session to file atomically, skipping the write if nothing changed."""
+        data = orjson.dumps(self.client.get_settings(), option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2)
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest == self._last_settings_hash:
+            return
+        
+        # Write to a temp file in the same directory and swap it in, so an
+        # interrupted write never leaves a truncated session behind
+        fd, tmp_path = tempfile.mkstemp(dir=SESSIONS_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.session_file)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self._last_settings_hash = digest
     
     def reset_session(self) -> bool:
         """
@@ -47,22 +256,20 @@ class InstagramService:
             logger.info("Resetting Instagram session...")
             
             # Step 1: Delete session file if exists
-            if os.path.exists(self.session_file):
-                try:
-                    os.remove(self.session_file)
-                    logger.info(f"Deleted session file: {self.session_file}")
-                except Exception as e:
-                    logger.error(f"Failed to delete session file: {e}")
-                    return False
-            else:
+            try:
+                os.remove(self.session_file)
+                logger.info(f"Deleted session file: {self.session_file}")
+                self._last_settings_hash = None
+            except FileNotFoundError:
                 logger.info("No session file found to delete")
+            except Exception as e:
+                logger.error(f"Failed to delete session file: {e}")
+                return False
             
             # Step 2: Recreate client from scratch
             logger.info("Recreating Instagram client...")
-            self.client = Client()
-            # Set longer timeouts for better stability
-            self.client.request_timeout = 30
-            self.client.private.request_timeout = 30
+            self._logged_in_until = 0.0
+            self._client = self._new_client()
             
             # Step 3: Try to login with fresh client
             logger.info("Attempting fresh login...")
@@ -86,6 +293,7 @@ class InstagramService:
         Returns:
             bool: True if login successful, False otherwise
         """
+        self._logged_in_until = 0.0
         try:
             # 1. Try login via sessionid if provided
             if INSTAGRAM_SESSIONID:
@@ -96,7 +304,7 @@ class InstagramService:
                     # Validate session
                     if self.is_logged_in():
                         if INSTAGRAM_USERNAME:
-                            self.client.dump_settings(self.session_file)
+                            self._safe_dump_settings()
                         logger.info("Instagram login successful (sessionid)")
                         return True
                     else:
@@ -108,7 +316,7 @@ class InstagramService:
             if os.path.exists(self.session_file):
                 logger.info("Loading existing Instagram session...")
                 try:
-                    self.client.load_settings(self.session_file)
+                    self._load_settings()
                     if self.is_logged_in():
                         logger.info("Instagram login successful (session loaded)")
                         return True
@@ -122,24 +330,39 @@ class InstagramService:
                 raise Exception("Missing INSTAGRAM_USERNAME/INSTAGRAM_PASSWORD and sessionid login failed")
 
             logger.info("Performing fresh Instagram login...")
-            self.client.login(self.username, self.password)
+            if not self.client.login(self.username, self.password):
+                raise Exception("Fresh login was not accepted")
 
             # Save session for future use
-            self.client.dump_settings(self.session_file)
+            self._safe_dump_settings()
 
-            # Final validation
-            if self.is_logged_in():
-                logger.info("Instagram login successful (fresh login)")
-                return True
-            else:
-                raise Exception("Fresh login succeeded but session is not valid")
+            # instagrapi raises on a failed credential login, so the new session
+            # is trusted without another account_info() probe
+            self._logged_in_until = time.monotonic() + self._login_ttl
+            logger.info("Instagram login successful (fresh login)")
+            return True
 
         except Exception as e:
             logger.error(f"Instagram login failed: {e}")
             return False
 
     def is_logged_in(self) -> bool:
+        """
+        Check login, trusting a successful probe for ``_login_ttl`` seconds.
+
+        Returns:
+            bool: True if the session is (recently known to be) valid
+        """
+        now = time.monotonic()
+        if now < self._logged_in_until:
+            return True
+        ok = self._probe()
+        self._logged_in_until = now + self._login_ttl if ok else 0.0
+        return ok
+
+    def _probe(self) -> bool:
         """Check login by calling a lightweight private endpoint."""
+        _ig_read_limiter.acquire()
         try:
             # account_info() is lighter than get_timeline_feed()
             self.client.account_info()
@@ -147,6 +370,7 @@ class InstagramService:
         except Exception:
             return False
 
+    @_with_auth_retry("photo")
     def post_photo(self, photo_path: str, caption: str) -> bool:
         """
         Post a single photo to Instagram.
@@ -158,46 +382,15 @@ class InstagramService:
         Returns:
             bool: True if successful, False otherwise
         """
-        def _attempt_upload() -> bool:
-            logger.info(f"Posting single photo to Instagram: {photo_path}")
-            # No "warm-up" — rely on is_logged_in() instead
-            time.sleep(1.0)  # Small delay to avoid rate-limiting
-            self.client.photo_upload(photo_path, caption)
-            logger.info("Photo posted successfully to Instagram")
-            return True
-
-        # Ensure logged in before attempting upload
-        if not self.is_logged_in():
-            logger.warning("Not logged in to Instagram, attempting login...")
-            if not self.login():
-                return False
-
-        try:
-            return _attempt_upload()
-        except Exception as e:
-            message = str(e)
-            logger.error(f"Error posting photo to Instagram: {message}")
-            # Retry once on auth-related errors
-            if any(err in message for err in ("login_required", "LoginRequired", "user_has_logged_out")):
-                logger.warning("login_required during upload, attempting session reload and retry once...")
-                # Reload session if exists
-                if os.path.exists(self.session_file):
-                    try:
-                        self.client.load_settings(self.session_file)
-                    except Exception as load_err:
-                        logger.warning(f"Failed to reload session: {load_err}")
-                # Re-login if still not valid
-                if not self.is_logged_in():
-                    if not self.login():
-                        return False
-                # Retry upload
-                try:
-                    return _attempt_upload()
-                except Exception as e2:
-                    logger.error(f"Retry failed: {e2}")
-                    return False
-            return False
-
+        logger.info(f"Posting single photo to Instagram: {photo_path}")
+        # No "warm-up" — rely on is_logged_in() instead
+        _ig_write_limiter.acquire()
+        self.client.photo_upload(photo_path, caption)
+        _ig_write_limiter.reset()
+        logger.info("Photo posted successfully to Instagram")
+        return True
+
+    @_with_auth_retry("album")
     def post_album(self, photo_paths: List[str], caption: str) -> bool:
         """
         Post an album (carousel) to Instagram.
@@ -209,48 +402,22 @@ class InstagramService:
         Returns:
             bool: True if successful, False otherwise
         """
-        def _attempt_album() -> bool:
-            if len(photo_paths) < 2:
-                logger.warning("Album requires at least 2 photos, posting as single photo instead")
-                return self.post_photo(photo_paths[0], caption)
-            if len(photo_paths) > 10:
-                logger.warning("Instagram supports max 10 photos in album, truncating...")
-                limited_paths = photo_paths[:10]
-            else:
-                limited_paths = photo_paths
-            logger.info(f"Posting album to Instagram with {len(limited_paths)} photos")
-            time.sleep(1.0)
-            self.client.album_upload(limited_paths, caption)
-            logger.info("Album posted successfully to Instagram")
-            return True
-
-        if not self.is_logged_in():
-            logger.warning("Not logged in to Instagram, attempting login...")
-            if not self.login():
-                return False
-
-        try:
-            return _attempt_album()
-        except Exception as e:
-            message = str(e)
-            logger.error(f"Error posting album to Instagram: {message}")
-            if any(err in message for err in ("login_required", "LoginRequired", "user_has_logged_out")):
-                logger.warning("login_required during album upload, attempting session reload and retry once...")
-                if os.path.exists(self.session_file):
-                    try:
-                        self.client.load_settings(self.session_file)
-                    except Exception as load_err:
-                        logger.warning(f"Failed to reload session: {load_err}")
-                if not self.is_logged_in():
-                    if not self.login():
-                        return False
-                try:
-                    return _attempt_album()
-                except Exception as e2:
-                    logger.error(f"Retry failed: {e2}")
-                    return False
-            return False
-
+        if len(photo_paths) < 2:
+            logger.warning("Album requires at least 2 photos, posting as single photo instead")
+            return self.post_photo(photo_paths[0], caption)
+        if len(photo_paths) > 10:
+            logger.warning("Instagram supports max 10 photos in album, truncating...")
+            limited_paths = photo_paths[:10]
+        else:
+            limited_paths = photo_paths
+        logger.info(f"Posting album to Instagram with {len(limited_paths)} photos")
+        _ig_write_limiter.acquire()
+        self.client.album_upload(limited_paths, caption)
+        _ig_write_limiter.reset()
+        logger.info("Album posted successfully to Instagram")
+        return True
+
+    @_with_auth_retry("video")
     def post_video(self, video_path: str, caption: str) -> bool:
         """
         Post a video to Instagram as a regular post (not reels).
@@ -262,44 +429,12 @@ class InstagramService:
         Returns:
             bool: True if successful, False otherwise
         """
-        def _attempt_video_upload() -> bool:
-            logger.info(f"Posting video to Instagram: {video_path}")
-            time.sleep(1.0)  # Small delay to avoid rate-limiting
-            self.client.video_upload(video_path, caption)
-            logger.info("Video posted successfully to Instagram")
-            return True
-
-        # Ensure logged in before attempting upload
-        if not self.is_logged_in():
-            logger.warning("Not logged in to Instagram, attempting login...")
-            if not self.login():
-                return False
-
-        try:
-            return _attempt_video_upload()
-        except Exception as e:
-            message = str(e)
-            logger.error(f"Error posting video to Instagram: {message}")
-            # Retry once on auth-related errors
-            if any(err in message for err in ("login_required", "LoginRequired", "user_has_logged_out")):
-                logger.warning("login_required during video upload, attempting session reload and retry once...")
-                # Reload session if exists
-                if os.path.exists(self.session_file):
-                    try:
-                        self.client.load_settings(self.session_file)
-                    except Exception as load_err:
-                        logger.warning(f"Failed to reload session: {load_err}")
-                # Re-login if still not valid
-                if not self.is_logged_in():
-                    if not self.login():
-                        return False
-                # Retry upload
-                try:
-                    return _attempt_video_upload()
-                except Exception as e2:
-                    logger.error(f"Retry failed: {e2}")
-                    return False
-            return False
+        logger.info(f"Posting video to Instagram: {video_path}")
+        _ig_write_limiter.acquire()
+        self.client.video_upload(video_path, caption)
+        _ig_write_limiter.reset()
+        logger.info("Video posted successfully to Instagram")
+        return True
 
     def post_to_instagram(self, photo_paths: List[str], caption: str) -> bool:
         """
@@ -362,9 +497,16 @@ class InstagramService:
         try:
             if self.is_logged_in():
                 self.client.logout()
+                self._logged_in_until = 0.0
                 logger.info("Logged out from Instagram")
         except Exception as e:
             logger.error(f"Error during Instagram logout: {e}")
+        finally:
+            self.close()
+
+    def close(self):
+        """Close the pooled HTTP session."""
+        self._http.close()
 
     def get_user_info(self) -> Optional[dict]:
         """
@@ -381,6 +523,57 @@ class InstagramService:
             logger.error(f"Error getting user info: {e}")
             return None
     
+    def _resolve_media(self, url: str) -> Tuple[int, Any]:
+        """
+        Resolve a post URL to its media PK and info, caching the result.
+        
+        Failed lookups are cached for a shorter time so private or deleted
+        posts don't hit the private API again on every call.
+        
+        Args:
+            url: Instagram post/reels URL
+            
+        Returns:
+            tuple: (media_pk, media_info)
+            
+        Raises:
+            Exception: The error from instagrapi, or a new one carrying a cached failure's message
+        """
+        now = time.monotonic()
+        entry = self._media_cache.get(url)
+        if entry:
+            ts, media_pk, media_info, error = entry
+            if now - ts < (self._media_error_ttl if error else self._media_cache_ttl):
+                self._media_cache.move_to_end(url)
+                if error:
+                    # A fresh exception, so a reused one doesn't keep growing its traceback
+                    raise Exception(f"{error} (cached failure)")
+                return media_pk, media_info
+            del self._media_cache[url]
+        
+        try:
+            media_pk = self.client.media_pk_from_url(url)
+            _ig_read_limiter.acquire()
+            media_info = self.client.media_info(media_pk)
+        except Exception as e:
+            self._remember_media(url, (now, None, None, f"{type(e).__name__}: {e}"))
+            raise
+        self._remember_media(url, (now, media_pk, media_info, None))
+        return media_pk, media_info
+    
+    def _remember_media(self, url: str, entry: Tuple[float, Optional[int], Any, Optional[str]]):
+        """
+        Store a media lookup result, evicting the least recently used entry when full.
+        
+        Args:
+            url: Instagram post/reels URL
+            entry: (ts, media_pk, media_info, error message)
+        """
+        self._media_cache[url] = entry
+        self._media_cache.move_to_end(url)
+        if len(self._media_cache) > self._media_cache_max_size:
+            self._media_cache.popitem(last=False)
+    
     def download_reels(self, url: str, progress_callback=None, cancel_check=None) -> Optional[str]:
         """
         Download reels/video from Instagram URL.
@@ -407,18 +600,10 @@ class InstagramService:
             
             logger.info(f"Downloading reels from URL: {url}")
             
-            # Extract media ID from URL
+            # Resolve media ID and info from URL
             try:
-                media_pk = self.client.media_pk_from_url(url)
-                logger.info(f"Extracted media PK: {media_pk}")
-            except Exception as e:
-                logger.error(f"Failed to extract media PK: {e}")
-                return self._download_reels_alternative(url, progress_callback, cancel_check)
-            
-            # Get media info
-            try:
-                media_info = self.client.media_info(media_pk)
-                logger.info(f"Media type: {media_info.media_type}")
+                media_pk, media_info = self._resolve_media(url)
+                logger.info(f"Media PK: {media_pk}, type: {media_info.media_type}")
             except Exception as e:
                 logger.error(f"Failed to get media info: {e}")
                 return self._download_reels_alternative(url, progress_callback, cancel_check)
@@ -429,9 +614,7 @@ class InstagramService:
                 return None
             
             # Download video
-            from config import UPLOADS_DIR
-            if not os.path.exists(UPLOADS_DIR):
-                os.makedirs(UPLOADS_DIR)
+            os.makedirs(UPLOADS_DIR, exist_ok=True)
             
             try:
                 video_path = self.client.video_download(media_pk, folder=UPLOADS_DIR)
@@ -466,8 +649,7 @@ class InstagramService:
             # Try with login first
             if self.is_logged_in():
                 try:
-                    media_pk = self.client.media_pk_from_url(url)
-                    media_info = self.client.media_info(media_pk)
+                    _, media_info = self._resolve_media(url)
                     
                     if media_info.caption_text:
                         logger.info(f"Caption extracted via API: {media_info.caption_text[:100]}...")
@@ -476,10 +658,7 @@ class InstagramService:
                     logger.warning(f"Failed to get caption via API: {e}")
             
             # Alternative method - parse from embed page
-            import requests
-            import re
-            
-            shortcode_match = re.search(r'/reel/([A-Za-z0-9_-]+)', url)
+            shortcode_match = _SHORTCODE_RE.search(url)
             if not shortcode_match:
                 logger.error("Could not extract shortcode from URL")
                 return None
@@ -487,27 +666,29 @@ class InstagramService:
             shortcode = shortcode_match.group(1)
             embed_url = f"https://www.instagram.com/p/{shortcode}/embed/"
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(embed_url, headers=headers, timeout=30)
+            response = self._http.get(embed_url, timeout=30)
             
             if response.status_code != 200:
                 logger.error(f"Failed to fetch embed page: {response.status_code}")
                 return None
+            # Instagram serves UTF-8; skip requests' charset detection over the whole body
+            response.encoding = 'utf-8'
             
             # Try to extract caption from embed page
-            caption_match = re.search(r'"caption":"([^"]*)"', response.text)
+            caption_match = _CAPTION_JSON_RE.search(response.text)
             if caption_match:
                 caption = caption_match.group(1)
-                # Decode unicode escapes
-                caption = caption.encode().decode('unicode_escape')
+                # Decode JSON string escapes (handles surrogate pairs for emoji
+                # and leaves non-ASCII text intact)
+                try:
+                    caption = orjson.loads(f'"{caption}"')
+                except orjson.JSONDecodeError:
+                    caption = caption.encode().decode('unicode_escape')
                 logger.info(f"Caption extracted from embed: {caption[:100]}...")
                 return caption
             
             # Try alternative pattern
-            caption_match = re.search(r'<meta property="og:description" content="([^"]*)"', response.text)
+            caption_match = _OG_DESC_RE.search(response.text)
             if caption_match:
                 caption = caption_match.group(1)
                 logger.info(f"Caption extracted from meta: {caption[:100]}...")
@@ -520,6 +701,33 @@ class InstagramService:
             logger.error(f"Error getting reels caption: {e}")
             return None
     
+    @staticmethod
+    def _find_video_url(html: str) -> Optional[str]:
+        """
+        Find the video URL in a reels embed page.
+        
+        Args:
+            html: Embed page HTML
+            
+        Returns:
+            str: Direct video URL or None if no pattern matched
+        """
+        # One pass over the page, keeping the most preferred pattern seen
+        best = None
+        for match in _VIDEO_URL_ANY_RE.finditer(html):
+            if best is None or match.lastgroup < best.lastgroup:
+                best = match
+                if match.lastgroup == 'p1':
+                    break
+        if best is None:
+            return None
+        
+        video_url = best.group(best.lastgroup)
+        if best.lastgroup in ('p1', 'p4'):
+            video_url = video_url.replace('\\u0026', '&')
+        logger.info(f"Found video URL (pattern {best.lastgroup[1]}): {video_url[:100]}...")
+        return video_url
+    
     def _download_reels_alternative(self, url: str, progress_callback=None, cancel_check=None) -> Optional[str]:
         """
         Alternative method to download reels using public API or third-party services.
@@ -533,14 +741,10 @@ class InstagramService:
             str: Path to downloaded video file or None if failed
         """
         try:
-            import requests
-            import re
-            from config import UPLOADS_DIR
-            
             logger.info("Trying alternative download method...")
             
             # Extract shortcode from URL
-            shortcode_match = re.search(r'/reel/([A-Za-z0-9_-]+)', url)
+            shortcode_match = _SHORTCODE_RE.search(url)
             if not shortcode_match:
                 logger.error("Could not extract shortcode from URL")
                 return None
@@ -548,79 +752,37 @@ class InstagramService:
             shortcode = shortcode_match.group(1)
             logger.info(f"Extracted shortcode: {shortcode}")
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Cache-Control': 'max-age=0',
-            }
-            
             # Try to get video URL from Instagram's public embed API
             embed_url = f"https://www.instagram.com/p/{shortcode}/embed/"
             
             logger.info(f"Fetching embed page: {embed_url}")
-            response = requests.get(embed_url, headers=headers, timeout=30)
+            response = self._http.get(embed_url, headers=_EMBED_HEADERS, timeout=30)
             
             if response.status_code != 200:
                 logger.error(f"Failed to fetch embed page: {response.status_code}")
                 return None
+            response.encoding = 'utf-8'
             
             # Check if cancelled
             if cancel_check and cancel_check():
                 logger.info("Download cancelled by user")
                 return None
             
-            # Extract video URL from embed page - try multiple patterns
-            video_url = None
-            
-            # Pattern 1: JSON format
-            video_url_match = re.search(r'"video_url":"([^"]+)"', response.text)
-            if video_url_match:
-                video_url = video_url_match.group(1).replace('\\u0026', '&')
-                logger.info(f"Found video URL (pattern 1): {video_url[:100]}...")
-            
-            # Pattern 2: Direct video source
-            if not video_url:
-                video_url_match = re.search(r'<video[^>]*src="([^"]+)"', response.text)
-                if video_url_match:
-                    video_url = video_url_match.group(1)
-                    logger.info(f"Found video URL (pattern 2): {video_url[:100]}...")
-            
-            # Pattern 3: og:video meta tag
-            if not video_url:
-                video_url_match = re.search(r'<meta property="og:video" content="([^"]+)"', response.text)
-                if video_url_match:
-                    video_url = video_url_match.group(1)
-                    logger.info(f"Found video URL (pattern 3): {video_url[:100]}...")
-            
-            # Pattern 4: Try to find any .mp4 URL
-            if not video_url:
-                video_url_match = re.search(r'(https://[^"\s]+\.mp4[^"\s]*)', response.text)
-                if video_url_match:
-                    video_url = video_url_match.group(1).replace('\\u0026', '&')
-                    logger.info(f"Found video URL (pattern 4): {video_url[:100]}...")
-            
+            video_url = self._find_video_url(response.text)
             if not video_url:
                 logger.error("Could not find video URL in embed page using any pattern")
                 logger.debug(f"First 500 chars of response: {response.text[:500]}")
                 return None
             
             # Download video
-            if not os.path.exists(UPLOADS_DIR):
-                os.makedirs(UPLOADS_DIR)
+            os.makedirs(UPLOADS_DIR, exist_ok=True)
             
             video_filename = f"reels_{shortcode}.mp4"
             video_path = os.path.join(UPLOADS_DIR, video_filename)
             
             logger.info(f"Downloading video to: {video_path}")
             # Long timeout for connection, no timeout for read (download until complete or cancelled)
-            video_response = requests.get(video_url, headers=headers, stream=True, timeout=(30, None))
+            video_response = self._http.get(video_url, headers=_VIDEO_HEADERS, stream=True, timeout=(30, None))
             
             if video_response.status_code != 200:
                 logger.error(f"Failed to download video: {video_response.status_code}")
@@ -635,31 +797,56 @@ class InstagramService:
             else:
                 logger.warning("Total file size unknown (no content-length header)")
             
-            chunk_count = 0
-            with open(video_path, 'wb') as f:
-                for chunk in video_response.iter_content(chunk_size=8192):
-                    # Check if cancelled
-                    if cancel_check and cancel_check():
-                        logger.info("Download cancelled by user")
-                        # Remove partial file
-                        if os.path.exists(video_path):
-                            os.remove(video_path)
-                        return None
-                    
-                    if chunk:
-                        f.write(chunk)
-                        downloaded_size += len(chunk)
-                        chunk_count += 1
-                        
-                        # Report progress (even if total_size is 0)
+            # Video is requested as identity; only decode if the CDN compressed it anyway
+            decode = video_response.headers.get('Content-Encoding', 'identity').lower() != 'identity'
+            
+            try:
+                with open(video_path, 'wb', buffering=1 << 20) as f:
+                    if total_size > 0 and hasattr(os, 'posix_fallocate'):
+                        # Reserve the whole file up front so it gets contiguous extents
+                        try:
+                            os.posix_fallocate(f.fileno(), 0, total_size)
+                        except OSError as e:
+                            logger.debug(f"posix_fallocate failed: {e}")
+                    if not (cancel_check or progress_callback):
+                        # Nothing to poll or report - let shutil do the copy in 1MB blocks
+                        video_response.raw.decode_content = decode
+                        shutil.copyfileobj(video_response.raw, f, length=1 << 20)
+                    else:
+                        next_report = 0
+                        for chunk in video_response.raw.stream(1 << 18, decode_content=decode):
+                            # Check if cancelled
+                            if cancel_check and cancel_check():
+                                logger.info("Download cancelled by user")
+                                # Remove partial file
+                                f.close()
+                                Path(video_path).unlink(missing_ok=True)
+                                return None
+
+                            if not chunk:
+                                continue
+                            f.write(chunk)
+                            downloaded_size += len(chunk)
+
+                            # Report progress at most every 512KB (even if total_size is 0)
+                            if progress_callback and downloaded_size >= next_report:
+                                next_report = downloaded_size + (1 << 19)
+                                try:
+                                    progress_callback(downloaded_size, total_size)
+                                except Exception as e:
+                                    logger.error(f"Error calling progress_callback: {e}")
+                        # Always report the final size so callers see the download complete
                         if progress_callback:
                             try:
                                 progress_callback(downloaded_size, total_size)
-                                # Log every 100 chunks to avoid spam
-                                if chunk_count % 100 == 0:
-                                    logger.debug(f"Progress callback called: {downloaded_size / (1024*1024):.2f} MB / {total_size / (1024*1024) if total_size > 0 else 'unknown'}")
                             except Exception as e:
                                 logger.error(f"Error calling progress_callback: {e}")
+                    # Drop any preallocated tail if the body came out shorter than announced
+                    f.truncate()
+            except BaseException:
+                # Never leave a partial (possibly preallocated) file behind
+                Path(video_path).unlink(missing_ok=True)
+                raise
             
             if os.path.exists(video_path) and os.path.getsize(video_path) > 0:
                 logger.info(f"Reels downloaded successfully via alternative method: {video_path}")
@@ -670,4 +857,4 @@ class InstagramService:
                 
         except Exception as e:
             logger.error(f"Alternative download method failed: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -4,13 +4,16 @@ Manages post queue and scheduled publishing every 2 hours.
 """
 
 import os
-import json
 import logging
 import asyncio
+import tempfile
+from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Callable
 from dataclasses import dataclass, asdict
 
+import orjson
+
 logger = logging.getLogger("scheduler")
 
 @dataclass
@@ -53,6 +56,11 @@ class SchedulerService:
         self.scheduler_task: Optional[asyncio.Task] = None
         self.publish_callback: Optional[Callable] = None
         
+        # Queue changes are coalesced and written by _flush_loop while the scheduler runs
+        self._dirty = False
+        self._save_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        
         # Load existing queue
         self._load_queue()
     
@@ -60,8 +68,8 @@ class SchedulerService:
         """Load queue from file."""
         try:
             if os.path.exists(self.queue_file):
-                with open(self.queue_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                with open(self.queue_file, 'rb') as f:
+                    data = orjson.loads(f.read())
                     self.queue = [QueuedPost.from_dict(item) for item in data]
                     logger.info(f"Loaded {len(self.queue)} posts from queue")
             else:
@@ -71,17 +79,65 @@ class SchedulerService:
             self.queue = []
     
     def _save_queue(self):
-        """Save queue to file."""
+        """Mark the queue as changed, writing it right away if the flush loop isn't running."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._dirty = True
+            return
+        
+        self._dirty = False
+        self._write_file_sync(self._serialize_queue())
+    
+    def _serialize_queue(self) -> bytes:
+        """Serialize the current queue for the queue file."""
+        # orjson serializes the QueuedPost dataclasses directly (UTF-8, no asdict copies)
+        return orjson.dumps(self.queue, option=orjson.OPT_INDENT_2)
+    
+    def _write_file_sync(self, data: bytes) -> bool:
+        """
+        Write serialized queue data to file atomically.
+        
+        Args:
+            data: orjson-encoded queue contents
+            
+        Returns:
+            True if written, False on error
+        """
         try:
             # Ensure directory exists
-            os.makedirs(os.path.dirname(self.queue_file), exist_ok=True)
+            directory = os.path.dirname(self.queue_file)
+            os.makedirs(directory, exist_ok=True)
             
-            with open(self.queue_file, 'w', encoding='utf-8') as f:
-                data = [post.to_dict() for post in self.queue]
-                json.dump(data, f, ensure_ascii=False, indent=2)
-                logger.info(f"Saved {len(self.queue)} posts to queue")
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.queue_file)
+            except BaseException:
+                # Don't leave a temp file behind on every failed flush (e.g. disk full)
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+            logger.info("Saved queue to file")
+            return True
         except Exception as e:
             logger.error(f"Error saving queue: {e}")
+            return False
+    
+    async def _flush(self):
+        """Write the queue to file if it changed since the last write."""
+        async with self._save_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            # Snapshot on the event loop; only the disk write goes to a thread
+            data = self._serialize_queue()
+            if not await asyncio.to_thread(self._write_file_sync, data):
+                self._dirty = True
+    
+    async def _flush_loop(self):
+        """Flush pending queue changes at most once per second."""
+        while True:
+            await asyncio.sleep(1)
+            await self._flush()
     
     def add_to_queue(self, url: str, platform: str = 'all') -> QueuedPost:
         """
@@ -310,6 +366,7 @@ class SchedulerService:
         
         self.running = True
         self.scheduler_task = asyncio.create_task(self._scheduler_loop())
+        self._flush_task = asyncio.create_task(self._flush_loop())
         logger.info("Scheduler started")
     
     async def stop(self):
@@ -326,6 +383,19 @@ class SchedulerService:
             except asyncio.CancelledError:
                 pass
         
+        if self._flush_task:
+            # Cancel only between writes so a late thread write can't overwrite the final flush
+            async with self._save_lock:
+                self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        
+        # Write out anything changed since the last flush
+        await self._flush()
+        
         logger.info("Scheduler stopped")
     
     def get_schedule_info(self) -> str:
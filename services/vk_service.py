@@ -3,9 +3,12 @@ VK service for the Auto-Poster Bot.
 Handles posting to VK groups.
 """
 
+import asyncio
 import logging
 import os
 from typing import List, Optional
+import aiohttp
+import orjson
 import vk_api
 from vk_api import VkUpload
 
@@ -24,6 +27,7 @@ class VKService:
         self.vk_session = None
         self.vk = None
         self.upload = None
+        self._upload_session = None
         
         if self.access_token:
             self._initialize()
@@ -39,6 +43,28 @@ class VKService:
             logger.error(f"Failed to initialize VK service: {e}")
             raise
     
+    def _get_upload_session(self) -> aiohttp.ClientSession:
+        """
+        Get the HTTP session used for video uploads, creating it on first use.
+        
+        The session is kept for the lifetime of the service so repeated uploads
+        reuse the pooled keep-alive connection instead of a new TLS handshake.
+        
+        Returns:
+            aiohttp.ClientSession: Session without an overall timeout for large files
+        """
+        if self._upload_session is None or self._upload_session.closed:
+            self._upload_session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None, connect=60)
+            )
+        return self._upload_session
+    
+    async def close(self):
+        """Close the video upload session if it was opened."""
+        if self._upload_session is not None:
+            await self._upload_session.close()
+            self._upload_session = None
+    
     def _upload_photo_to_wall(self, photo_path: str) -> Optional[dict]:
         """
         Upload a photo to VK wall.
@@ -206,7 +232,8 @@ class VKService:
             
             # Step 1: Get video upload server
             logger.info("Getting VK video upload server...")
-            upload_server = self.vk.video.save(
+            upload_server = await asyncio.to_thread(
+                self.vk.video.save,
                 group_id=self.group_id,
                 name=caption[:100] if len(caption) > 100 else caption,  # VK limit for name
                 description=caption,
@@ -217,80 +244,56 @@ class VKService:
             logger.info(f"Upload URL: {upload_server['upload_url']}")
             
             # Step 2: Upload video to server
-            import requests
-            import os
-            import time
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
-            
             # Check file size
             file_size_mb = os.path.getsize(video_path) / (1024 * 1024)
             logger.info(f"Video file size: {file_size_mb:.2f} MB")
             
             logger.info("Uploading video file to VK...")
             
-            # Create session with retry strategy
-            session = requests.Session()
-            retry_strategy = Retry(
-                total=5,  # Maximum number of retries
-                backoff_factor=2,  # Wait 1, 2, 4, 8, 16 seconds between retries
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=["POST"]
-            )
-            adapter = HTTPAdapter(max_retries=retry_strategy)
-            session.mount("http://", adapter)
-            session.mount("https://", adapter)
+            # Reuse the long-lived upload session
+            session = self._get_upload_session()
             
-            # Try uploading with retries
-            max_attempts = 3
-            response = None
-            upload_success = False
+            # Try uploading with retries; only transport errors and retryable
+            # statuses are retried, never a completed upload
+            max_attempts = 5
+            upload_body = None
             
             for attempt in range(max_attempts):
                 try:
                     logger.info(f"Upload attempt {attempt + 1}/{max_attempts}")
                     
+                    # The file object is streamed in chunks by aiohttp rather than
+                    # read into memory as one multipart body
                     with open(video_path, 'rb') as video_file:
-                        response = session.post(
-                            upload_server['upload_url'],
-                            files={'video_file': video_file},
-                            timeout=None  # No timeout for large files
-                        )
-                    
-                    if response.status_code == 200:
-                        logger.info("Video file uploaded successfully")
-                        upload_success = True
-                        break
-                    else:
-                        logger.error(f"Failed to upload video to VK: {response.status_code}")
-                        if attempt < max_attempts - 1:
-                            wait_time = 2 ** attempt
-                            logger.info(f"Retrying in {wait_time} seconds...")
-                            time.sleep(wait_time)
+                        form = aiohttp.FormData()
+                        form.add_field('video_file', video_file, filename=os.path.basename(video_path))
+                        async with session.post(upload_server['upload_url'], data=form) as response:
+                            if response.status == 200:
+                                upload_body = await response.read()
+                                logger.info("Video file uploaded successfully")
+                                break
+                            logger.error(f"Failed to upload video to VK: {response.status}")
+                            if response.status not in (429, 500, 502, 503, 504):
+                                break
                             
-                except (requests.exceptions.SSLError, requests.exceptions.ConnectionError) as e:
+                except aiohttp.ClientError as e:
                     logger.error(f"SSL/Connection error on attempt {attempt + 1}: {e}")
-                    if attempt < max_attempts - 1:
-                        wait_time = 2 ** attempt
-                        logger.info(f"Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-                        
-                except Exception as e:
-                    logger.error(f"Unexpected error uploading video: {e}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    if attempt < max_attempts - 1:
-                        wait_time = 2 ** attempt
-                        logger.info(f"Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-            
-            if not upload_success or not response or response.status_code != 200:
+                
+                if attempt < max_attempts - 1:
+                    wait_time = 2 ** attempt
+                    logger.info(f"Retrying in {wait_time} seconds...")
+                    await asyncio.sleep(wait_time)
+            
+            if upload_body is None:
                 logger.error(f"Failed to upload video to VK after all attempts")
                 return False
             
-            # Step 3: Get video info from response
-            video_data = response.json()
-            logger.info(f"Video data: {video_data}")
+            # Step 3: Get video info from response (parsed outside the retry loop so
+            # an unexpected body can't trigger a duplicate upload)
+            try:
+                logger.info(f"Video data: {orjson.loads(upload_body)}")
+            except orjson.JSONDecodeError:
+                logger.warning(f"Upload response is not JSON: {upload_body[:200]!r}")
             
             # The video is being processed by VK, we need to wait and then post
             # VK returns video_id and owner_id in the upload_server response
@@ -305,7 +308,8 @@ class VKService:
             logger.info(f"Posting video to wall: video{owner_id}_{video_id}")
             attachment = f"video{owner_id}_{video_id}"
             
-            self.vk.wall.post(
+            await asyncio.to_thread(
+                self.vk.wall.post,
                 owner_id=-int(self.group_id),  # Negative for groups
                 from_group=1,
                 message=caption,
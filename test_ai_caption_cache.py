@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the AI caption result cache.
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.ai_service import AIService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("test")
+
+
+def make_service(tmp: str, **kwargs) -> AIService:
+    """Create an enabled AIService whose generation returns a new variant on every call."""
+    service = AIService(article_cache_file=os.path.join(tmp, 'article_cache.json'), **kwargs)
+    service.enabled = True
+    service.generations = 0
+
+    async def fake_generate(payload: dict) -> str:
+        service.generations += 1
+        return f"  variant {service.generations}  "
+
+    service._stream_generate = fake_generate
+    return service
+
+
+def test_lru_eviction() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp)
+        service._cache_max_size = 2
+        service._cache_put(("improve", "both", "a"), "A")
+        service._cache_put(("improve", "both", "b"), "B")
+        # Touch "a" so "b" is the least recently used
+        assert service._cache_get(("improve", "both", "a")) == "A"
+        service._cache_put(("improve", "both", "c"), "C")
+
+        assert service._cache_get(("improve", "both", "b")) is None
+        assert service._cache_get(("improve", "both", "a")) == "A"
+        assert service._cache_get(("improve", "both", "c")) == "C"
+
+
+def test_expired_entries_are_dropped() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(tmp)
+        service._cache_ttl = -1
+        service._cache_put(("improve", "both", "a"), "A")
+        assert service._cache_get(("improve", "both", "a")) is None
+        assert len(service._cache) == 0
+
+
+def test_captions_are_not_cached_by_default() -> None:
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            service = make_service(tmp)
+            first = await service.improve_caption("Новая коллекция")
+            second = await service.improve_caption("Новая коллекция")
+            assert (first, second) == ("variant 1", "variant 2"), "Repeat requests must get a new variant"
+            assert len(service._cache) == 0
+
+            await service.adapt_reels_caption("Новая коллекция")
+            assert service.generations == 3 and len(service._cache) == 0
+
+    asyncio.run(run())
+
+
+def test_opt_in_cache_key() -> None:
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            service = make_service(tmp)
+            first = await service.improve_caption("Новая  коллекция\n", use_cache=True)
+            # Whitespace differences share an entry
+            assert await service.improve_caption("Новая коллекция", use_cache=True) == first
+            assert service.generations == 1
+            # Case is part of the key
+            await service.improve_caption("НОВАЯ коллекция", use_cache=True)
+            assert service.generations == 2
+            # Platform and kind are part of the key
+            await service.improve_caption("Новая коллекция", platform="vk", use_cache=True)
+            await service.adapt_reels_caption("Новая коллекция", use_cache=True)
+            assert service.generations == 4
+            assert await service.adapt_reels_caption("Новая коллекция", use_cache=True) == "variant 4"
+            assert service.generations == 4
+
+    asyncio.run(run())
+
+
+def test_enable_cache_false_overrides_opt_in() -> None:
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            service = make_service(tmp, enable_cache=False)
+            await service.improve_caption("Новая коллекция", use_cache=True)
+            await service.improve_caption("Новая коллекция", use_cache=True)
+            assert service.generations == 2 and len(service._cache) == 0
+
+    asyncio.run(run())
+
+
+def main() -> None:
+    test_lru_eviction()
+    test_expired_entries_are_dropped()
+    test_captions_are_not_cached_by_default()
+    test_opt_in_cache_key()
+    test_enable_cache_false_overrides_opt_in()
+    logger.info("AI caption cache tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the AI API retry loop (status handling, Retry-After cap, connection errors).
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+from typing import List, Optional
+
+import aiohttp
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.ai_service as ai_module
+from services.ai_service import AIService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("test")
+
+
+class FakeResponse:
+    def __init__(self, status: int, retry_after: Optional[str] = None):
+        self.status = status
+        self.headers = {"Retry-After": retry_after} if retry_after is not None else {}
+        self.released = False
+
+    def release(self) -> None:
+        self.released = True
+
+
+class FakeSession:
+    """Replays a scripted list of responses (or exceptions) for session.post()."""
+
+    def __init__(self, script: list):
+        self.script = list(script)
+        self.calls = 0
+
+    async def post(self, url, headers=None, data=None):
+        self.calls += 1
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+def run_with_script(script: list):
+    """
+    Run _post_with_retry against a scripted session without really sleeping.
+
+    Returns:
+        (result or raised exception, session, list of requested sleep delays)
+    """
+    sleeps: List[float] = []
+    real_sleep = ai_module.asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        sleeps.append(delay)
+        await real_sleep(0)
+
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            service = AIService(article_cache_file=os.path.join(tmp, 'article_cache.json'))
+            session = FakeSession(script)
+            service._get_session = lambda: session
+            try:
+                result = await service._post_with_retry("https://example.invalid", b"{}")
+            except Exception as e:
+                result = e
+            return result, session
+
+    ai_module.asyncio.sleep = fake_sleep
+    try:
+        result, session = asyncio.run(run())
+    finally:
+        ai_module.asyncio.sleep = real_sleep
+    return result, session, sleeps
+
+
+def test_success_is_not_retried() -> None:
+    ok = FakeResponse(200)
+    result, session, sleeps = run_with_script([ok])
+    assert result is ok and session.calls == 1 and sleeps == []
+
+
+def test_client_errors_are_not_retried() -> None:
+    bad = FakeResponse(400)
+    result, session, sleeps = run_with_script([bad])
+    assert result is bad and session.calls == 1 and sleeps == []
+
+
+def test_retry_after_is_honored_and_capped() -> None:
+    short = FakeResponse(429, retry_after="3")
+    long = FakeResponse(429, retry_after="120")
+    ok = FakeResponse(200)
+    result, session, sleeps = run_with_script([short, long, ok])
+    assert result is ok and session.calls == 3
+    assert sleeps == [3.0, float(ai_module._MAX_RETRY_DELAY)], f"Unexpected waits: {sleeps}"
+    assert short.released and long.released, "Retried responses must be released"
+
+
+def test_server_errors_back_off_and_return_last_response() -> None:
+    responses = [FakeResponse(503) for _ in range(ai_module._MAX_ATTEMPTS)]
+    result, session, sleeps = run_with_script(responses)
+    assert result is responses[-1], "The final error response is returned for the caller to report"
+    assert session.calls == ai_module._MAX_ATTEMPTS
+    assert not responses[-1].released
+    # Exponential backoff with up to 1s of jitter: 1, 2, 4
+    for attempt, delay in enumerate(sleeps):
+        assert 2 ** attempt <= delay < 2 ** attempt + 1, f"Attempt {attempt} waited {delay}"
+
+
+def test_connection_errors_are_retried_then_raised() -> None:
+    ok = FakeResponse(200)
+    result, session, sleeps = run_with_script([aiohttp.ClientConnectionError("reset"), ok])
+    assert result is ok and session.calls == 2 and len(sleeps) == 1
+
+    errors = [aiohttp.ClientConnectionError("reset") for _ in range(ai_module._MAX_ATTEMPTS)]
+    result, session, sleeps = run_with_script(errors)
+    assert isinstance(result, aiohttp.ClientConnectionError)
+    assert session.calls == ai_module._MAX_ATTEMPTS and len(sleeps) == ai_module._MAX_ATTEMPTS - 1
+
+
+def main() -> None:
+    test_success_is_not_retried()
+    test_client_errors_are_not_retried()
+    test_retry_after_is_honored_and_capped()
+    test_server_errors_back_off_and_return_last_response()
+    test_connection_errors_are_retried_then_raised()
+    logger.info("AI retry tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the Instagram call limiter (minimum interval and rate-limit backoff).
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.instagram_service import _TokenBucket, _is_rate_limited
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("test")
+
+
+def test_first_call_is_not_delayed() -> None:
+    bucket = _TokenBucket(min_interval=5.0, name="test")
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start < 0.5, "An idle limiter must not block"
+
+
+def test_calls_are_spaced_by_min_interval() -> None:
+    bucket = _TokenBucket(min_interval=0.2, name="test")
+    bucket.acquire()
+    start = time.monotonic()
+    bucket.acquire()
+    elapsed = time.monotonic() - start
+    assert 0.15 <= elapsed < 1.0, f"Second call waited {elapsed:.2f}s"
+
+
+def test_threads_share_the_interval() -> None:
+    bucket = _TokenBucket(min_interval=0.1, name="test")
+    times = []
+
+    def call() -> None:
+        bucket.acquire()
+        times.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    times.sort()
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert all(gap >= 0.08 for gap in gaps), f"Calls not spaced: {gaps}"
+
+
+def test_backoff_doubles_and_is_capped() -> None:
+    bucket = _TokenBucket(min_interval=0.0, name="test", max_backoff=5.0)
+    delays = []
+    for _ in range(4):
+        before = max(bucket._next_at, time.monotonic())
+        bucket.backoff()
+        delays.append(round(bucket._next_at - before))
+    assert delays == [2, 4, 5, 5], f"Unexpected backoff delays: {delays}"
+
+    # A success resets the doubling
+    bucket.reset()
+    before = max(bucket._next_at, time.monotonic())
+    bucket.backoff()
+    assert round(bucket._next_at - before) == 2
+
+
+def test_rate_limit_detection() -> None:
+    assert _is_rate_limited("Please wait a few minutes before you try again.")
+    assert _is_rate_limited("429 Too Many Requests")
+    assert not _is_rate_limited("login_required")
+
+
+def main() -> None:
+    test_first_call_is_not_delayed()
+    test_calls_are_spaced_by_min_interval()
+    test_threads_share_the_interval()
+    test_backoff_doubles_and_is_capped()
+    test_rate_limit_detection()
+    logger.info("Instagram limiter tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for picking the reels video URL out of an embed page.
+"""
+
+import os
+import sys
+import logging
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.instagram_service import InstagramService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("test")
+
+JSON_URL = 'https://cdn.example.com/json.mp4?a=1\\u0026b=2'
+VIDEO_TAG_URL = 'https://cdn.example.com/tag.mp4'
+OG_URL = 'https://cdn.example.com/og.mp4'
+BARE_URL = 'https://cdn.example.com/bare.mp4?x=1\\u0026y=2'
+
+
+def page(*parts: str) -> str:
+    return "<html><body>" + "\n".join(parts) + "</body></html>"
+
+
+def test_json_video_url_wins_wherever_it_is() -> None:
+    html = page(
+        f'<a href="{BARE_URL}">',
+        f'<meta property="og:video" content="{OG_URL}" />',
+        f'<video class="x" src="{VIDEO_TAG_URL}"></video>',
+        f'<script>{{"video_url":"{JSON_URL}"}}</script>',
+    )
+    assert InstagramService._find_video_url(html) == 'https://cdn.example.com/json.mp4?a=1&b=2'
+
+
+def test_pattern_order_without_json() -> None:
+    html = page(
+        f'<meta property="og:video" content="{OG_URL}" />',
+        f'<video src="{VIDEO_TAG_URL}"></video>',
+    )
+    assert InstagramService._find_video_url(html) == VIDEO_TAG_URL
+
+    html = page(f'"{BARE_URL}"', f'<meta property="og:video" content="{OG_URL}" />')
+    assert InstagramService._find_video_url(html) == OG_URL
+
+
+def test_bare_mp4_link_is_unescaped() -> None:
+    html = page(f'<source data-src="{BARE_URL}">')
+    assert InstagramService._find_video_url(html) == 'https://cdn.example.com/bare.mp4?x=1&y=2'
+
+
+def test_no_video_url() -> None:
+    assert InstagramService._find_video_url(page('<img src="https://cdn.example.com/a.jpg">')) is None
+
+
+def main() -> None:
+    test_json_video_url_wins_wherever_it_is()
+    test_pattern_order_without_json()
+    test_bare_mp4_link_is_unescaped()
+    test_no_video_url()
+    logger.info("Reels video URL tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the scheduler queue file writes (coalesced flush and final flush on stop).
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import tempfile
+
+import orjson
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.scheduler_service import SchedulerService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("test")
+
+
+def read_queue_file(path: str) -> list:
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def test_save_writes_immediately_when_not_running() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        queue_file = os.path.join(tmp, 'post_queue.json')
+        scheduler = SchedulerService(queue_file=queue_file)
+
+        scheduler.add_to_queue('https://www.instagram.com/p/abc/')
+
+        assert [p['url'] for p in read_queue_file(queue_file)] == ['https://www.instagram.com/p/abc/']
+        assert not scheduler._dirty
+
+
+def test_flush_writes_only_when_dirty() -> None:
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            queue_file = os.path.join(tmp, 'post_queue.json')
+            scheduler = SchedulerService(queue_file=queue_file)
+
+            await scheduler._flush()
+            assert not os.path.exists(queue_file), "Clean queue must not be written"
+
+            scheduler._dirty = True
+            await scheduler._flush()
+            assert read_queue_file(queue_file) == []
+            assert not scheduler._dirty
+
+    asyncio.run(run())
+
+
+def test_changes_are_coalesced_and_stop_flushes() -> None:
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            queue_file = os.path.join(tmp, 'post_queue.json')
+            scheduler = SchedulerService(queue_file=queue_file)
+            await scheduler.start()
+            try:
+                for i in range(3):
+                    scheduler.add_to_queue(f'https://www.instagram.com/p/{i}/')
+                # The flush loop owns the writes now; nothing is on disk yet
+                assert scheduler._dirty
+                assert not os.path.exists(queue_file)
+            finally:
+                await scheduler.stop()
+
+            assert scheduler._flush_task is None
+            assert not scheduler._dirty
+            assert len(read_queue_file(queue_file)) == 3
+
+            # With the loop stopped, saves go straight to disk again
+            scheduler.clear_queue()
+            assert read_queue_file(queue_file) == []
+
+    asyncio.run(run())
+
+
+def test_failed_flush_stays_dirty_and_leaves_no_temp_file() -> None:
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            # os.replace() can't overwrite a directory, so every write fails after mkstemp()
+            queue_file = os.path.join(tmp, 'post_queue.json')
+            os.mkdir(queue_file)
+            scheduler = SchedulerService(queue_file=queue_file)
+
+            scheduler._dirty = True
+            await scheduler._flush()
+
+            assert scheduler._dirty, "A failed write must be retried on the next flush"
+            assert os.listdir(tmp) == ['post_queue.json'], f"Temp file left behind: {os.listdir(tmp)}"
+
+    asyncio.run(run())
+
+
+def main() -> None:
+    test_save_writes_immediately_when_not_running()
+    test_flush_writes_only_when_dirty()
+    test_changes_are_coalesced_and_stop_flushes()
+    test_failed_flush_stays_dirty_and_leaves_no_temp_file()
+    logger.info("Scheduler queue tests passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,12 @@ Image processing utilities for the Auto-Poster Bot.
 Handles image resizing, validation, and format conversion.
 """
 
+import multiprocessing
 import os
+import threading
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from PIL import Image, ImageOps
 from typing import List, Tuple, Optional
 import logging
@@ -14,6 +18,76 @@ from .article_extractor import ArticleExtractor
 
 logger = logging.getLogger("img")
 
+def _resize_image_file(file_path: str, target_size: Optional[Tuple[int, int]], uploads_dir: str) -> str:
+    """
+    Resize a single image file and save the result into uploads_dir.
+    
+    Module-level so it can be pickled into ProcessPoolExecutor workers.
+    
+    Args:
+        file_path: Path to the input image
+        target_size: Target size as (width, height). Defaults to MAX_IMAGE_SIZE.
+        uploads_dir: Directory for the processed image
+        
+    Returns:
+        str: Path to the processed image
+    """
+    if target_size is None:
+        target_size = MAX_IMAGE_SIZE
+    
+    try:
+        with Image.open(file_path) as img:
+            # Convert to RGB if necessary
+            if img.mode in ('RGBA', 'LA', 'P'):
+                # Create white background
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                if img.mode == 'P':
+                    img = img.convert('RGBA')
+                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            
+            # Calculate new size maintaining aspect ratio
+            original_width, original_height = img.size
+            target_width, target_height = target_size
+            
+            # Calculate scaling factor
+            scale_w = target_width / original_width
+            scale_h = target_height / original_height
+            scale = min(scale_w, scale_h)
+            
+            new_width = int(original_width * scale)
+            new_height = int(original_height * scale)
+            
+            # Resize image
+            resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            
+            # Create square canvas if needed
+            if target_width == target_height:  # Square format
+                canvas = Image.new('RGB', target_size, (255, 255, 255))
+                # Center the image
+                x = (target_width - new_width) // 2
+                y = (target_height - new_height) // 2
+                canvas.paste(resized_img, (x, y))
+                resized_img = canvas
+            
+            # Generate output filename
+            base_name = os.path.splitext(os.path.basename(file_path))[0]
+            output_filename = f"{base_name}_processed_{uuid.uuid4().hex[:8]}.jpg"
+            output_path = os.path.join(uploads_dir, output_filename)
+            
+            # Save processed image
+            resized_img.save(output_path, 'JPEG', quality=95, optimize=True)
+            
+            logger.info(f"Image processed: {file_path} -> {output_path}")
+            return output_path
+            
+    except Exception as e:
+        logger.error(f"Error processing image {file_path}: {e}")
+        raise
+
+
 class ImageProcessor:
     """Handles image processing operations."""
     
@@ -21,12 +95,13 @@ class ImageProcessor:
         """Initialize the image processor."""
         self.uploads_dir = UPLOADS_DIR
         self.article_extractor = ArticleExtractor()
+        self._resize_pool: Optional[ProcessPoolExecutor] = None
+        self._resize_pool_lock = threading.Lock()
         self._ensure_uploads_dir()
     
     def _ensure_uploads_dir(self):
         """Ensure the uploads directory exists."""
-        if not os.path.exists(self.uploads_dir):
-            os.makedirs(self.uploads_dir)
+        os.makedirs(self.uploads_dir, exist_ok=True)
     
     def validate_image(self, file_path: str) -> bool:
         """
@@ -78,60 +153,51 @@ class ImageProcessor:
         Returns:
             str: Path to the processed image
         """
-        if target_size is None:
-            target_size = MAX_IMAGE_SIZE
+        return _resize_image_file(file_path, target_size, self.uploads_dir)
+    
+    def resize_images_batch(self, photo_paths: List[str], target_size: Tuple[int, int] = None) -> List[str]:
+        """
+        Resize a batch of images in parallel worker processes.
         
-        try:
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # Create white background
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                elif img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # Calculate new size maintaining aspect ratio
-                original_width, original_height = img.size
-                target_width, target_height = target_size
-                
-                # Calculate scaling factor
-                scale_w = target_width / original_width
-                scale_h = target_height / original_height
-                scale = min(scale_w, scale_h)
-                
-                new_width = int(original_width * scale)
-                new_height = int(original_height * scale)
-                
-                # Resize image
-                resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Create square canvas if needed
-                if target_width == target_height:  # Square format
-                    canvas = Image.new('RGB', target_size, (255, 255, 255))
-                    # Center the image
-                    x = (target_width - new_width) // 2
-                    y = (target_height - new_height) // 2
-                    canvas.paste(resized_img, (x, y))
-                    resized_img = canvas
-                
-                # Generate output filename
-                base_name = os.path.splitext(os.path.basename(file_path))[0]
-                output_filename = f"{base_name}_processed_{uuid.uuid4().hex[:8]}.jpg"
-                output_path = os.path.join(self.uploads_dir, output_filename)
-                
-                # Save processed image
-                resized_img.save(output_path, 'JPEG', quality=95, optimize=True)
-                
-                logger.info(f"Image processed: {file_path} -> {output_path}")
-                return output_path
-                
-        except Exception as e:
-            logger.error(f"Error processing image {file_path}: {e}")
-            raise
+        Args:
+            photo_paths: List of paths to the input images
+            target_size: Target size as (width, height). Defaults to MAX_IMAGE_SIZE.
+            
+        Returns:
+            List[str]: Paths to the processed images, in input order
+        """
+        if len(photo_paths) < 2:
+            # Not worth the inter-process round-trip for a single image
+            return [self.resize_image(p, target_size) for p in photo_paths]
+        
+        pool = self._get_resize_pool()
+        return list(pool.map(
+            _resize_image_file,
+            photo_paths,
+            repeat(target_size),
+            repeat(self.uploads_dir),
+        ))
+    
+    def _get_resize_pool(self) -> ProcessPoolExecutor:
+        """Create the resize process pool on first use."""
+        # Publishes call this from several executor threads at once
+        with self._resize_pool_lock:
+            if self._resize_pool is None:
+                # Posts are capped at 10 photos, more workers would never be busy.
+                # Spawn rather than fork: forking this multi-threaded process can
+                # leave children deadlocked on locks held by other threads.
+                self._resize_pool = ProcessPoolExecutor(
+                    max_workers=min(os.cpu_count() or 1, 10),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._resize_pool
+    
+    def shutdown(self):
+        """Shut down the resize process pool if it was started."""
+        with self._resize_pool_lock:
+            if self._resize_pool is not None:
+                self._resize_pool.shutdown(wait=False, cancel_futures=True)
+                self._resize_pool = None
     
     def process_photos(self, photo_paths: List[str]) -> List[str]:
         """
@@ -152,18 +218,64 @@ class ImageProcessor:
         if len(photo_paths) > 10:
             raise ValueError("Too many photos (maximum 10)")
         
-        processed_paths = []
-        
         for photo_path in photo_paths:
             # Validate image
             if not self.validate_image(photo_path):
                 raise ValueError(f"Invalid image: {photo_path}")
+        
+        # Resize all photos in parallel worker processes
+        return self.resize_images_batch(photo_paths)
+    
+    def prepare_for_publish(self, photo_paths: List[str]) -> List[str]:
+        """
+        Validate and resize photos for posting in a single pass.
+        
+        Each photo is decoded and written once, instead of going through
+        process_photos() and then a second resize of the processed copy.
+        
+        Args:
+            photo_paths: List of paths to photo files
             
-            # Process image
-            processed_path = self.resize_image(photo_path)
-            processed_paths.append(processed_path)
+        Returns:
+            List[str]: List of paths to the final photos, in input order. Photos
+            that are already publish-ready are returned as their input path, so
+            callers must not delete the result without excluding the inputs.
+            
+        Raises:
+            ValueError: If any photo is invalid
+        """
+        if not photo_paths:
+            raise ValueError("No photos provided")
+        
+        if len(photo_paths) > 10:
+            raise ValueError("Too many photos (maximum 10)")
+        
+        for photo_path in photo_paths:
+            # Header-only check, pixel data is not decoded here
+            if not self.validate_image(photo_path):
+                raise ValueError(f"Invalid image: {photo_path}")
         
-        return processed_paths
+        # process_photos() always squared to MAX_IMAGE_SIZE, so the format
+        # decision on its output was always MAX_IMAGE_SIZE as well
+        target_size = MAX_IMAGE_SIZE
+        to_resize = [p for p in photo_paths if not self._is_publish_ready(p, target_size)]
+        if not to_resize:
+            logger.info(f"All {len(photo_paths)} photos already at {target_size}, skipping resize")
+            return list(photo_paths)
+        
+        resized = dict(zip(to_resize, self.resize_images_batch(to_resize, target_size)))
+        if len(to_resize) < len(photo_paths):
+            logger.info(f"Skipped resize for {len(photo_paths) - len(to_resize)} photos already at {target_size}")
+        return [resized.get(p, p) for p in photo_paths]
+    
+    @staticmethod
+    def _is_publish_ready(file_path: str, target_size: Tuple[int, int]) -> bool:
+        """Check from the header whether a photo is already an RGB JPEG of target_size."""
+        try:
+            with Image.open(file_path) as img:
+                return img.size == tuple(target_size) and img.format == 'JPEG' and img.mode == 'RGB'
+        except Exception:
+            return False
     
     def determine_image_format(self, photo_paths: List[str]) -> Tuple[int, int]:
         """
@@ -200,9 +312,10 @@ class ImageProcessor:
         """
         for file_path in file_paths:
             try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logger.info(f"Cleaned up file: {file_path}")
+                os.remove(file_path)
+                logger.info(f"Cleaned up file: {file_path}")
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 logger.error(f"Error cleaning up file {file_path}: {e}")
     